@@ -0,0 +1,353 @@
+import heapq
+import math
+from functools import partial
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, NoReturn, Optional, Tuple, Union
+
+from models import SingleLogParserResult
+from normalization import UrlNormalizer
+from sketches import (
+    LatencyHistogram,
+    QuantileSketch,
+    count_sorted_values_in_buckets,
+    quantile_of_sorted,
+    sum_in_order
+)
+
+EXACT_AGGREGATOR = "exact"
+SKETCH_AGGREGATOR = "sketch"
+
+
+class ExactUrlAggregator:
+
+    """
+    Aggregator of request durations for single url.
+    Keeps all durations in order of lines to calculate exact sum, median, percentiles and histogram.
+    Sum is not kept as running value: merged partial sums of shards would be added in other order
+    than durations of the whole log, so report would differ from single process one.
+    Median, percentiles and histogram are calculated from sorted copy of durations,
+    which is made once until new durations are added and is not pickled
+    """
+
+    __slots__ = ("count", "time_max", "durations", "_sorted_durations")
+
+    def __init__(self):
+
+        self.count = 0
+        self.time_max = -math.inf
+        self.durations = list()
+        self._sorted_durations: List[float] = list()
+
+    def __getstate__(self) -> Tuple[None, Dict[str, Union[int, float, List[float]]]]:
+        return None, {"count": self.count, "time_max": self.time_max, "durations": self.durations}
+
+    def __setstate__(self, state: Tuple[None, Dict[str, Union[int, float, List[float]]]]) -> NoReturn:
+        _, slots_state = state
+        self._sorted_durations = list()
+        for name, value in slots_state.items():
+            setattr(self, name, value)
+
+    def add(self, duration: float) -> NoReturn:
+
+        """
+        Adds request duration to aggregator
+        :param duration: request duration
+        """
+
+        self.count += 1
+        if duration > self.time_max:
+            self.time_max = duration
+        self.durations.append(duration)
+
+    def merge(self, other: "ExactUrlAggregator") -> NoReturn:
+
+        """
+        Merges aggregator of the following part of log into current one
+        :param other: aggregator to merge
+        """
+
+        self.count += other.count
+        self.time_max = max(self.time_max, other.time_max)
+        self.durations.extend(other.durations)
+
+    @property
+    def time_sum(self) -> float:
+
+        """
+        Sum of request durations added one by one in order of lines
+        """
+
+        return sum_in_order(self.durations)
+
+    def get_sorted_durations(self) -> List[float]:
+
+        """
+        Returns sorted copy of request durations, durations are only added,
+        so copy of the same length is up to date
+        :return: sorted request durations
+        """
+
+        if len(self._sorted_durations) != self.count:
+            self._sorted_durations = sorted(self.durations)
+        return self._sorted_durations
+
+    def median(self) -> float:
+
+        """
+        Calculates median the same way as statistics.median
+        :return: median of request durations
+        """
+
+        sorted_durations = self.get_sorted_durations()
+
+        return (sorted_durations[(self.count - 1) // 2] + sorted_durations[self.count // 2]) / 2
+
+    def quantile(self, q: float) -> float:
+        return quantile_of_sorted(self.get_sorted_durations(), q)
+
+    def histogram(self) -> List[int]:
+        return count_sorted_values_in_buckets(self.get_sorted_durations())
+
+
+class SketchUrlAggregator:
+
+    """
+    Aggregator of request durations for single url with bounded memory.
+    Count, sum, max and latency histogram are kept as running values,
+    median and percentiles are estimated with quantile sketch
+    """
+
+    __slots__ = ("count", "time_sum", "time_max", "sketch", "latency_histogram")
+
+    def __init__(self, relative_accuracy: float):
+
+        self.count = 0
+        self.time_sum = 0
+        self.time_max = -math.inf
+        self.sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+        self.latency_histogram = LatencyHistogram()
+
+    def add(self, duration: float) -> NoReturn:
+
+        """
+        Adds request duration to aggregator
+        :param duration: request duration
+        """
+
+        self.count += 1
+        self.time_sum += duration
+        if duration > self.time_max:
+            self.time_max = duration
+        self.sketch.add(duration)
+        self.latency_histogram.add(duration)
+
+    def merge(self, other: "SketchUrlAggregator") -> NoReturn:
+
+        """
+        Merges aggregator of the following part of log into current one
+        :param other: aggregator to merge
+        """
+
+        self.count += other.count
+        self.time_sum += other.time_sum
+        self.time_max = max(self.time_max, other.time_max)
+        self.sketch.merge(other.sketch)
+        self.latency_histogram.merge(other.latency_histogram)
+
+    def median(self) -> float:
+        return self.sketch.quantile(0.5)
+
+    def quantile(self, q: float) -> float:
+        return self.sketch.quantile(q)
+
+    def histogram(self) -> List[int]:
+        return list(self.latency_histogram.counts)
+
+
+UrlAggregator = Union[ExactUrlAggregator, SketchUrlAggregator]
+
+
+def get_url_aggregator_factory(aggregator_name: str, relative_accuracy: float) -> Callable[[], UrlAggregator]:
+
+    """
+    Returns factory of url aggregators by its name
+    :param aggregator_name: name of aggregator: exact or sketch
+    :param relative_accuracy: relative accuracy of median for sketch aggregator
+    :return: function creating new url aggregator
+    """
+
+    if aggregator_name == EXACT_AGGREGATOR:
+        return ExactUrlAggregator
+    if aggregator_name == SKETCH_AGGREGATOR:
+        return partial(SketchUrlAggregator, relative_accuracy=relative_accuracy)
+
+    raise ValueError(f"Unknown aggregator {aggregator_name}")
+
+
+class LogAggregate:
+
+    """
+    Partial aggregate of parsed log lines:
+    - num_requests - number of parsed lines
+    - num_failures - number of lines failed to parse
+    - all_requests_time - total time of all requests
+    - url_aggregators - aggregators of request durations by url
+    Urls could be normalized before aggregation with url_normalizer.
+    If max_tracked_urls is set, only most frequent urls are tracked with Space-Saving algorithm:
+    when there is no room for new url, the least frequent one is evicted and new url inherits its
+    frequency, so every url with frequency above num_requests / max_tracked_urls stays in aggregate
+    """
+
+    def __init__(self,
+                 url_aggregator_factory: Callable[[], UrlAggregator] = ExactUrlAggregator,
+                 url_normalizer: Optional[UrlNormalizer] = None,
+                 max_tracked_urls: Optional[int] = None):
+
+        self.url_aggregator_factory = url_aggregator_factory
+        self.url_normalizer = url_normalizer
+        self.max_tracked_urls = max_tracked_urls
+        self.num_requests = 0
+        self.num_failures = 0
+        self.all_requests_time = 0
+        self.num_evicted_urls = 0
+        self.url_aggregators: Dict[str, UrlAggregator] = dict()
+        self._url_frequencies: Dict[str, int] = dict()
+        self._frequencies_heap: List[Tuple[int, str]] = list()
+
+    @property
+    def is_plain(self) -> bool:
+
+        """
+        Checks if urls are aggregated as is, without normalization and eviction
+        """
+
+        return self.url_normalizer is None and self.max_tracked_urls is None
+
+    def get_url_aggregator(self, url: str) -> UrlAggregator:
+
+        """
+        Returns aggregator for url creating it if needed
+        :param url: url from log line
+        :return: aggregator of normalized url
+        """
+
+        if self.url_normalizer is not None:
+            url = self.url_normalizer(url)
+
+        url_aggregator = self.url_aggregators.get(url)
+
+        if self.max_tracked_urls is None:
+            if url_aggregator is None:
+                url_aggregator = self.url_aggregators[url] = self.url_aggregator_factory()
+            return url_aggregator
+
+        if url_aggregator is not None:
+            self._url_frequencies[url] += 1
+            return url_aggregator
+
+        frequency = 1
+        if len(self.url_aggregators) >= self.max_tracked_urls:
+            frequency += self._evict_least_frequent_url()
+        self._url_frequencies[url] = frequency
+        heapq.heappush(self._frequencies_heap, (frequency, url))
+        url_aggregator = self.url_aggregators[url] = self.url_aggregator_factory()
+
+        return url_aggregator
+
+    def _evict_least_frequent_url(self) -> int:
+
+        """
+        Evicts url with the least frequency.
+        Frequencies in heap are updated lazily: outdated entry is pushed back with actual frequency
+        :return: frequency of evicted url
+        """
+
+        while True:
+            frequency, url = heapq.heappop(self._frequencies_heap)
+            actual_frequency = self._url_frequencies[url]
+            if actual_frequency == frequency:
+                break
+            heapq.heappush(self._frequencies_heap, (actual_frequency, url))
+
+        del self._url_frequencies[url]
+        del self.url_aggregators[url]
+        self.num_evicted_urls += 1
+
+        return frequency
+
+    def add_parsed_lines(self, parsed_line_gen: Iterable[SingleLogParserResult]) -> NoReturn:
+
+        """
+        Adds results of line parsing to aggregate
+        :param parsed_line_gen: generator of parsed lines result
+        """
+
+        url_aggregators = self.url_aggregators
+        is_plain = self.is_plain
+
+        for single_line_result in parsed_line_gen:
+
+            self.num_requests += 1
+
+            if single_line_result.is_failed:
+                self.num_failures += 1
+                continue
+
+            curr_url = single_line_result.url
+
+            if is_plain:
+                url_aggregator = url_aggregators.get(curr_url)
+                if url_aggregator is None:
+                    url_aggregator = url_aggregators[curr_url] = self.url_aggregator_factory()
+            else:
+                url_aggregator = self.get_url_aggregator(curr_url)
+            url_aggregator.add(single_line_result.time)
+            self.all_requests_time += single_line_result.time
+
+    def merge(self, other: "LogAggregate") -> NoReturn:
+
+        """
+        Merges aggregate of the following part of log into current one.
+        Durations are appended in order, so merging aggregates of consecutive
+        parts of log gives the same result as aggregating the whole log
+        :param other: aggregate to merge
+        """
+
+        self.num_requests += other.num_requests
+        self.num_failures += other.num_failures
+        self.all_requests_time += other.all_requests_time
+        self.num_evicted_urls += other.num_evicted_urls
+
+        for url, url_aggregator in other.url_aggregators.items():
+            if url not in self.url_aggregators:
+                self.url_aggregators[url] = url_aggregator
+            else:
+                self.url_aggregators[url].merge(url_aggregator)
+
+        if self.max_tracked_urls is not None:
+            for url, url_aggregator in other.url_aggregators.items():
+                self._url_frequencies[url] = (
+                    self._url_frequencies.get(url, 0) + other._url_frequencies.get(url, url_aggregator.count)
+                )
+            self._trim_tracked_urls()
+
+    def _trim_tracked_urls(self) -> NoReturn:
+
+        """
+        Evicts the least frequent urls exceeding max_tracked_urls and rebuilds heap of frequencies
+        """
+
+        num_excess_urls = len(self.url_aggregators) - self.max_tracked_urls
+        if num_excess_urls > 0:
+            least_frequent_urls = heapq.nsmallest(
+                num_excess_urls,
+                self._url_frequencies.items(),
+                key=itemgetter(1)
+            )
+            for url, _ in least_frequent_urls:
+                del self._url_frequencies[url]
+                del self.url_aggregators[url]
+            self.num_evicted_urls += num_excess_urls
+
+        self._frequencies_heap = [(frequency, url) for url, frequency in self._url_frequencies.items()]
+        heapq.heapify(self._frequencies_heap)
@@ -0,0 +1,72 @@
+"""
+Compares peak memory, speed and median accuracy of url aggregators.
+Run from log_analyzer directory:
+
+    python -m benchmarks.bench_aggregators --lines 2000000 --urls 20000
+"""
+import resource
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple
+
+from aggregation import EXACT_AGGREGATOR, SKETCH_AGGREGATOR, LogAggregate, get_url_aggregator_factory
+from benchmarks.synthetic import generate_requests
+from models import SingleLogParserResult
+
+
+def run_aggregator(aggregator_name: str,
+                   relative_accuracy: float,
+                   num_lines: int,
+                   num_urls: int) -> Tuple[float, int, Dict[str, float]]:
+
+    """
+    Aggregates synthetic requests in separate process
+    :return: elapsed time, peak RSS in kilobytes and medians by url
+    """
+
+    aggregate = LogAggregate(
+        url_aggregator_factory=get_url_aggregator_factory(aggregator_name, relative_accuracy)
+    )
+    parsed_line_gen = (
+        SingleLogParserResult(url=url, time=duration, is_failed=False)
+        for url, duration in generate_requests(num_lines=num_lines, num_urls=num_urls)
+    )
+
+    started_at = time.perf_counter()
+    aggregate.add_parsed_lines(parsed_line_gen)
+    medians = {url: url_aggregator.median() for url, url_aggregator in aggregate.url_aggregators.items()}
+    elapsed = time.perf_counter() - started_at
+
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, medians
+
+
+def run_in_fresh_process(*args) -> Tuple[float, int, Dict[str, float]]:
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(run_aggregator, *args).result()
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--urls", type=int, default=10_000)
+    args = parser.parse_args()
+
+    exact_time, exact_rss, exact_medians = run_in_fresh_process(EXACT_AGGREGATOR, 0.01, args.lines, args.urls)
+    print(f"{'aggregator':<16}{'time, s':>10}{'peak RSS, MB':>14}{'max rel err':>14}{'mean rel err':>14}")
+    print(f"{EXACT_AGGREGATOR:<16}{exact_time:>10.2f}{exact_rss / 1024:>14.1f}{0:>14.4f}{0:>14.4f}")
+
+    for relative_accuracy in (0.05, 0.01, 0.001):
+        sketch_time, sketch_rss, sketch_medians = run_in_fresh_process(
+            SKETCH_AGGREGATOR, relative_accuracy, args.lines, args.urls
+        )
+        errors = [
+            abs(sketch_medians[url] - exact_median) / exact_median
+            for url, exact_median in exact_medians.items() if exact_median
+        ]
+        name = f"{SKETCH_AGGREGATOR} {relative_accuracy}"
+        print(
+            f"{name:<16}{sketch_time:>10.2f}{sketch_rss / 1024:>14.1f}"
+            f"{max(errors):>14.4f}{sum(errors) / len(errors):>14.4f}"
+        )
@@ -0,0 +1,66 @@
+"""
+Compares python, compact and numpy aggregation backends on synthetic log:
+time of parsing log into aggregate and time of calculating report stats.
+Report stats of all backends are checked to be the same.
+Run from log_analyzer directory:
+
+    python -m benchmarks.bench_backends --lines 10000000 --urls 100000
+"""
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from benchmarks.synthetic import write_log_file
+from columnar import COMPACT_BACKEND, NUMPY_BACKEND, PYTHON_BACKEND
+from log_analyzer import FAST_PARSER, aggregate_log_file, calculate_url_stats_from_aggregate
+from models import Config, LatestLogFile
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--urls", type=int, default=100_000)
+    parser.add_argument("--report-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    test_folder = tempfile.mkdtemp()
+    try:
+        log_file = LatestLogFile(
+            path=os.path.join(test_folder, "nginx-access-ui.log-20170630.log"),
+            date_of_creation=datetime.datetime(year=2017, month=6, day=30),
+            extension=".log"
+        )
+        write_log_file(path=log_file.path, num_lines=args.lines, num_urls=args.urls)
+
+        reports = dict()
+        print(f"{'backend':>8}{'parse, s':>10}{'stats, s':>10}")
+        for backend in (PYTHON_BACKEND, COMPACT_BACKEND, NUMPY_BACKEND):
+            cfg = Config(
+                report_size=args.report_size,
+                report_dir=test_folder,
+                log_dir=test_folder,
+                log_file=None,
+                failures_percent_threshold=50.0,
+                parser=FAST_PARSER,
+                aggregation_backend=backend
+            )
+
+            started_at = time.perf_counter()
+            aggregate = aggregate_log_file(log_file=log_file, cfg=cfg)
+            parse_elapsed = time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            url_stats = calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=cfg)
+            stats_elapsed = time.perf_counter() - started_at
+
+            reports[backend] = json.dumps(url_stats)
+            del aggregate
+            print(f"{backend:>8}{parse_elapsed:>10.2f}{stats_elapsed:>10.2f}")
+
+        assert reports[PYTHON_BACKEND] == reports[COMPACT_BACKEND] == reports[NUMPY_BACKEND]
+    finally:
+        shutil.rmtree(test_folder)
@@ -0,0 +1,68 @@
+"""
+Compares readers of gzip logs on synthetic log: default gzip reader,
+pipelined reader with background decompression and pipelined reader with external decompressor.
+Report stats of all readers are checked to be the same.
+Run from log_analyzer directory:
+
+    python -m benchmarks.bench_gzip_readers --lines 2000000 --urls 10000
+"""
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from benchmarks.synthetic import write_log_file
+from log_analyzer import FAST_PARSER, aggregate_log_file, calculate_url_stats_from_aggregate
+from models import Config, LatestLogFile
+from pipeline import DEFAULT_GZIP_READER, EXTERNAL_GZIP_READER, PIPELINED_GZIP_READER
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    parser.add_argument("--urls", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--parser", default=FAST_PARSER)
+    args = parser.parse_args()
+
+    test_folder = tempfile.mkdtemp()
+    try:
+        plain_log_path = os.path.join(test_folder, "nginx-access-ui.log-20170630.log")
+        write_log_file(path=plain_log_path, num_lines=args.lines, num_urls=args.urls)
+        log_file = LatestLogFile(
+            path=os.path.join(test_folder, "nginx-access-ui.log-20170630.gz"),
+            date_of_creation=datetime.datetime(year=2017, month=6, day=30),
+            extension=".gz"
+        )
+        with open(plain_log_path, "rb") as plain_log, gzip.open(log_file.path, "wb") as gz_log:
+            shutil.copyfileobj(plain_log, gz_log)
+        os.remove(plain_log_path)
+
+        stats_by_reader = dict()
+        print(f"{'reader':>10}{'time, s':>9}{'lines/s':>11}")
+        for gzip_reader in (DEFAULT_GZIP_READER, PIPELINED_GZIP_READER, EXTERNAL_GZIP_READER):
+            cfg = Config(
+                report_size=1000,
+                report_dir=test_folder,
+                log_dir=test_folder,
+                log_file=None,
+                failures_percent_threshold=50.0,
+                workers=args.workers,
+                parser=args.parser,
+                gzip_reader=gzip_reader
+            )
+
+            started_at = time.perf_counter()
+            aggregate = aggregate_log_file(log_file=log_file, cfg=cfg)
+            elapsed = time.perf_counter() - started_at
+
+            stats_by_reader[gzip_reader] = calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=cfg)
+            print(f"{gzip_reader:>10}{elapsed:>9.2f}{args.lines / elapsed:>11.0f}")
+
+        assert stats_by_reader[DEFAULT_GZIP_READER] == stats_by_reader[PIPELINED_GZIP_READER]
+        assert stats_by_reader[DEFAULT_GZIP_READER] == stats_by_reader[EXTERNAL_GZIP_READER]
+    finally:
+        shutil.rmtree(test_folder)
@@ -0,0 +1,84 @@
+"""
+Compares memory held by aggregate of synthetic requests and aggregation speed of backends:
+python (dict of url aggregators with lists of floats), compact (interned urls and arrays)
+and numpy (columns of url ids and durations) if numpy is installed.
+Memory is measured with tracemalloc in separate run, so that tracing does not slow down timed run.
+Run from log_analyzer directory:
+
+    python -m benchmarks.bench_memory --lines 2000000 --urls 100000
+"""
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import generate_requests
+from columnar import COMPACT_BACKEND, NUMPY_BACKEND, PYTHON_BACKEND, np
+from log_analyzer import make_log_aggregate
+from models import Config, SingleLogParserResult
+
+
+def run_backend(backend: str, num_lines: int, num_urls: int, measure_memory: bool) -> float:
+
+    """
+    Aggregates synthetic requests in separate process
+    :param backend: aggregation backend
+    :param num_lines: number of requests
+    :param num_urls: number of unique urls
+    :param measure_memory: whether to measure memory instead of time
+    :return: bytes held by aggregate or elapsed time in seconds
+    """
+
+    cfg = Config(
+        report_size=1000,
+        report_dir=None,
+        log_dir=None,
+        log_file=None,
+        failures_percent_threshold=50.0,
+        aggregation_backend=backend
+    )
+    parsed_line_gen = (
+        SingleLogParserResult(url=url, time=duration, is_failed=False)
+        for url, duration in generate_requests(num_lines=num_lines, num_urls=num_urls)
+    )
+
+    if measure_memory:
+        tracemalloc.start()
+    started_at = time.perf_counter()
+    aggregate = make_log_aggregate(cfg=cfg)
+    aggregate.add_parsed_lines(parsed_line_gen)
+    elapsed = time.perf_counter() - started_at
+    if not measure_memory:
+        return elapsed
+
+    held_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del aggregate
+
+    return held_bytes
+
+
+def run_in_fresh_process(*args) -> float:
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(run_backend, *args).result()
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    parser.add_argument("--urls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    backends = [PYTHON_BACKEND, COMPACT_BACKEND]
+    if np is not None:
+        backends.append(NUMPY_BACKEND)
+
+    print(f"{'backend':<10}{'time, s':>10}{'memory, MB':>12}{'bytes/url':>12}{'bytes/line':>12}")
+    for backend in backends:
+        elapsed = run_in_fresh_process(backend, args.lines, args.urls, False)
+        held_bytes = run_in_fresh_process(backend, args.lines, args.urls, True)
+        print(
+            f"{backend:<10}{elapsed:>10.2f}{held_bytes / 2 ** 20:>12.1f}"
+            f"{held_bytes / args.urls:>12.0f}{held_bytes / args.lines:>12.1f}"
+        )
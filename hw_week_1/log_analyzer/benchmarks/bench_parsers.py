@@ -0,0 +1,67 @@
+"""
+Compares throughput of text and binary parsers of nginx log.
+Run from log_analyzer directory:
+
+    python -m benchmarks.bench_parsers --lines 1000000 --urls 10000
+"""
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Callable
+
+from aggregation import LogAggregate
+from benchmarks.synthetic import write_log_file
+from log_analyzer import parse_log_file
+from models import LatestLogFile
+from parsers import aggregate_log_file_fast
+
+
+def parse_with_text_parser(log_file: LatestLogFile) -> LogAggregate:
+    aggregate = LogAggregate()
+    aggregate.add_parsed_lines(parse_log_file(log_file=log_file, log_file_opener=open))
+    return aggregate
+
+
+def parse_with_binary_parser(log_file: LatestLogFile) -> LogAggregate:
+    aggregate = LogAggregate()
+    aggregate_log_file_fast(log_file=log_file, aggregate=aggregate)
+    return aggregate
+
+
+def measure_lines_per_sec(parse_func: Callable[[LatestLogFile], LogAggregate],
+                          log_file: LatestLogFile,
+                          repeats: int) -> float:
+
+    """
+    Measures best throughput of parser among several runs
+    :return: parsed lines per second
+    """
+
+    best_elapsed = None
+    num_lines = 0
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        num_lines = parse_func(log_file).num_requests
+        elapsed = time.perf_counter() - started_at
+        best_elapsed = elapsed if best_elapsed is None else min(best_elapsed, elapsed)
+
+    return num_lines / best_elapsed
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--urls", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, "nginx-access-ui.log-20170630.log")
+        write_log_file(path=log_path, num_lines=args.lines, num_urls=args.urls)
+        log_file = LatestLogFile(path=log_path, date_of_creation=None, extension=".log")
+
+        for parser_name, parse_func in (("text", parse_with_text_parser), ("binary", parse_with_binary_parser)):
+            lines_per_sec = measure_lines_per_sec(parse_func=parse_func, log_file=log_file, repeats=args.repeats)
+            print(f"{parser_name:<8}{lines_per_sec:>14,.0f} lines/sec")
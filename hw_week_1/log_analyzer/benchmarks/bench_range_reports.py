@@ -0,0 +1,64 @@
+"""
+Shows how throughput of range reports scales with the number of log files and workers.
+Run from log_analyzer directory:
+
+    python -m benchmarks.bench_range_reports --lines-per-file 200000 --max-files 8 --max-workers 4
+"""
+import datetime
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Iterator
+
+from benchmarks.synthetic import write_log_file
+from log_analyzer import LOG_FILE_PATTERN, aggregate_log_files, find_logs_in_range
+from models import Config, DateRange
+
+
+def powers_of_two(max_value: int) -> Iterator[int]:
+    value = 1
+    while value <= max_value:
+        yield value
+        value *= 2
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--lines-per-file", type=int, default=200_000)
+    parser.add_argument("--urls", type=int, default=10_000)
+    parser.add_argument("--max-files", type=int, default=8)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--parser", default="fast")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        first_date = datetime.date(year=2017, month=6, day=1)
+        for day in range(args.max_files):
+            log_date = first_date + datetime.timedelta(days=day)
+            write_log_file(
+                path=os.path.join(tmp_dir, f"nginx-access-ui.log-{log_date:%Y%m%d}.log"),
+                num_lines=args.lines_per_file,
+                num_urls=args.urls,
+                seed=day
+            )
+
+        print(f"{'files':>6}{'workers':>9}{'time, s':>10}{'lines/sec':>14}")
+        for num_files in powers_of_two(args.max_files):
+            date_range = DateRange(date_from=first_date, date_to=first_date + datetime.timedelta(days=num_files - 1))
+            log_files = find_logs_in_range(log_dir=tmp_dir, log_file_pattern=LOG_FILE_PATTERN, date_range=date_range)
+            for workers in powers_of_two(args.max_workers):
+                cfg = Config(
+                    report_size=1000,
+                    report_dir=tmp_dir,
+                    log_dir=tmp_dir,
+                    log_file=None,
+                    failures_percent_threshold=50.0,
+                    workers=workers,
+                    parser=args.parser
+                )
+                started_at = time.perf_counter()
+                aggregate = aggregate_log_files(log_files=log_files, cfg=cfg)
+                elapsed = time.perf_counter() - started_at
+                print(f"{num_files:>6}{workers:>9}{elapsed:>10.2f}{aggregate.num_requests / elapsed:>14,.0f}")
@@ -0,0 +1,232 @@
+"""
+Times stages of report generation end to end on synthetic log and saves results to json file
+named after current commit, so that results could be compared across commits.
+Config parameters could be overridden with --set KEY=VALUE (value is parsed as json if possible).
+Run from log_analyzer directory:
+
+    python -m benchmarks.bench_report --lines 1000000 --urls 10000 --gz --set PARSER='"fast"'
+    python -m benchmarks.bench_report --compare benchmarks/results/1a2b3c4.json benchmarks/results/5d6e7f8.json
+"""
+import datetime
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from argparse import ArgumentParser
+from typing import Any, Dict, List, NoReturn, Tuple
+
+from benchmarks.synthetic import DURATION_DISTRIBUTIONS, LOGNORMAL_DISTRIBUTION, make_log_file_name, write_log_file
+from log_analyzer import CONFIG, LOG_FILE_PATTERN, generate_report, generate_report_name, get_config_parameters
+from metrics import get_metrics_file_name
+from models import LatestLogFile
+
+LOG_DATE = datetime.date(year=2017, month=6, day=30)
+REPORT_TEMPLATE_PATH = "./reports/report.html"
+DEFAULT_RESULTS_DIR = "./benchmarks/results"
+
+
+def get_commit_name() -> str:
+
+    """
+    Returns short hash of current commit with -dirty suffix if there are uncommitted changes
+    :return: name of commit or unknown if git is not available
+    """
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        changes = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+    return f"{commit}-dirty" if changes else commit
+
+
+def parse_config_override(override: str) -> Tuple[str, Any]:
+
+    """
+    Parses config parameter override like PARSER="fast" or WORKERS=4
+    :param override: override from command line
+    :return: name of parameter and its value
+    """
+
+    key, separator, value = override.partition("=")
+    if not separator:
+        raise ValueError(f"Config override should look like KEY=VALUE, got {override}")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
+def run_report_benchmark(lines: int,
+                         urls: int,
+                         distribution: str,
+                         error_rate: float,
+                         is_gzip: bool,
+                         repeat: int,
+                         config_overrides: Dict[str, Any]) -> Dict[str, Any]:
+
+    """
+    Generates synthetic log and makes report for it several times collecting metrics of every run
+    :param lines: number of log lines
+    :param urls: number of unique urls
+    :param distribution: distribution of request durations
+    :param error_rate: share of malformed lines
+    :param is_gzip: whether log is gzipped
+    :param repeat: number of runs
+    :param config_overrides: config parameters to override
+    :return: benchmark result with metrics of every run and the best time of every stage
+    """
+
+    test_folder = tempfile.mkdtemp()
+    try:
+        log_path = os.path.join(test_folder, make_log_file_name(log_date=LOG_DATE, is_gzip=is_gzip))
+        write_log_file(
+            path=log_path,
+            num_lines=lines,
+            num_urls=urls,
+            duration_distribution=distribution,
+            error_rate=error_rate
+        )
+        shutil.copy(REPORT_TEMPLATE_PATH, test_folder)
+
+        cfg = get_config_parameters(
+            default_config=CONFIG,
+            config_from_file_={
+                **config_overrides,
+                "LOG_DIR": test_folder,
+                "REPORT_DIR": test_folder,
+                "INCREMENTAL": False,
+                "WRITE_METRICS": True
+            }
+        )
+        report_name = generate_report_name(
+            cfg=cfg,
+            log_file=LatestLogFile(path=log_path, date_of_creation=LOG_DATE, extension=os.path.splitext(log_path)[1])
+        )
+        metrics_file_name = get_metrics_file_name(report_name=report_name)
+
+        runs = list()
+        for _ in range(repeat):
+            for path in (report_name, metrics_file_name):
+                if os.path.exists(path):
+                    os.remove(path)
+            generate_report(config=cfg, log_file_pattern=LOG_FILE_PATTERN)
+            if not os.path.exists(metrics_file_name):
+                raise RuntimeError("Report was not generated, see script log")
+            with open(metrics_file_name, encoding="utf-8") as metrics_file:
+                runs.append(json.load(metrics_file))
+    finally:
+        shutil.rmtree(test_folder)
+
+    best_stages = {
+        stage: min(run["stages"][stage] for run in runs)
+        for stage in runs[0]["stages"]
+    }
+
+    return {
+        "commit": get_commit_name(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "params": {
+            "lines": lines,
+            "urls": urls,
+            "distribution": distribution,
+            "error_rate": error_rate,
+            "gzip": is_gzip,
+            "repeat": repeat,
+            "config": config_overrides
+        },
+        "best": {
+            "stages": best_stages,
+            "total_sec": min(run["total_sec"] for run in runs),
+            "lines_per_sec": max(run["lines_per_sec"] for run in runs),
+            "bytes_per_sec": max(run["bytes_per_sec"] for run in runs),
+            "peak_rss_bytes": max(run["peak_rss_bytes"] or 0 for run in runs)
+        },
+        "runs": runs
+    }
+
+
+def compare_results(base_result: Dict[str, Any], new_result: Dict[str, Any]) -> List[Tuple[str, float, float, float]]:
+
+    """
+    Compares the best metrics of two benchmark results
+    :param base_result: result to compare with
+    :param new_result: new result
+    :return: list of (metric, base value, new value, change in percents)
+    """
+
+    if base_result["params"] != new_result["params"]:
+        print("Warning: results are measured with different parameters")
+
+    metric_names = [f"stages.{stage}" for stage in base_result["best"]["stages"]]
+    metric_names += ["total_sec", "lines_per_sec", "bytes_per_sec", "peak_rss_bytes"]
+
+    comparison = list()
+    for metric_name in metric_names:
+        base_value, new_value = base_result["best"], new_result["best"]
+        for key in metric_name.split("."):
+            base_value, new_value = base_value.get(key), new_value.get(key)
+        if base_value is None or new_value is None:
+            continue
+        change = 100 * (new_value - base_value) / base_value if base_value else 0.0
+        comparison.append((metric_name, base_value, new_value, change))
+
+    return comparison
+
+
+def print_comparison(base_path: str, new_path: str) -> NoReturn:
+
+    with open(base_path, encoding="utf-8") as base_file, open(new_path, encoding="utf-8") as new_file:
+        base_result, new_result = json.load(base_file), json.load(new_file)
+
+    comparison = compare_results(base_result=base_result, new_result=new_result)
+    print(f"{'metric':<18}{base_result['commit']:>16}{new_result['commit']:>16}{'change, %':>11}")
+    for metric_name, base_value, new_value, change in comparison:
+        print(f"{metric_name:<18}{base_value:>16.3f}{new_value:>16.3f}{change:>11.1f}")
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--urls", type=int, default=10_000)
+    parser.add_argument("--distribution", choices=sorted(DURATION_DISTRIBUTIONS), default=LOGNORMAL_DISTRIBUTION)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--gz", action="store_true", help="Benchmark on gzipped log")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--set", action="append", default=[], type=parse_config_override, metavar="KEY=VALUE")
+    parser.add_argument("--script-log", default=os.devnull, help="Where to write log of report generation")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--name", default=None, help="Name of results file, current commit by default")
+    parser.add_argument("--compare", nargs=2, default=None, metavar=("BASE", "NEW"), help="Compare two results")
+    args = parser.parse_args()
+    logging.basicConfig(filename=args.script_log, level=logging.INFO)
+
+    if args.compare is not None:
+        print_comparison(*args.compare)
+    else:
+        result = run_report_benchmark(
+            lines=args.lines,
+            urls=args.urls,
+            distribution=args.distribution,
+            error_rate=args.error_rate,
+            is_gzip=args.gz,
+            repeat=args.repeat,
+            config_overrides=dict(args.set)
+        )
+        os.makedirs(args.results_dir, exist_ok=True)
+        results_path = os.path.join(args.results_dir, f"{args.name or result['commit']}.json")
+        with open(results_path, "w", encoding="utf-8") as results_file:
+            json.dump(result, results_file, indent=2)
+
+        for stage, duration in result["best"]["stages"].items():
+            print(f"{stage:<10}{duration:>10.3f}s")
+        print(f"{'lines/s':<10}{result['best']['lines_per_sec']:>10.0f}")
+        print(f"Results are saved to {results_path}")
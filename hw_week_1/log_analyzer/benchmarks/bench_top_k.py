@@ -0,0 +1,97 @@
+"""
+Compares calculation of report stats with full sort of all urls
+and with heap selection of top urls for different url cardinalities.
+Run from log_analyzer directory:
+
+    python -m benchmarks.bench_top_k --cardinalities 10000 100000 1000000
+"""
+import time
+from argparse import ArgumentParser
+from statistics import median
+from typing import Dict, List, Union
+
+from aggregation import LogAggregate
+from benchmarks.synthetic import generate_requests
+from log_analyzer import (
+    NUM_SIGNS_FOR_STATS,
+    REPORT_PERCENTILES,
+    calculate_url_stats_from_aggregate,
+    prepare_stats_for_json
+)
+from models import Config, SingleLogParserResult
+from sketches import count_sorted_values_in_buckets, quantile_of_sorted
+
+
+def calculate_url_stats_with_full_sort(aggregate: LogAggregate, cfg: Config) -> List[Dict[str, Union[int, float]]]:
+
+    """
+    Previous implementation: stats are calculated for every url, then all urls are sorted
+    """
+
+    result_by_url = dict()
+    for url, url_aggregator in aggregate.url_aggregators.items():
+        time_durations = url_aggregator.durations
+        result_by_url[url] = {
+            "count": len(time_durations),
+            "count_perc": round(100 * len(time_durations) / aggregate.num_requests, NUM_SIGNS_FOR_STATS),
+            "time_sum": round(sum(time_durations), NUM_SIGNS_FOR_STATS),
+            "time_perc": round(100 * sum(time_durations) / aggregate.all_requests_time, NUM_SIGNS_FOR_STATS),
+            "time_avg": round(sum(time_durations) / len(time_durations), NUM_SIGNS_FOR_STATS),
+            "time_max": round(max(time_durations), NUM_SIGNS_FOR_STATS),
+            "time_med": round(median(time_durations), NUM_SIGNS_FOR_STATS),
+            "time_hist": count_sorted_values_in_buckets(sorted(time_durations))
+        }
+        for percentile in REPORT_PERCENTILES:
+            result_by_url[url][f"time_p{percentile}"] = round(
+                quantile_of_sorted(sorted(time_durations), percentile / 100),
+                NUM_SIGNS_FOR_STATS
+            )
+
+    url_stats = dict(
+        sorted(
+            result_by_url.items(),
+            key=lambda url_stats_: url_stats_[1]["time_sum"],
+            reverse=True
+        )[:cfg.report_size]
+    )
+
+    return prepare_stats_for_json(url_stats=url_stats)
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--cardinalities", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lines-per-url", type=int, default=3)
+    parser.add_argument("--report-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    cfg = Config(
+        report_size=args.report_size,
+        report_dir="./reports",
+        log_dir="./nginx_logs",
+        log_file=None,
+        failures_percent_threshold=50.0
+    )
+
+    print(f"{'urls':>10}{'full sort, s':>14}{'top-k, s':>10}{'speedup':>9}")
+    for num_urls in args.cardinalities:
+        aggregate = LogAggregate()
+        aggregate.add_parsed_lines(
+            SingleLogParserResult(url=url, time=duration, is_failed=False)
+            for url, duration in generate_requests(num_lines=num_urls * args.lines_per_url, num_urls=num_urls)
+        )
+
+        started_at = time.perf_counter()
+        full_sort_stats = calculate_url_stats_with_full_sort(aggregate=aggregate, cfg=cfg)
+        full_sort_elapsed = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        top_k_stats = calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=cfg)
+        top_k_elapsed = time.perf_counter() - started_at
+
+        assert full_sort_stats == top_k_stats
+        print(
+            f"{len(aggregate.url_aggregators):>10}{full_sort_elapsed:>14.3f}"
+            f"{top_k_elapsed:>10.3f}{full_sort_elapsed / top_k_elapsed:>9.1f}"
+        )
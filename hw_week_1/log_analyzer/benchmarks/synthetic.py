@@ -0,0 +1,152 @@
+"""
+Generator of synthetic nginx logs for benchmarks.
+Could be used from command line to write log files like nginx-access-ui.log-YYYYMMDD(.gz):
+
+    python -m benchmarks.synthetic --log-dir ./nginx_logs/synthetic --date 20170630 --lines 1000000 --gz
+"""
+import datetime
+import gzip
+import os
+import random
+from argparse import ArgumentParser
+from typing import Callable, Dict, Iterator, NoReturn, Tuple
+
+LOG_LINE_TEMPLATE = (
+    '1.196.116.32 -  - [29/Jun/2017:03:50:22 +0300] "GET {url} HTTP/1.1" 200 927 "-" '
+    '"Lynx/2.8.8dev.9 libwww-FM/2.14 SSL-MM/1.4.1 GNUTLS/2.10.5" "-" '
+    '"1498697422-2190034393-4708-9752759" "dc7161be3" {duration:.3f}\n'
+)
+# line cut right before url, both parsers fail on it
+MALFORMED_LOG_LINE = '1.196.116.32 -  - [29/Jun/2017:03:50:22 +0300] "GET\n'
+LOG_FILE_NAME_TEMPLATE = "nginx-access-ui.log-{date}{extension}"
+
+LOGNORMAL_DISTRIBUTION = "lognormal"
+EXPONENTIAL_DISTRIBUTION = "exponential"
+PARETO_DISTRIBUTION = "pareto"
+
+DURATION_DISTRIBUTIONS: Dict[str, Callable[[random.Random], float]] = {
+    LOGNORMAL_DISTRIBUTION: lambda random_gen: random_gen.lognormvariate(-1.5, 1.0),
+    EXPONENTIAL_DISTRIBUTION: lambda random_gen: random_gen.expovariate(5.0),
+    # heavy tail: most requests are fast, some are very slow
+    PARETO_DISTRIBUTION: lambda random_gen: 0.05 * random_gen.paretovariate(1.5)
+}
+
+
+def generate_requests(num_lines: int,
+                      num_urls: int,
+                      seed: int = 42,
+                      duration_distribution: str = LOGNORMAL_DISTRIBUTION) -> Iterator[Tuple[str, float]]:
+
+    """
+    Generates synthetic requests with skewed popularity of urls
+    :param num_lines: number of requests
+    :param num_urls: number of unique urls
+    :param seed: seed of random generator
+    :param duration_distribution: distribution of request durations: lognormal, exponential or pareto
+    :return: generator of requests (url, duration)
+    """
+
+    random_gen = random.Random(seed)
+    generate_duration = DURATION_DISTRIBUTIONS[duration_distribution]
+    for _ in range(num_lines):
+        url_id = int(num_urls ** random_gen.random()) - 1
+        yield f"/api/v2/banner/{url_id}", round(generate_duration(random_gen), 3)
+
+
+def generate_log_lines(num_lines: int,
+                       num_urls: int,
+                       seed: int = 42,
+                       duration_distribution: str = LOGNORMAL_DISTRIBUTION,
+                       error_rate: float = 0.0) -> Iterator[str]:
+
+    """
+    Generates synthetic lines of nginx log
+    :param num_lines: number of lines
+    :param num_urls: number of unique urls
+    :param seed: seed of random generator
+    :param duration_distribution: distribution of request durations
+    :param error_rate: share of malformed lines
+    :return: generator of log lines
+    """
+
+    errors_random_gen = random.Random(seed + 1)
+    requests_gen = generate_requests(
+        num_lines=num_lines,
+        num_urls=num_urls,
+        seed=seed,
+        duration_distribution=duration_distribution
+    )
+    for url, duration in requests_gen:
+        if error_rate and errors_random_gen.random() < error_rate:
+            yield MALFORMED_LOG_LINE
+        else:
+            yield LOG_LINE_TEMPLATE.format(url=url, duration=duration)
+
+
+def write_log_file(path: str,
+                   num_lines: int,
+                   num_urls: int,
+                   seed: int = 42,
+                   duration_distribution: str = LOGNORMAL_DISTRIBUTION,
+                   error_rate: float = 0.0) -> NoReturn:
+
+    """
+    Writes synthetic nginx log file, file is gzipped if path ends with .gz
+    :param path: path to log file
+    :param num_lines: number of lines
+    :param num_urls: number of unique urls
+    :param seed: seed of random generator
+    :param duration_distribution: distribution of request durations
+    :param error_rate: share of malformed lines
+    """
+
+    log_file_opener = gzip.open if path.endswith(".gz") else open
+    with log_file_opener(path, "wt", encoding="utf-8") as log_file:
+        log_file.writelines(generate_log_lines(
+            num_lines=num_lines,
+            num_urls=num_urls,
+            seed=seed,
+            duration_distribution=duration_distribution,
+            error_rate=error_rate
+        ))
+
+
+def make_log_file_name(log_date: datetime.date, is_gzip: bool) -> str:
+
+    """
+    Makes name of nginx log file for date
+    :param log_date: date of log
+    :param is_gzip: whether log is gzipped
+    :return: name of log file
+    """
+
+    return LOG_FILE_NAME_TEMPLATE.format(date=log_date.strftime("%Y%m%d"), extension=".gz" if is_gzip else ".log")
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--log-dir", required=True)
+    parser.add_argument("--date", default=datetime.date.today().strftime("%Y%m%d"), help="Date of log like 20170630")
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--urls", type=int, default=10_000)
+    parser.add_argument("--distribution", choices=sorted(DURATION_DISTRIBUTIONS), default=LOGNORMAL_DISTRIBUTION)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--gz", action="store_true", help="Write gzipped log")
+    args = parser.parse_args()
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    log_path = os.path.join(
+        args.log_dir,
+        make_log_file_name(log_date=datetime.datetime.strptime(args.date, "%Y%m%d").date(), is_gzip=args.gz)
+    )
+    write_log_file(
+        path=log_path,
+        num_lines=args.lines,
+        num_urls=args.urls,
+        seed=args.seed,
+        duration_distribution=args.distribution,
+        error_rate=args.error_rate
+    )
+    print(log_path)
@@ -0,0 +1,212 @@
+import datetime
+import os
+import re
+import sqlite3
+import time
+from typing import List, NoReturn, Optional
+
+from models import DateRange, LatestLogFile
+
+LOG_CATALOG_FILE_NAME = "log_catalog.sqlite"
+LOG_DATE_FORMAT = "%Y%m%d"
+LOCK_TIMEOUT_SEC = 60
+# file system updates mtime of directory with coarse clock, so file created right after scan
+# could leave mtime unchanged: mtime that is too recent is not trusted and directory is scanned next time
+DIR_MTIME_GRANULARITY_NS = 1_000_000_000
+UNTRUSTED_DIR_MTIME_NS = -1
+
+CREATE_LOG_FILES_TABLE = """
+CREATE TABLE IF NOT EXISTS log_files (
+    log_path TEXT PRIMARY KEY,
+    log_dir TEXT NOT NULL,
+    log_date TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    log_size INTEGER NOT NULL,
+    log_mtime_ns INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0
+)
+"""
+CREATE_LOG_DIR_DATE_INDEX = "CREATE INDEX IF NOT EXISTS log_files_dir_date ON log_files (log_dir, log_date, log_path)"
+CREATE_LOG_DIRS_TABLE = """
+CREATE TABLE IF NOT EXISTS log_dirs (
+    log_dir TEXT PRIMARY KEY,
+    dir_mtime_ns INTEGER NOT NULL,
+    pattern TEXT NOT NULL
+)
+"""
+
+
+class LogCatalog:
+
+    """
+    SQLite catalog of log files by directory: date from file name, path, size, mtime
+    and whether report for log is done. Directory is scanned again only when its mtime changes
+    and only new file names are matched with pattern, logs are found by index on date
+    """
+
+    def __init__(self, path: str):
+
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=LOCK_TIMEOUT_SEC)
+        with self._connection:
+            self._connection.execute(CREATE_LOG_FILES_TABLE)
+            self._connection.execute(CREATE_LOG_DIR_DATE_INDEX)
+            self._connection.execute(CREATE_LOG_DIRS_TABLE)
+
+    def __enter__(self) -> "LogCatalog":
+        return self
+
+    def __exit__(self, *exc_info) -> NoReturn:
+        self.close()
+
+    def close(self) -> NoReturn:
+        self._connection.close()
+
+    @staticmethod
+    def _row_to_log_file(row: tuple) -> LatestLogFile:
+        log_path, log_date, extension = row
+        return LatestLogFile(
+            path=log_path,
+            date_of_creation=datetime.datetime.strptime(log_date, LOG_DATE_FORMAT),
+            extension=extension
+        )
+
+    def refresh(self, log_dir: str, log_file_pattern: re.Pattern) -> bool:
+
+        """
+        Updates catalog of log directory if directory was changed since the last refresh
+        :param log_dir: directory with log files
+        :param log_file_pattern: pattern for file name regular expression, first group is date of log
+        :return: whether directory was scanned
+        """
+
+        dir_mtime_ns = os.stat(log_dir).st_mtime_ns
+        state = self._connection.execute(
+            "SELECT dir_mtime_ns, pattern FROM log_dirs WHERE log_dir = ?",
+            (log_dir,)
+        ).fetchone()
+        if state == (dir_mtime_ns, log_file_pattern.pattern):
+            return False
+
+        with self._connection:
+            if state is not None and state[1] != log_file_pattern.pattern:
+                self._connection.execute("DELETE FROM log_files WHERE log_dir = ?", (log_dir,))
+            known_paths = {
+                log_path for log_path, in self._connection.execute(
+                    "SELECT log_path FROM log_files WHERE log_dir = ?",
+                    (log_dir,)
+                )
+            }
+
+            new_rows = list()
+            existing_paths = set()
+            for file in os.scandir(log_dir):
+                log_path = os.path.join(log_dir, file.name)
+                existing_paths.add(log_path)
+                if log_path in known_paths:
+                    continue
+
+                log_pattern_matches = re.search(log_file_pattern, file.name)
+                if not log_pattern_matches:
+                    continue
+                log_date = log_pattern_matches.group(1)
+                try:
+                    datetime.datetime.strptime(log_date, LOG_DATE_FORMAT)
+                except ValueError:
+                    continue
+                file_stat = file.stat()
+                new_rows.append((
+                    log_path,
+                    log_dir,
+                    log_date,
+                    os.path.splitext(log_path)[1],
+                    file_stat.st_size,
+                    file_stat.st_mtime_ns
+                ))
+
+            self._connection.executemany(
+                "INSERT INTO log_files (log_path, log_dir, log_date, extension, log_size, log_mtime_ns) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                new_rows
+            )
+            self._connection.executemany(
+                "DELETE FROM log_files WHERE log_path = ?",
+                ((log_path,) for log_path in known_paths - existing_paths)
+            )
+            if time.time_ns() - dir_mtime_ns < DIR_MTIME_GRANULARITY_NS:
+                dir_mtime_ns = UNTRUSTED_DIR_MTIME_NS
+            self._connection.execute(
+                "INSERT OR REPLACE INTO log_dirs (log_dir, dir_mtime_ns, pattern) VALUES (?, ?, ?)",
+                (log_dir, dir_mtime_ns, log_file_pattern.pattern)
+            )
+
+        return True
+
+    def find_latest_log(self, log_dir: str) -> Optional[LatestLogFile]:
+
+        """
+        Finds log with latest date
+        :param log_dir: directory with log files
+        :return: latest log file or None if there are no logs
+        """
+
+        row = self._connection.execute(
+            "SELECT log_path, log_date, extension FROM log_files "
+            "WHERE log_dir = ? ORDER BY log_date DESC, log_path DESC LIMIT 1",
+            (log_dir,)
+        ).fetchone()
+
+        return self._row_to_log_file(row) if row is not None else None
+
+    def find_logs_in_range(self, log_dir: str, date_range: DateRange) -> List[LatestLogFile]:
+
+        """
+        Finds logs with dates from date range
+        :param log_dir: directory with log files
+        :param date_range: range of log dates
+        :return: log files ordered by date
+        """
+
+        rows = self._connection.execute(
+            "SELECT log_path, log_date, extension FROM log_files "
+            "WHERE log_dir = ? AND log_date BETWEEN ? AND ? ORDER BY log_date, log_path",
+            (log_dir, date_range.date_from.strftime(LOG_DATE_FORMAT), date_range.date_to.strftime(LOG_DATE_FORMAT))
+        )
+
+        return [self._row_to_log_file(row) for row in rows]
+
+    def mark_processed(self, log_file: LatestLogFile) -> NoReturn:
+
+        """
+        Marks that report for log is done, remembers size and mtime of log
+        :param log_file: log file with done report
+        """
+
+        file_stat = os.stat(log_file.path)
+        with self._connection:
+            self._connection.execute(
+                "UPDATE log_files SET processed = 1, log_size = ?, log_mtime_ns = ? WHERE log_path = ?",
+                (file_stat.st_size, file_stat.st_mtime_ns, log_file.path)
+            )
+
+    def is_processed(self, log_file: LatestLogFile) -> bool:
+
+        """
+        Checks if report for log is done and log was not changed since then
+        :param log_file: log file from catalog
+        :return: whether log is processed
+        """
+
+        row = self._connection.execute(
+            "SELECT log_size, log_mtime_ns, processed FROM log_files WHERE log_path = ?",
+            (log_file.path,)
+        ).fetchone()
+        if row is None or not row[2]:
+            return False
+
+        try:
+            file_stat = os.stat(log_file.path)
+        except FileNotFoundError:
+            return False
+
+        return (file_stat.st_size, file_stat.st_mtime_ns) == row[:2]
@@ -0,0 +1,470 @@
+import math
+from array import array
+from statistics import median
+from typing import Dict, Iterable, List, NoReturn, Optional
+
+from models import SingleLogParserResult
+from normalization import UrlNormalizer
+from sketches import LATENCY_HISTOGRAM_BOUNDS, count_sorted_values_in_buckets, quantile_of_sorted, sum_in_order
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PYTHON_BACKEND = "python"
+NUMPY_BACKEND = "numpy"
+COMPACT_BACKEND = "compact"
+
+
+class ColumnarUrlStats:
+
+    """
+    Calculated stats of request durations for single url
+    with the same interface as url aggregators.
+    Median, percentiles and histogram are calculated only when requested
+    from durations of url grouped by aggregate, durations are sorted once
+    """
+
+    __slots__ = ("count", "time_sum", "time_max", "url_id", "aggregate", "_sorted_durations")
+
+    def __init__(self, count: int, time_sum: float, time_max: float, url_id: int, aggregate: "ColumnarLogAggregate"):
+
+        self.count = count
+        self.time_sum = time_sum
+        self.time_max = time_max
+        self.url_id = url_id
+        self.aggregate = aggregate
+        self._sorted_durations: Optional["np.ndarray"] = None
+
+    def get_sorted_durations(self) -> "np.ndarray":
+        if self._sorted_durations is None:
+            self._sorted_durations = np.sort(self.aggregate.get_url_durations(url_id=self.url_id))
+        return self._sorted_durations
+
+    def median(self) -> float:
+
+        """
+        Calculates median the same way as statistics.median
+        :return: median of request durations
+        """
+
+        sorted_durations = self.get_sorted_durations()
+
+        return float((sorted_durations[(self.count - 1) // 2] + sorted_durations[self.count // 2]) / 2)
+
+    def quantile(self, q: float) -> float:
+        return float(quantile_of_sorted(self.get_sorted_durations(), q))
+
+    def histogram(self) -> List[int]:
+
+        """
+        Counts request durations in buckets of latency histogram the same way as LatencyHistogram
+        :return: counts of durations by bucket
+        """
+
+        bucket_ends = np.searchsorted(self.get_sorted_durations(), LATENCY_HISTOGRAM_BOUNDS, side="right")
+
+        return np.diff(bucket_ends, prepend=0, append=self.count).tolist()
+
+
+class ColumnarUrlAppender:
+
+    """
+    Appends request durations of single url to columns of aggregate
+    """
+
+    __slots__ = ("url_id", "url_ids", "durations")
+
+    def __init__(self, url_id: int, url_ids: array, durations: array):
+
+        self.url_id = url_id
+        self.url_ids = url_ids
+        self.durations = durations
+
+    def add(self, duration: float) -> NoReturn:
+        self.url_ids.append(self.url_id)
+        self.durations.append(duration)
+
+
+class ColumnarLogAggregate:
+
+    """
+    Aggregate of parsed log lines kept as columns:
+    urls are interned into table of ids, url ids and request durations of lines
+    are appended to arrays. Count, sum and max by url are calculated at once with vectorized
+    numpy operations, medians are calculated only for requested urls. Sums are accumulated
+    in order of lines and medians are taken from sorted durations, so stats are the same
+    as with exact aggregator. Merged columns keep order of lines, so sums are calculated
+    from all durations after merge rather than from partial sums of merged aggregates
+    """
+
+    def __init__(self, url_normalizer: Optional[UrlNormalizer] = None):
+
+        if np is None:
+            raise ImportError("numpy is required for numpy aggregation backend")
+
+        self.url_aggregator_factory = None
+        self.url_normalizer = url_normalizer
+        self.num_requests = 0
+        self.num_failures = 0
+        self.all_requests_time = 0
+        self.num_evicted_urls = 0
+        self.urls: List[str] = list()
+        self.url_ids_by_url: Dict[str, int] = dict()
+        self.url_ids = array("q")
+        self.durations = array("d")
+        self._url_appenders: Dict[str, ColumnarUrlAppender] = dict()
+        self._url_stats: Dict[str, ColumnarUrlStats] = dict()
+        self._num_durations_in_stats = 0
+        self._grouped_durations: Optional["np.ndarray"] = None
+        self._group_bounds: Optional["np.ndarray"] = None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_url_appenders"] = dict()
+        state["_url_stats"] = dict()
+        state["_num_durations_in_stats"] = 0
+        state["_grouped_durations"] = None
+        state["_group_bounds"] = None
+        return state
+
+    @property
+    def is_plain(self) -> bool:
+        return False
+
+    def _get_url_id(self, url: str) -> int:
+
+        """
+        Returns id of url adding it to table of urls if needed
+        :param url: url from log line
+        :return: id of url
+        """
+
+        url_id = self.url_ids_by_url.get(url)
+        if url_id is None:
+            url_id = self.url_ids_by_url[url] = len(self.urls)
+            self.urls.append(url)
+
+        return url_id
+
+    def get_url_aggregator(self, url: str) -> ColumnarUrlAppender:
+
+        """
+        Returns appender of request durations for url
+        :param url: url from log line
+        :return: appender for normalized url
+        """
+
+        if self.url_normalizer is not None:
+            url = self.url_normalizer(url)
+
+        url_appender = self._url_appenders.get(url)
+        if url_appender is None:
+            url_appender = self._url_appenders[url] = ColumnarUrlAppender(
+                url_id=self._get_url_id(url),
+                url_ids=self.url_ids,
+                durations=self.durations
+            )
+
+        return url_appender
+
+    def add_parsed_lines(self, parsed_line_gen: Iterable[SingleLogParserResult]) -> NoReturn:
+
+        """
+        Adds results of line parsing to aggregate
+        :param parsed_line_gen: generator of parsed lines result
+        """
+
+        url_ids = self.url_ids
+        durations = self.durations
+        url_normalizer = self.url_normalizer
+
+        for single_line_result in parsed_line_gen:
+
+            self.num_requests += 1
+
+            if single_line_result.is_failed:
+                self.num_failures += 1
+                continue
+
+            curr_url = single_line_result.url
+            if url_normalizer is not None:
+                curr_url = url_normalizer(curr_url)
+
+            url_ids.append(self._get_url_id(curr_url))
+            durations.append(single_line_result.time)
+            self.all_requests_time += single_line_result.time
+
+    def merge(self, other: "ColumnarLogAggregate") -> NoReturn:
+
+        """
+        Merges aggregate of the following part of log into current one
+        :param other: aggregate to merge
+        """
+
+        self.num_requests += other.num_requests
+        self.num_failures += other.num_failures
+        self.all_requests_time += other.all_requests_time
+
+        if not other.urls:
+            return
+
+        other_to_self_ids = np.fromiter(
+            (self._get_url_id(url) for url in other.urls),
+            dtype=np.int64,
+            count=len(other.urls)
+        )
+        other_url_ids = np.frombuffer(other.url_ids, dtype=np.int64)
+        self.url_ids.frombytes(other_to_self_ids[other_url_ids].tobytes())
+        self.durations.extend(other.durations)
+
+    def _calculate_url_stats(self) -> Dict[str, ColumnarUrlStats]:
+
+        """
+        Calculates count, sum and max of request durations by url
+        :return: stats by url
+        """
+
+        url_ids = np.frombuffer(self.url_ids, dtype=np.int64)
+        durations = np.frombuffer(self.durations, dtype=np.float64)
+        num_urls = len(self.urls)
+
+        counts = np.bincount(url_ids, minlength=num_urls)
+        # bincount adds weights one by one in order of lines like sum_in_order of other backends
+        sums = np.bincount(url_ids, weights=durations, minlength=num_urls)
+        maxes = np.full(num_urls, -np.inf)
+        np.maximum.at(maxes, url_ids, durations)
+
+        return {
+            url: ColumnarUrlStats(count=count, time_sum=time_sum, time_max=time_max, url_id=url_id, aggregate=self)
+            for url_id, (url, count, time_sum, time_max) in enumerate(
+                zip(self.urls, counts.tolist(), sums.tolist(), maxes.tolist())
+            )
+        }
+
+    def get_url_durations(self, url_id: int) -> "np.ndarray":
+
+        """
+        Returns request durations of url. On the first call after change of aggregate
+        durations are grouped by url id, so that durations of every url are contiguous
+        :param url_id: id of url
+        :return: durations of url in arbitrary order
+        """
+
+        if self._grouped_durations is None or len(self._grouped_durations) != len(self.durations):
+            url_ids = np.frombuffer(self.url_ids, dtype=np.int64)
+            if len(self.urls) <= np.iinfo(np.int32).max:
+                # sorting of narrower ids is faster
+                url_ids = url_ids.astype(np.int32)
+            counts = np.bincount(url_ids, minlength=len(self.urls))
+            self._group_bounds = np.concatenate(([0], np.cumsum(counts)))
+            self._grouped_durations = np.frombuffer(self.durations, dtype=np.float64)[np.argsort(url_ids)]
+
+        return self._grouped_durations[self._group_bounds[url_id]:self._group_bounds[url_id + 1]]
+
+    @property
+    def url_aggregators(self) -> Dict[str, ColumnarUrlStats]:
+
+        """
+        Stats by url, recalculated only if durations were added since the last calculation
+        """
+
+        if self._num_durations_in_stats != len(self.durations):
+            self._url_stats = self._calculate_url_stats()
+            self._num_durations_in_stats = len(self.durations)
+
+        return self._url_stats
+
+
+class CompactUrlStats:
+
+    """
+    Stats of request durations for single url read from arrays of compact aggregate
+    with the same interface as url aggregators
+    """
+
+    __slots__ = ("url_id", "aggregate")
+
+    def __init__(self, url_id: int, aggregate: "CompactLogAggregate"):
+
+        self.url_id = url_id
+        self.aggregate = aggregate
+
+    @property
+    def count(self) -> int:
+        return self.aggregate.counts[self.url_id]
+
+    @property
+    def time_sum(self) -> float:
+        return sum_in_order(self.aggregate.durations_by_url[self.url_id])
+
+    @property
+    def time_max(self) -> float:
+        return self.aggregate.maxes[self.url_id]
+
+    def _sort_durations(self) -> List[float]:
+
+        """
+        Sorts copy of durations of url, durations of aggregate keep order of lines for sum
+        :return: sorted durations
+        """
+
+        return sorted(self.aggregate.durations_by_url[self.url_id])
+
+    def add(self, duration: float) -> NoReturn:
+        self.aggregate.add_url_duration(url_id=self.url_id, duration=duration)
+
+    def median(self) -> float:
+        return median(self.aggregate.durations_by_url[self.url_id])
+
+    def quantile(self, q: float) -> float:
+        return quantile_of_sorted(self._sort_durations(), q)
+
+    def histogram(self) -> List[int]:
+        return count_sorted_values_in_buckets(self._sort_durations())
+
+
+class CompactLogAggregate:
+
+    """
+    Aggregate of parsed log lines without python objects per request and per url:
+    urls are interned into table of ids, counts and maxes are kept in arrays indexed by url id
+    and durations of every url are kept in its own array of doubles in order of lines.
+    Sums are calculated from durations the same way as with exact aggregator,
+    so stats are the same, records with stats by url are created only when requested
+    """
+
+    def __init__(self, url_normalizer: Optional[UrlNormalizer] = None):
+
+        self.url_aggregator_factory = None
+        self.url_normalizer = url_normalizer
+        self.num_requests = 0
+        self.num_failures = 0
+        self.all_requests_time = 0
+        self.num_evicted_urls = 0
+        self.urls: List[str] = list()
+        self.url_ids_by_url: Dict[str, int] = dict()
+        self.counts = array("q")
+        self.maxes = array("d")
+        self.durations_by_url: List[array] = list()
+        self._url_stats: Dict[str, CompactUrlStats] = dict()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_url_stats"] = dict()
+        return state
+
+    @property
+    def is_plain(self) -> bool:
+        return False
+
+    def _get_url_id(self, url: str) -> int:
+
+        """
+        Returns id of url adding it to table of urls with empty stats if needed
+        :param url: url from log line
+        :return: id of url
+        """
+
+        url_id = self.url_ids_by_url.get(url)
+        if url_id is None:
+            url_id = self.url_ids_by_url[url] = len(self.urls)
+            self.urls.append(url)
+            self.counts.append(0)
+            self.maxes.append(-math.inf)
+            self.durations_by_url.append(array("d"))
+
+        return url_id
+
+    def add_url_duration(self, url_id: int, duration: float) -> NoReturn:
+
+        self.counts[url_id] += 1
+        if duration > self.maxes[url_id]:
+            self.maxes[url_id] = duration
+        self.durations_by_url[url_id].append(duration)
+
+    def get_url_aggregator(self, url: str) -> CompactUrlStats:
+
+        """
+        Returns stats record for url creating url if needed, durations are added through it
+        :param url: url from log line
+        :return: stats of normalized url
+        """
+
+        if self.url_normalizer is not None:
+            url = self.url_normalizer(url)
+
+        url_stats = self._url_stats.get(url)
+        if url_stats is None:
+            url_stats = self._url_stats[url] = CompactUrlStats(url_id=self._get_url_id(url), aggregate=self)
+
+        return url_stats
+
+    def add_parsed_lines(self, parsed_line_gen: Iterable[SingleLogParserResult]) -> NoReturn:
+
+        """
+        Adds results of line parsing to aggregate
+        :param parsed_line_gen: generator of parsed lines result
+        """
+
+        url_ids_by_url = self.url_ids_by_url
+        counts, maxes = self.counts, self.maxes
+        durations_by_url = self.durations_by_url
+        url_normalizer = self.url_normalizer
+
+        for single_line_result in parsed_line_gen:
+
+            self.num_requests += 1
+
+            if single_line_result.is_failed:
+                self.num_failures += 1
+                continue
+
+            curr_url = single_line_result.url
+            if url_normalizer is not None:
+                curr_url = url_normalizer(curr_url)
+
+            url_id = url_ids_by_url.get(curr_url)
+            if url_id is None:
+                url_id = self._get_url_id(curr_url)
+
+            duration = single_line_result.time
+            counts[url_id] += 1
+            if duration > maxes[url_id]:
+                maxes[url_id] = duration
+            durations_by_url[url_id].append(duration)
+            self.all_requests_time += duration
+
+    def merge(self, other: "CompactLogAggregate") -> NoReturn:
+
+        """
+        Merges aggregate of the following part of log into current one
+        :param other: aggregate to merge
+        """
+
+        self.num_requests += other.num_requests
+        self.num_failures += other.num_failures
+        self.all_requests_time += other.all_requests_time
+
+        for other_url_id, url in enumerate(other.urls):
+            url_id = self._get_url_id(url)
+            self.counts[url_id] += other.counts[other_url_id]
+            self.maxes[url_id] = max(self.maxes[url_id], other.maxes[other_url_id])
+            self.durations_by_url[url_id].extend(other.durations_by_url[other_url_id])
+
+    @property
+    def url_aggregators(self) -> Dict[str, CompactUrlStats]:
+
+        """
+        Stats by url in order of url ids, records are created only for urls added since the last request
+        """
+
+        if len(self._url_stats) != len(self.urls):
+            url_stats = self._url_stats
+            self._url_stats = {
+                url: url_stats.get(url) or CompactUrlStats(url_id=url_id, aggregate=self)
+                for url_id, url in enumerate(self.urls)
+            }
+
+        return self._url_stats
@@ -0,0 +1,144 @@
+import logging
+import math
+from contextlib import closing
+from itertools import islice
+from statistics import NormalDist
+from typing import Callable, Iterable, NoReturn, Optional
+
+from aggregation import LogAggregate
+from models import LatestLogFile
+from parsers import aggregate_binary_lines, iter_binary_log_lines
+
+FAILURES_CHECK_INTERVAL_LINES = 10_000
+
+
+class FailuresPercentageError(Exception):
+    pass
+
+
+def wilson_lower_bound(num_failures: int, num_lines: int, z: float) -> float:
+
+    """
+    Calculates lower bound of Wilson score interval for share of failed lines
+    :param num_failures: number of failed lines in sample
+    :param num_lines: number of lines in sample
+    :param z: quantile of standard normal distribution for confidence level
+    :return: lower confidence bound of failures share from 0 to 1
+    """
+
+    if not num_lines:
+        return 0.0
+
+    failures_share = num_failures / num_lines
+    z_squared = z * z
+    center = failures_share + z_squared / (2 * num_lines)
+    margin = z * math.sqrt(failures_share * (1 - failures_share) / num_lines + z_squared / (4 * num_lines ** 2))
+
+    return max(0.0, (center - margin) / (1 + z_squared / num_lines))
+
+
+class FailureRateMonitor:
+
+    """
+    Checks share of failed lines while log is parsed.
+    After warm-up sample parsing is aborted as soon as lower confidence bound
+    of failures percentage exceeds threshold, so that bad log is not parsed till the end
+    only to fail the final check of failures percentage
+    """
+
+    def __init__(self, threshold_percent: float, warmup_lines: int, confidence: float):
+
+        if not 0 < confidence < 1:
+            raise ValueError(f"Confidence should be between 0 and 1, not {confidence}")
+
+        self.threshold_percent = threshold_percent
+        self.warmup_lines = warmup_lines
+        self.confidence = confidence
+        self._z = NormalDist().inv_cdf(confidence)
+
+    def get_num_lines_to_next_check(self, num_lines: int) -> int:
+
+        """
+        Calculates number of lines to parse before the next check:
+        warm-up sample is parsed as one chunk, then lines are checked every FAILURES_CHECK_INTERVAL_LINES
+        :param num_lines: number of lines parsed so far
+        :return: number of lines to parse
+        """
+
+        if num_lines < self.warmup_lines:
+            return self.warmup_lines - num_lines
+
+        return FAILURES_CHECK_INTERVAL_LINES
+
+    def check(self, aggregate: LogAggregate) -> NoReturn:
+
+        """
+        Checks failures percentage of lines added to aggregate
+        :param aggregate: aggregate of parsed lines
+        """
+
+        num_lines, num_failures = aggregate.num_requests, aggregate.num_failures
+        if num_lines < self.warmup_lines or not num_failures:
+            return
+
+        lower_bound_percent = 100 * wilson_lower_bound(num_failures=num_failures, num_lines=num_lines, z=self._z)
+        if lower_bound_percent > self.threshold_percent:
+            logging.error(
+                "Failures percentage limit exceeded after %d lines: threshold is %f, errors percentage is %f, "
+                "its lower bound with confidence %f is %f",
+                num_lines,
+                self.threshold_percent,
+                100 * num_failures / num_lines,
+                self.confidence,
+                lower_bound_percent
+            )
+            raise FailuresPercentageError
+
+
+def add_lines_checking_failures(lines: Iterable,
+                                add_lines: Callable[[Iterable], NoReturn],
+                                aggregate: LogAggregate,
+                                failure_monitor: Optional[FailureRateMonitor]) -> NoReturn:
+
+    """
+    Adds lines to aggregate by chunks checking failures percentage after every chunk
+    :param lines: lines of log or results of their parsing
+    :param add_lines: function adding lines to aggregate
+    :param aggregate: aggregate lines are added to
+    :param failure_monitor: monitor of failures percentage, lines are added at once if it is None
+    """
+
+    if failure_monitor is None:
+        add_lines(lines)
+        return
+
+    lines_iter = iter(lines)
+    while True:
+        num_lines_before = aggregate.num_requests
+        add_lines(islice(lines_iter, failure_monitor.get_num_lines_to_next_check(num_lines=num_lines_before)))
+        if aggregate.num_requests == num_lines_before:
+            break
+        failure_monitor.check(aggregate)
+
+
+def preflight_log_file(log_file: LatestLogFile, num_lines: int, failure_monitor: FailureRateMonitor) -> NoReturn:
+
+    """
+    Parses first lines of log and checks their failures percentage
+    before the whole log is parsed
+    :param log_file: file with logs to check
+    :param num_lines: number of first lines to check
+    :param failure_monitor: monitor of failures percentage
+    """
+
+    sample_aggregate = LogAggregate()
+    with closing(iter_binary_log_lines(log_file=log_file)) as lines_gen:
+        aggregate_binary_lines(lines=islice(lines_gen, num_lines), aggregate=sample_aggregate)
+
+    logging.info(
+        "Pre-flight check of %d first lines of %s: %d failed",
+        sample_aggregate.num_requests,
+        log_file.path,
+        sample_aggregate.num_failures
+    )
+    failure_monitor.check(sample_aggregate)
@@ -1,17 +1,23 @@
 import datetime
 import gzip
+import heapq
 import json
 import logging
 import os
 import re
+import signal
+import tempfile
 from argparse import ArgumentParser, FileType
+from cProfile import Profile
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
-from statistics import median
+from functools import lru_cache, partial
 from string import Template
 from typing import (
     Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
     NoReturn,
     Optional,
@@ -19,25 +25,66 @@ from typing import (
     Union
 )
 
-from models import Config, LatestLogFile, SingleLogParserResult
+from aggregation import EXACT_AGGREGATOR, SKETCH_AGGREGATOR, LogAggregate, UrlAggregator, get_url_aggregator_factory
+from catalog import LOG_CATALOG_FILE_NAME, LogCatalog
+from columnar import COMPACT_BACKEND, NUMPY_BACKEND, PYTHON_BACKEND, ColumnarLogAggregate, CompactLogAggregate
+from failures import FailureRateMonitor, FailuresPercentageError, add_lines_checking_failures, preflight_log_file
+from metrics import AGGREGATE_STAGE, FIND_STAGE, RENDER_STAGE, STATS_STAGE, RunMetrics, get_metrics_file_name
+from models import Config, DateRange, LatestLogFile, SingleLogParserResult
+from normalization import UrlNormalizer
+from parallel import aggregate_log_file_parallel, merge_in_order
+from parsers import (
+    aggregate_binary_lines,
+    aggregate_lines,
+    iter_binary_log_lines,
+    parse_log_line,
+    read_log_lines_from_offset
+)
+from pipeline import DEFAULT_GZIP_READER, EXTERNAL_GZIP_READER, PIPELINED_GZIP_READER, aggregate_gzip_log_pipelined
+from sketches import LATENCY_HISTOGRAM_BOUNDS
+from snapshots import SNAPSHOTS_FILE_NAME, LogSnapshot, SnapshotStore
 
 CONFIG = {
     "REPORT_SIZE": 1000,
     "REPORT_DIR": "./reports",
     "LOG_DIR": "./nginx_logs",
     "LOG_FILE": "./script_logs/test.log",
-    "FAILURES_PERCENT_THRESHOLD": 50.0
+    "FAILURES_PERCENT_THRESHOLD": 50.0,
+    "WORKERS": 1,
+    "AGGREGATOR": "exact",
+    "MEDIAN_RELATIVE_ERROR": 0.01,
+    "PARSER": "default",
+    "INCREMENTAL": False,
+    "STRIP_QUERY_STRING": False,
+    "COLLAPSE_URL_IDS": False,
+    "MAX_TRACKED_URLS": None,
+    "AGGREGATION_BACKEND": "python",
+    "GZIP_READER": "default",
+    "WRITE_METRICS": False,
+    "WATCH_POLL_INTERVAL_SEC": 1.0,
+    "WATCH_RENDER_INTERVAL_SEC": 10.0,
+    "USE_LOG_CATALOG": False,
+    "FAILURES_WARMUP_LINES": None,
+    "FAILURES_CONFIDENCE": 0.99,
+    "PREFLIGHT_LINES": None
 }
 
 DATE_FORMAT_IN_LOG_FILE_NAME = "%Y%m%d"
 DATE_FORMAT_FOR_REPORT = "%Y.%m.%d"
+DATE_FORMAT_FOR_RANGE = "%Y-%m-%d"
+DATE_RANGE_SEPARATOR = ".."
 NUM_SIGNS_FOR_STATS = 3
+REPORT_PERCENTILES = (90, 95, 99)
 
-LOG_FILE_PATTERN = re.compile(r"nginx-access-ui.log-(\d{8}).(gz|log|txt)$")
+REPORT_TEMPLATE_NAME = "report.html"
+TABLE_JSON_SENTINEL = "\x00table_json\x00"
+NUM_URLS_IN_JSON_CHUNK = 1000
+REPORT_FILE_MODE = 0o644
 
+DEFAULT_PARSER = "default"
+FAST_PARSER = "fast"
 
-class FailuresPercentageError(Exception):
-    pass
+LOG_FILE_PATTERN = re.compile(r"nginx-access-ui.log-(\d{8}).(gz|log|txt)$")
 
 
 def get_config_parameters(
@@ -60,7 +107,24 @@ def get_config_parameters(
         report_dir=final_config["REPORT_DIR"],
         log_dir=final_config["LOG_DIR"],
         log_file=final_config["LOG_FILE"],
-        failures_percent_threshold=final_config["FAILURES_PERCENT_THRESHOLD"]
+        failures_percent_threshold=final_config["FAILURES_PERCENT_THRESHOLD"],
+        workers=final_config["WORKERS"],
+        aggregator=final_config["AGGREGATOR"],
+        median_relative_error=final_config["MEDIAN_RELATIVE_ERROR"],
+        parser=final_config["PARSER"],
+        incremental=final_config["INCREMENTAL"],
+        strip_query_string=final_config["STRIP_QUERY_STRING"],
+        collapse_url_ids=final_config["COLLAPSE_URL_IDS"],
+        max_tracked_urls=final_config["MAX_TRACKED_URLS"],
+        aggregation_backend=final_config["AGGREGATION_BACKEND"],
+        gzip_reader=final_config["GZIP_READER"],
+        write_metrics=final_config["WRITE_METRICS"],
+        watch_poll_interval_sec=final_config["WATCH_POLL_INTERVAL_SEC"],
+        watch_render_interval_sec=final_config["WATCH_RENDER_INTERVAL_SEC"],
+        use_log_catalog=final_config["USE_LOG_CATALOG"],
+        failures_warmup_lines=final_config["FAILURES_WARMUP_LINES"],
+        failures_confidence=final_config["FAILURES_CONFIDENCE"],
+        preflight_lines=final_config["PREFLIGHT_LINES"]
     )
 
 
@@ -96,14 +160,147 @@ def find_latest_log(log_dir: str, log_file_pattern: re.Pattern) -> Optional[Late
         )
 
 
-def get_log_file_opener(log_file: LatestLogFile) -> Callable:
+def parse_date_range(date_range: str) -> DateRange:
+
+    """
+    Parses date range like 2017-06-01..2017-06-30
+    :param date_range: range of dates with inclusive bounds
+    :return: parsed date range
+    """
+
+    date_from, separator, date_to = date_range.partition(DATE_RANGE_SEPARATOR)
+    if not separator:
+        raise ValueError(f"Date range should look like 2017-06-01{DATE_RANGE_SEPARATOR}2017-06-30")
+
+    parsed_date_range = DateRange(
+        date_from=datetime.datetime.strptime(date_from, DATE_FORMAT_FOR_RANGE).date(),
+        date_to=datetime.datetime.strptime(date_to, DATE_FORMAT_FOR_RANGE).date()
+    )
+    if parsed_date_range.date_from > parsed_date_range.date_to:
+        raise ValueError(f"Date range {date_range} is empty")
+
+    return parsed_date_range
+
+
+def get_last_days_range(num_days: int, today: datetime.date) -> DateRange:
+
+    """
+    Returns range of last days including today
+    :param num_days: number of days in range
+    :param today: last date of range
+    :return: date range
+    """
+
+    return DateRange(date_from=today - datetime.timedelta(days=num_days - 1), date_to=today)
+
+
+def find_logs_in_range(log_dir: str, log_file_pattern: re.Pattern, date_range: DateRange) -> List[LatestLogFile]:
+
+    """
+    Finds logs with dates from date range
+    :param log_dir: directory with log files
+    :param log_file_pattern: pattern for file name regular expression
+    :param date_range: range of log dates
+    :return: log files ordered by date
+    """
+
+    log_files = list()
+
+    for file in os.scandir(log_dir):
+        log_pattern_matches = re.search(log_file_pattern, file.name)
+        if log_pattern_matches:
+            creation_date = datetime.datetime.strptime(log_pattern_matches.group(1), DATE_FORMAT_IN_LOG_FILE_NAME)
+
+            if date_range.date_from <= creation_date.date() <= date_range.date_to:
+                log_file_path = os.path.join(log_dir, file.name)
+                _, file_extension = os.path.splitext(log_file_path)
+                log_files.append(LatestLogFile(
+                    path=log_file_path,
+                    date_of_creation=creation_date,
+                    extension=file_extension
+                ))
+
+    return sorted(log_files, key=lambda log_file: (log_file.date_of_creation, log_file.path))
+
+
+def open_log_catalog(cfg: Config, log_file_pattern: re.Pattern) -> LogCatalog:
+
+    """
+    Opens catalog of log directory kept in report directory and refreshes it
+    :param cfg: application config
+    :param log_file_pattern: pattern for file name regular expression
+    :return: refreshed catalog
+    """
+
+    catalog = LogCatalog(path=os.path.join(cfg.report_dir, LOG_CATALOG_FILE_NAME))
+    if catalog.refresh(log_dir=cfg.log_dir, log_file_pattern=log_file_pattern):
+        logging.info("Catalog of log directory %s is refreshed", cfg.log_dir)
+
+    return catalog
+
+
+def get_latest_log(cfg: Config, log_file_pattern: re.Pattern) -> Optional[LatestLogFile]:
+
+    """
+    Finds log with latest date in catalog of log directory or by scanning directory
+    :param cfg: application config
+    :param log_file_pattern: pattern for file name regular expression
+    :return: latest log file or None if there are no logs
+    """
+
+    if not cfg.use_log_catalog:
+        return find_latest_log(log_dir=cfg.log_dir, log_file_pattern=log_file_pattern)
+
+    with open_log_catalog(cfg=cfg, log_file_pattern=log_file_pattern) as catalog:
+        return catalog.find_latest_log(log_dir=cfg.log_dir)
+
+
+def get_logs_in_range(cfg: Config, log_file_pattern: re.Pattern, date_range: DateRange) -> List[LatestLogFile]:
+
+    """
+    Finds logs with dates from date range in catalog of log directory or by scanning directory
+    :param cfg: application config
+    :param log_file_pattern: pattern for file name regular expression
+    :param date_range: range of log dates
+    :return: log files ordered by date
+    """
+
+    if not cfg.use_log_catalog:
+        return find_logs_in_range(log_dir=cfg.log_dir, log_file_pattern=log_file_pattern, date_range=date_range)
+
+    with open_log_catalog(cfg=cfg, log_file_pattern=log_file_pattern) as catalog:
+        return catalog.find_logs_in_range(log_dir=cfg.log_dir, date_range=date_range)
+
+
+def is_report_done(cfg: Config, log_file: LatestLogFile, report_name: str) -> bool:
+
+    """
+    Checks if report for log is already done. With catalog of log directory report is done
+    only if it was rendered for log of the same size and mtime, so changed log is reported again
+    :param cfg: application config
+    :param log_file: log file to make report for
+    :param report_name: name of report for log file
+    :return: whether report is done
+    """
+
+    if not os.path.exists(report_name):
+        return False
+    if not cfg.use_log_catalog:
+        return True
+
+    with LogCatalog(path=os.path.join(cfg.report_dir, LOG_CATALOG_FILE_NAME)) as catalog:
+        return catalog.is_processed(log_file=log_file)
+
+
+def get_log_file_opener(log_file: LatestLogFile, gzip_opener: Callable = gzip.open) -> Callable:
 
     """
     Retursn write function to open file. Could be gzip.open or open
     :param log_file: latest file with nginx logs
+    :param gzip_opener: function to open gzip log with
     :return: function to open log file
     """
-    log_file_opener = gzip.open if log_file.extension == ".gz" else open
+    log_file_opener = gzip_opener if log_file.extension == ".gz" else open
 
     return log_file_opener
 
@@ -120,19 +317,309 @@ def parse_log_file(log_file: LatestLogFile,
 
     with log_file_opener(log_file.path, mode="rt", encoding="Utf-8") as analyzed_log:
         for line_ in analyzed_log:
-            line_parsing_is_failed = False
-            try:
-                logs_line = line_.split()
-                url, duration = logs_line[6], float(logs_line[-1])
-            except Exception:
-                logging.error("Failed parsing line: %s", line_)
-                url, duration = None, None
-                line_parsing_is_failed = True
-            yield SingleLogParserResult(
-                url=url,
-                time=duration,
-                is_failed=line_parsing_is_failed
+            yield parse_log_line(line_)
+
+
+def get_log_aggregate_factory(cfg: Config) -> Callable[[], LogAggregate]:
+
+    """
+    Returns factory of empty aggregates with aggregation backend, url aggregators,
+    url normalization and limit of tracked urls from config.
+    Factory could be passed to worker processes
+    :param cfg: application config
+    :return: function creating empty aggregate
+    """
+
+    url_normalizer = None
+    if cfg.strip_query_string or cfg.collapse_url_ids:
+        url_normalizer = UrlNormalizer(
+            strip_query_string=cfg.strip_query_string,
+            collapse_ids=cfg.collapse_url_ids
+        )
+
+    columnar_aggregates = {NUMPY_BACKEND: ColumnarLogAggregate, COMPACT_BACKEND: CompactLogAggregate}
+    if cfg.aggregation_backend in columnar_aggregates:
+        if cfg.aggregator != EXACT_AGGREGATOR or cfg.max_tracked_urls is not None:
+            raise ValueError(
+                f"{cfg.aggregation_backend} aggregation backend supports only {EXACT_AGGREGATOR} aggregator "
+                f"without limit of tracked urls"
             )
+        return partial(columnar_aggregates[cfg.aggregation_backend], url_normalizer=url_normalizer)
+
+    if cfg.aggregation_backend != PYTHON_BACKEND:
+        raise ValueError(f"Unknown aggregation backend {cfg.aggregation_backend}")
+
+    url_aggregator_factory = get_url_aggregator_factory(
+        aggregator_name=cfg.aggregator,
+        relative_accuracy=cfg.median_relative_error
+    )
+
+    return partial(
+        LogAggregate,
+        url_aggregator_factory=url_aggregator_factory,
+        url_normalizer=url_normalizer,
+        max_tracked_urls=cfg.max_tracked_urls
+    )
+
+
+def make_log_aggregate(cfg: Config) -> LogAggregate:
+
+    """
+    Creates empty aggregate of log lines with settings from config
+    :param cfg: application config
+    :return: empty aggregate
+    """
+
+    return get_log_aggregate_factory(cfg=cfg)()
+
+
+def get_failure_monitor(cfg: Config) -> Optional[FailureRateMonitor]:
+
+    """
+    Creates monitor of failures percentage during parsing if it is enabled in config
+    :param cfg: application config
+    :return: monitor of failures percentage or None
+    """
+
+    if cfg.failures_warmup_lines is None:
+        return None
+
+    return FailureRateMonitor(
+        threshold_percent=cfg.failures_percent_threshold,
+        warmup_lines=cfg.failures_warmup_lines,
+        confidence=cfg.failures_confidence
+    )
+
+
+def check_preflight(log_file: LatestLogFile, cfg: Config) -> NoReturn:
+
+    """
+    Checks failures percentage of first lines of log if pre-flight check is enabled in config
+    :param log_file: file with logs to check
+    :param cfg: application config
+    """
+
+    if cfg.preflight_lines:
+        preflight_log_file(
+            log_file=log_file,
+            num_lines=cfg.preflight_lines,
+            failure_monitor=FailureRateMonitor(
+                threshold_percent=cfg.failures_percent_threshold,
+                warmup_lines=0,
+                confidence=cfg.failures_confidence
+            )
+        )
+
+
+def aggregate_log_file(log_file: LatestLogFile, cfg: Config, metrics: Optional[RunMetrics] = None) -> LogAggregate:
+
+    """
+    Parses log file and aggregates its lines with parser, aggregator,
+    gzip reader and number of workers from config.
+    Time of decompression and parsing is measured when log is parsed in current process
+    :param log_file: file with logs to aggregate
+    :param cfg: application config
+    :param metrics: metrics of run to add time of decompression and parsing to
+    :return: aggregate of log file
+    """
+
+    check_preflight(log_file=log_file, cfg=cfg)
+    failure_monitor = get_failure_monitor(cfg=cfg)
+    if metrics is None:
+        metrics = RunMetrics()
+
+    if log_file.extension == ".gz" and cfg.gzip_reader in (PIPELINED_GZIP_READER, EXTERNAL_GZIP_READER):
+        logging.info(
+            "Started to parse log file %s with %s gzip reader and %d workers",
+            log_file.path,
+            cfg.gzip_reader,
+            cfg.workers
+        )
+        return aggregate_gzip_log_pipelined(
+            log_file=log_file,
+            workers=cfg.workers,
+            aggregate_factory=get_log_aggregate_factory(cfg=cfg),
+            use_fast_parser=cfg.parser == FAST_PARSER,
+            use_external_decompressor=cfg.gzip_reader == EXTERNAL_GZIP_READER,
+            failure_monitor=failure_monitor,
+            metrics=metrics
+        )
+
+    if cfg.workers > 1:
+        logging.info("Started to parse log file %s with %d workers", log_file.path, cfg.workers)
+        return aggregate_log_file_parallel(
+            log_file=log_file,
+            workers=cfg.workers,
+            aggregate_factory=get_log_aggregate_factory(cfg=cfg),
+            use_fast_parser=cfg.parser == FAST_PARSER,
+            failure_monitor=failure_monitor
+        )
+
+    aggregate = make_log_aggregate(cfg=cfg)
+
+    if cfg.parser == FAST_PARSER:
+        logging.info("Started to parse log file with fast parser: %s", log_file.path)
+        with metrics.measure_parsing():
+            add_lines_checking_failures(
+                lines=iter_binary_log_lines(log_file=log_file, gzip_opener=metrics.open_gzip),
+                add_lines=partial(aggregate_binary_lines, aggregate=aggregate),
+                aggregate=aggregate,
+                failure_monitor=failure_monitor
+            )
+        return aggregate
+
+    logging.info("Started to parse log file: %s", log_file.path)
+    parsed_line_gen = parse_log_file(
+        log_file=log_file,
+        log_file_opener=get_log_file_opener(log_file=log_file, gzip_opener=metrics.open_gzip)
+    )
+    with metrics.measure_parsing():
+        add_lines_checking_failures(
+            lines=parsed_line_gen,
+            add_lines=aggregate.add_parsed_lines,
+            aggregate=aggregate,
+            failure_monitor=failure_monitor
+        )
+
+    return aggregate
+
+
+def describe_aggregation(cfg: Config) -> str:
+
+    """
+    Describes aggregation settings from config, so that aggregates
+    could be merged only if they have the same description
+    :param cfg: application config
+    :return: description of aggregation settings
+    """
+
+    aggregator = cfg.aggregator
+    if cfg.aggregator == SKETCH_AGGREGATOR:
+        # snapshots of sketch aggregators without latency histogram could not be merged with new ones
+        aggregator = f"{cfg.aggregator}:{cfg.median_relative_error}:histogram={len(LATENCY_HISTOGRAM_BOUNDS)}"
+
+    return (
+        f"{aggregator};strip_query_string={cfg.strip_query_string};"
+        f"collapse_url_ids={cfg.collapse_url_ids};max_tracked_urls={cfg.max_tracked_urls};"
+        f"backend={cfg.aggregation_backend}"
+    )
+
+
+def update_log_snapshot(log_file: LatestLogFile,
+                        cfg: Config,
+                        snapshot_store: SnapshotStore) -> Tuple[LogAggregate, bool]:
+
+    """
+    Parses only new lines of log file since the last saved snapshot
+    and saves updated snapshot. Lines are parsed sequentially from offset,
+    so several workers and pipelined gzip readers are not supported.
+    Failures percentage is checked the same way as when the whole log is parsed,
+    pre-flight check is done only when log is parsed from the beginning.
+    Incomplete last line of plain log is parsed only when log has not grown since the last snapshot,
+    so line that is still written is not parsed halfway
+    :param log_file: file with logs to parse
+    :param cfg: application config
+    :param snapshot_store: storage of snapshots
+    :return: aggregate of the whole log file and flag if it was changed
+    """
+
+    if cfg.workers > 1 or cfg.gzip_reader != DEFAULT_GZIP_READER:
+        raise ValueError(
+            f"Incremental parsing supports only single worker and {DEFAULT_GZIP_READER} gzip reader, "
+            f"not {cfg.workers} workers and {cfg.gzip_reader} gzip reader"
+        )
+
+    log_size = os.path.getsize(log_file.path)
+    aggregator = describe_aggregation(cfg=cfg)
+    snapshot = snapshot_store.load(log_path=log_file.path)
+
+    if snapshot is not None and (snapshot.aggregator != aggregator or log_size < snapshot.log_size):
+        logging.info("Snapshot of log file %s is outdated, parsing it from scratch", log_file.path)
+        snapshot = None
+
+    is_finished = False
+    if snapshot is not None and log_size == snapshot.log_size:
+        if log_file.extension == ".gz" or snapshot.offset == log_size:
+            logging.info("Log file %s has not changed since the last snapshot", log_file.path)
+            return snapshot.aggregate, False
+        logging.info("Log file %s has stopped growing, its incomplete last line is parsed", log_file.path)
+        is_finished = True
+
+    aggregate = make_log_aggregate(cfg=cfg) if snapshot is None else snapshot.aggregate
+    offset = 0 if snapshot is None else snapshot.offset
+
+    if not offset:
+        check_preflight(log_file=log_file, cfg=cfg)
+
+    logging.info("Started to parse log file %s from offset %d", log_file.path, offset)
+    with read_log_lines_from_offset(log_file=log_file, offset=offset, is_finished=is_finished) as lines_reader:
+        add_lines_checking_failures(
+            lines=lines_reader,
+            add_lines=partial(aggregate_lines, aggregate=aggregate, use_fast_parser=cfg.parser == FAST_PARSER),
+            aggregate=aggregate,
+            failure_monitor=get_failure_monitor(cfg=cfg)
+        )
+    offset = lines_reader.offset
+    snapshot_store.save(LogSnapshot(
+        log_path=log_file.path,
+        log_date=log_file.date_of_creation.strftime(DATE_FORMAT_IN_LOG_FILE_NAME),
+        log_size=log_size,
+        aggregator=aggregator,
+        offset=offset,
+        aggregate=aggregate
+    ))
+
+    return aggregate, True
+
+
+def aggregate_single_log_file(log_file: LatestLogFile, cfg: Config) -> LogAggregate:
+
+    """
+    Aggregates log file using its snapshot in incremental mode
+    :param log_file: file with logs to aggregate
+    :param cfg: application config
+    :return: aggregate of log file
+    """
+
+    if not cfg.incremental:
+        return aggregate_log_file(log_file=log_file, cfg=cfg)
+
+    with SnapshotStore(path=os.path.join(cfg.report_dir, SNAPSHOTS_FILE_NAME)) as snapshot_store:
+        aggregate, _ = update_log_snapshot(log_file=log_file, cfg=cfg, snapshot_store=snapshot_store)
+
+    return aggregate
+
+
+def aggregate_log_files(log_files: List[LatestLogFile], cfg: Config) -> LogAggregate:
+
+    """
+    Aggregates several log files and merges their aggregates in order of files.
+    Files are processed concurrently by pool of processes if there are several workers
+    :param log_files: files with logs to aggregate
+    :param cfg: application config
+    :return: merged aggregate of all files
+    """
+
+    if len(log_files) == 1:
+        return aggregate_single_log_file(log_file=log_files[0], cfg=cfg)
+
+    if cfg.workers <= 1:
+        aggregate = make_log_aggregate(cfg=cfg)
+        for log_file in log_files:
+            logging.info("Started to aggregate log file %s", log_file.path)
+            aggregate.merge(aggregate_single_log_file(log_file=log_file, cfg=cfg))
+        return aggregate
+
+    logging.info("Started to aggregate %d log files with %d workers", len(log_files), cfg.workers)
+    single_process_cfg = cfg._replace(workers=1)
+    with ProcessPoolExecutor(max_workers=cfg.workers) as executor:
+        return merge_in_order(
+            executor=executor,
+            func=aggregate_single_log_file,
+            args_gen=((log_file, single_process_cfg) for log_file in log_files),
+            max_pending=cfg.workers,
+            aggregate_factory=get_log_aggregate_factory(cfg=cfg)
+        )
 
 
 def generate_report_name(cfg: Config, log_file: LatestLogFile) -> str:
@@ -150,6 +637,22 @@ def generate_report_name(cfg: Config, log_file: LatestLogFile) -> str:
     return report_name
 
 
+def generate_range_report_name(cfg: Config, date_range: DateRange) -> str:
+
+    """
+    Generates name for html report over date range
+    :param cfg: application config
+    :param date_range: range of log dates
+    :return: name for report
+    """
+
+    date_from = date_range.date_from.strftime(DATE_FORMAT_FOR_REPORT)
+    date_to = date_range.date_to.strftime(DATE_FORMAT_FOR_REPORT)
+    report_name = os.path.join(cfg.report_dir, f"report-{date_from}-{date_to}.html")
+
+    return report_name
+
+
 def prepare_stats_for_json(
         url_stats: Dict[str, Dict[str, Union[int, float]]]
 ) -> List[Dict[str, Union[int, float]]]:
@@ -168,10 +671,30 @@ def prepare_stats_for_json(
     return url_stats_for_json
 
 
+def select_top_urls(url_aggregators: Dict[str, UrlAggregator], report_size: int) -> List[Tuple[str, float]]:
+
+    """
+    Selects urls with the biggest total request time using heap instead of sorting all urls.
+    Urls are ordered by rounded total time like in report,
+    urls with equal rounded time keep order of aggregation
+    :param url_aggregators: aggregators of request durations by url
+    :param report_size: number of urls to select
+    :return: list of urls with their total request time
+    """
+
+    urls_time_sum = ((url, url_aggregator.time_sum) for url, url_aggregator in url_aggregators.items())
+
+    return heapq.nlargest(
+        report_size,
+        urls_time_sum,
+        key=lambda url_time_sum: round(url_time_sum[1], NUM_SIGNS_FOR_STATS)
+    )
+
+
 def calculate_url_stats(
         parsed_line_gen: Iterable[SingleLogParserResult],
         cfg: Config
-) -> Tuple[Dict[str, Dict[str, Union[int, float]]], float]:
+) -> List[Dict[str, Union[int, float]]]:
 
     """
     Calculates url stats for report
@@ -180,27 +703,28 @@ def calculate_url_stats(
     :return: url stats for log file
     """
 
-    num_failures = 0
-    num_requests = 0
-    all_requests_time = 0
-    calculations_by_url = dict()
+    aggregate = make_log_aggregate(cfg=cfg)
+    aggregate.add_parsed_lines(parsed_line_gen)
 
-    for single_line_result in parsed_line_gen:
+    return calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=cfg)
 
-        num_requests += 1
 
-        if single_line_result.is_failed:
-            num_failures += 1
-            continue
+def calculate_url_stats_from_aggregate(
+        aggregate: LogAggregate,
+        cfg: Config
+) -> List[Dict[str, Union[int, float]]]:
 
-        curr_url = single_line_result.url
+    """
+    Calculates url stats for report from aggregated log lines
+    :param aggregate: aggregate of parsed log lines
+    :param cfg application config
+    :return: url stats for log file
+    """
 
-        if curr_url not in calculations_by_url:
-            calculations_by_url[curr_url] = {"num_times": 1, "time": [single_line_result.time]}
-        else:
-            calculations_by_url[curr_url]["num_times"] += 1
-            calculations_by_url[curr_url]["time"].append(single_line_result.time)
-        all_requests_time += single_line_result.time
+    num_failures = aggregate.num_failures
+    num_requests = aggregate.num_requests
+    all_requests_time = aggregate.all_requests_time
+    url_aggregators = aggregate.url_aggregators
 
     failures_percentage = round(100 * num_failures / num_requests)
     if failures_percentage > cfg.failures_percent_threshold:
@@ -212,53 +736,139 @@ def calculate_url_stats(
         raise FailuresPercentageError
 
     logging.info("Errors percentage for line parsing is %f", failures_percentage)
-    result_by_url = dict()
-    for url in calculations_by_url:
-        num_times = calculations_by_url[url]["num_times"]
-        time_durations = calculations_by_url[url]["time"]
-        result_by_url[url] = {
+    url_stats = dict()
+    for url, time_sum in select_top_urls(url_aggregators=url_aggregators, report_size=cfg.report_size):
+        url_aggregator = url_aggregators[url]
+        num_times = url_aggregator.count
+        url_stats[url] = {
             "count": num_times,
             "count_perc": round(100 * num_times / num_requests, NUM_SIGNS_FOR_STATS),
-            "time_sum": round(sum(time_durations), NUM_SIGNS_FOR_STATS),
-            "time_perc": round(100 * sum(time_durations) / all_requests_time, NUM_SIGNS_FOR_STATS),
-            "time_avg": round(sum(time_durations) / len(time_durations), NUM_SIGNS_FOR_STATS),
-            "time_max": round(max(time_durations), NUM_SIGNS_FOR_STATS),
-            "time_med": round(median(time_durations), NUM_SIGNS_FOR_STATS)
+            "time_sum": round(time_sum, NUM_SIGNS_FOR_STATS),
+            "time_perc": round(100 * time_sum / all_requests_time, NUM_SIGNS_FOR_STATS),
+            "time_avg": round(time_sum / num_times, NUM_SIGNS_FOR_STATS),
+            "time_max": round(url_aggregator.time_max, NUM_SIGNS_FOR_STATS),
+            "time_med": round(url_aggregator.median(), NUM_SIGNS_FOR_STATS),
+            "time_hist": url_aggregator.histogram()
         }
-
-    url_stats = dict(
-        sorted(
-            result_by_url.items(),
-            key=lambda url_stats_: url_stats_[1]["time_sum"],
-            reverse=True
-        )[:cfg.report_size]
-    )
+        for percentile in REPORT_PERCENTILES:
+            url_stats[url][f"time_p{percentile}"] = round(
+                url_aggregator.quantile(percentile / 100),
+                NUM_SIGNS_FOR_STATS
+            )
 
     url_stats_for_json = prepare_stats_for_json(url_stats=url_stats)
 
     return url_stats_for_json
 
 
-def render_report(url_stats_for_json: Dict[str, Dict[str, Union[int, float]]],
+@lru_cache(maxsize=8)
+def split_report_template(template_path: str, template_mtime_ns: int) -> Tuple[str, ...]:
+
+    """
+    Splits report template at table json placeholder.
+    Template is substituted with sentinel, so that the rest of template
+    is processed the same way as with string.Template, bounds of latency histogram
+    are substituted as they are. Split is cached until template is modified
+    :param template_path: path to report template
+    :param template_mtime_ns: modification time of template, used as part of cache key
+    :return: parts of rendered template around table json
+    """
+
+    with open(template_path, "rt", encoding="utf-8") as report_template:
+        template_html = report_template.read()
+
+    sentinel = TABLE_JSON_SENTINEL
+    while sentinel in template_html:
+        sentinel += TABLE_JSON_SENTINEL
+
+    rendered_template_html = Template(template_html).safe_substitute(
+        table_json=sentinel,
+        histogram_bounds=json.dumps(LATENCY_HISTOGRAM_BOUNDS)
+    )
+
+    return tuple(rendered_template_html.split(sentinel))
+
+
+def iter_json_chunks(url_stats_for_json: List[Dict[str, Union[int, float]]]) -> Iterator[str]:
+
+    """
+    Encodes url stats to json by chunks of several urls.
+    Result is the same as json.dumps of the whole list
+    :param url_stats_for_json: url stats for log file
+    :return: generator of json chunks
+    """
+
+    yield "["
+    for chunk_start in range(0, len(url_stats_for_json), NUM_URLS_IN_JSON_CHUNK):
+        chunk = url_stats_for_json[chunk_start:chunk_start + NUM_URLS_IN_JSON_CHUNK]
+        if chunk_start:
+            yield ", "
+        yield ", ".join(map(json.dumps, chunk))
+    yield "]"
+
+
+def render_report(url_stats_for_json: List[Dict[str, Union[int, float]]],
                   cfg: Config,
                   report_name: str) -> NoReturn:
     """
-    Takes report template and renders report for current log file
+    Takes report template and renders report for current log file.
+    Table json is written straight to file by chunks, report is written to temporary file
+    and renamed, so that nobody sees half-written report
     :param url_stats_for_json: url stats for log file
     :param report_name: name of report that will be generated
     :param cfg: application config
     :return:
     """
 
-    report_template = os.path.join(cfg.report_dir, "report.html")
-    with open(report_template, "rt", encoding="utf-8") as report_template:
-        template_html = report_template.read()
+    template_path = os.path.join(cfg.report_dir, REPORT_TEMPLATE_NAME)
+    template_parts = split_report_template(
+        template_path=template_path,
+        template_mtime_ns=os.stat(template_path).st_mtime_ns
+    )
 
-    prepared_url_stats = json.dumps(url_stats_for_json)
-    fulfilled_template = Template(template_html).safe_substitute(table_json=prepared_url_stats)
+    report_fd, temporary_report_name = tempfile.mkstemp(
+        dir=os.path.dirname(report_name) or ".",
+        prefix=".report-",
+        suffix=".tmp"
+    )
+    try:
+        with open(report_fd, "w", encoding="utf-8") as prepared_report:
+            prepared_report.write(template_parts[0])
+            for template_part in template_parts[1:]:
+                prepared_report.writelines(iter_json_chunks(url_stats_for_json))
+                prepared_report.write(template_part)
+        os.chmod(temporary_report_name, REPORT_FILE_MODE)
+        os.replace(temporary_report_name, report_name)
+    except BaseException:
+        os.remove(temporary_report_name)
+        raise
+
+
+def save_run_metrics(metrics: RunMetrics,
+                     aggregate: LogAggregate,
+                     log_files: List[LatestLogFile],
+                     cfg: Config,
+                     report_name: str) -> NoReturn:
 
-    with open(report_name, "w", encoding="utf-8") as prepared_report:
-        prepared_report.write(fulfilled_template)
+    """
+    Fills metrics of run with sizes of parsed logs and aggregate,
+    writes them to script log and to json file next to report if it is enabled in config
+    :param metrics: metrics of run with measured stages
+    :param aggregate: aggregate of parsed logs
+    :param log_files: parsed log files
+    :param cfg: application config
+    :param report_name: path to generated report
+    """
+
+    metrics.num_lines = aggregate.num_requests
+    metrics.num_bytes = sum(os.path.getsize(log_file.path) for log_file in log_files)
+    metrics.num_unique_urls = len(aggregate.url_aggregators)
+    metrics.log()
+
+    if cfg.write_metrics:
+        metrics_file_name = get_metrics_file_name(report_name=report_name)
+        metrics.write_json(path=metrics_file_name)
+        logging.info("Metrics are written to %s", metrics_file_name)
 
 
 def generate_report(config: Config, log_file_pattern: re.Pattern) -> NoReturn:
@@ -270,9 +880,11 @@ def generate_report(config: Config, log_file_pattern: re.Pattern) -> NoReturn:
     :return:
     """
 
+    metrics = RunMetrics()
     try:
         logging.info("Trying to find latest log file from directory %s", config.log_dir)
-        latest_log_file = find_latest_log(log_dir=config.log_dir, log_file_pattern=log_file_pattern)
+        with metrics.measure_stage(FIND_STAGE):
+            latest_log_file = get_latest_log(cfg=config, log_file_pattern=log_file_pattern)
 
         if latest_log_file is None:
             logging.info("No log file to generate report for")
@@ -284,28 +896,110 @@ def generate_report(config: Config, log_file_pattern: re.Pattern) -> NoReturn:
         report_name = generate_report_name(cfg=config, log_file=latest_log_file)
         logging.info("Report name is %s", report_name)
 
-        if os.path.exists(report_name):
-            logging.info("Report for this log is already done")
-            return
-
-        log_file_opener = get_log_file_opener(log_file=latest_log_file)
+        if config.incremental:
+            snapshots_path = os.path.join(config.report_dir, SNAPSHOTS_FILE_NAME)
+            with SnapshotStore(path=snapshots_path) as snapshot_store, metrics.measure_stage(AGGREGATE_STAGE):
+                aggregate, log_is_changed = update_log_snapshot(
+                    log_file=latest_log_file,
+                    cfg=config,
+                    snapshot_store=snapshot_store
+                )
+            if not log_is_changed and os.path.exists(report_name):
+                logging.info("Report for this log is already done")
+                return
+        else:
+            if is_report_done(cfg=config, log_file=latest_log_file, report_name=report_name):
+                logging.info("Report for this log is already done")
+                return
 
-        logging.info("Started to parse log file: %s", latest_log_file.path)
-        parsed_line_gen = parse_log_file(
-            log_file=latest_log_file,
-            log_file_opener=log_file_opener
-        )
+            with metrics.measure_stage(AGGREGATE_STAGE):
+                aggregate = aggregate_log_file(log_file=latest_log_file, cfg=config, metrics=metrics)
 
         logging.info("Started to calculate stats for url from file: %s", latest_log_file.path)
-        url_stats_for_report = calculate_url_stats(parsed_line_gen=parsed_line_gen, cfg=config)
+        with metrics.measure_stage(STATS_STAGE):
+            url_stats_for_report = calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=config)
         logging.info("Successfully calculated stats by url from file: %s", latest_log_file.path)
 
         logging.info("Rendering template for report %s", report_name)
-        render_report(url_stats_for_json=url_stats_for_report,
-                      cfg=config,
-                      report_name=report_name)
+        with metrics.measure_stage(RENDER_STAGE):
+            render_report(url_stats_for_json=url_stats_for_report,
+                          cfg=config,
+                          report_name=report_name)
         logging.info("Successfully generated report %s", report_name)
 
+        if config.use_log_catalog:
+            with LogCatalog(path=os.path.join(config.report_dir, LOG_CATALOG_FILE_NAME)) as catalog:
+                catalog.mark_processed(log_file=latest_log_file)
+
+        save_run_metrics(
+            metrics=metrics,
+            aggregate=aggregate,
+            log_files=[latest_log_file],
+            cfg=config,
+            report_name=report_name
+        )
+
+    except Exception:
+        logging.exception("Something went wrong during generating report")
+
+
+def generate_range_report(config: Config, log_file_pattern: re.Pattern, date_range: DateRange) -> NoReturn:
+
+    """
+    Generates one report for all nginx log files from date range
+    :param config: default application config
+    :param log_file_pattern: pattern for file name regular expression
+    :param date_range: range of log dates
+    :return:
+    """
+
+    metrics = RunMetrics()
+    try:
+        logging.info(
+            "Trying to find log files from %s to %s in directory %s",
+            date_range.date_from,
+            date_range.date_to,
+            config.log_dir
+        )
+        with metrics.measure_stage(FIND_STAGE):
+            log_files = get_logs_in_range(cfg=config, log_file_pattern=log_file_pattern, date_range=date_range)
+
+        if not log_files:
+            logging.info("No log files to generate report for")
+            return
+
+        logging.info("Found %d log files", len(log_files))
+
+        report_name = generate_range_report_name(cfg=config, date_range=date_range)
+        logging.info("Report name is %s", report_name)
+
+        if os.path.exists(report_name) and not config.incremental:
+            logging.info("Report for this date range is already done")
+            return
+
+        with metrics.measure_stage(AGGREGATE_STAGE):
+            aggregate = aggregate_log_files(log_files=log_files, cfg=config)
+
+        logging.info("Started to calculate stats for url from %d files", len(log_files))
+        with metrics.measure_stage(STATS_STAGE):
+            url_stats_for_report = calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=config)
+        logging.info("Successfully calculated stats by url from %d files", len(log_files))
+
+        logging.info("Rendering template for report %s", report_name)
+        with metrics.measure_stage(RENDER_STAGE):
+            render_report(url_stats_for_json=url_stats_for_report,
+                          cfg=config,
+                          report_name=report_name)
+        logging.info("Successfully generated report %s", report_name)
+
+        save_run_metrics(
+            metrics=metrics,
+            aggregate=aggregate,
+            log_files=log_files,
+            cfg=config,
+            report_name=report_name
+        )
+
     except Exception:
         logging.exception("Something went wrong during generating report")
 
@@ -319,8 +1013,39 @@ if __name__ == "__main__":
         default="./config.json",
         help="Path to config file"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of processes to parse log file with"
+    )
+    date_range_group = parser.add_mutually_exclusive_group()
+    date_range_group.add_argument(
+        "--date-range",
+        type=parse_date_range,
+        default=None,
+        help="Make one report for logs from date range like 2017-06-01..2017-06-30"
+    )
+    date_range_group.add_argument(
+        "--last-days",
+        type=int,
+        default=None,
+        help="Make one report for logs from last days including today"
+    )
+    date_range_group.add_argument(
+        "--watch",
+        action="store_true",
+        help="Run as daemon following the latest log and re-rendering its report"
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Path to dump cProfile stats of the run to"
+    )
     args = parser.parse_args()
     config_from_file = json.load(args.config)
+    if args.workers is not None:
+        config_from_file["WORKERS"] = args.workers
 
     conf = get_config_parameters(
         default_config=CONFIG,
@@ -333,5 +1058,37 @@ if __name__ == "__main__":
         datefmt="%Y.%m.%d %H:%M:%S",
         level=logging.INFO
     )
-    generate_report(config=conf, log_file_pattern=LOG_FILE_PATTERN)
+    if args.last_days is not None:
+        args.date_range = get_last_days_range(num_days=args.last_days, today=datetime.date.today())
+
+    if args.watch:
+        # watcher imports this module, so it is imported only in watch mode
+        from watcher import LogWatcher
+
+        log_watcher = LogWatcher(
+            cfg=conf,
+            log_file_pattern=LOG_FILE_PATTERN,
+            poll_interval=conf.watch_poll_interval_sec,
+            render_interval=conf.watch_render_interval_sec
+        )
+        signal.signal(signal.SIGTERM, lambda signal_num, frame: log_watcher.stop())
+        signal.signal(signal.SIGINT, lambda signal_num, frame: log_watcher.stop())
+        run_report = log_watcher.run
+    elif args.date_range is not None:
+        run_report = partial(
+            generate_range_report,
+            config=conf,
+            log_file_pattern=LOG_FILE_PATTERN,
+            date_range=args.date_range
+        )
+    else:
+        run_report = partial(generate_report, config=conf, log_file_pattern=LOG_FILE_PATTERN)
+
+    if args.profile is not None:
+        profiler = Profile()
+        profiler.runcall(run_report)
+        profiler.dump_stats(args.profile)
+        logging.info("Profile stats are dumped to %s", args.profile)
+    else:
+        run_report()
 
@@ -0,0 +1,247 @@
+import gzip
+import io
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import IO, Callable, Dict, Iterator, NoReturn, Optional, Union
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+FIND_STAGE = "find"
+AGGREGATE_STAGE = "aggregate"
+STATS_STAGE = "stats"
+RENDER_STAGE = "render"
+
+DECOMPRESS_STAGE = "decompress"
+PARSE_STAGE = "parse"
+
+METRICS_FILE_SUFFIX = ".metrics.json"
+
+
+def get_peak_rss_bytes(of_children: bool = False) -> Optional[int]:
+
+    """
+    Returns peak resident set size of current process or of its child processes,
+    such as workers and external decompressor. For children it is peak rss
+    of the largest child process that has already finished
+    :param of_children: whether to return peak rss of child processes
+    :return: peak rss in bytes or None if it is not available on platform
+    """
+
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN if of_children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class TimedReader(io.RawIOBase):
+
+    """
+    Binary stream measuring wall time of reads from wrapped stream,
+    for gzip stream it is time of decompression. Wrapped stream is closed with it
+    """
+
+    def __init__(self, stream: IO[bytes], add_read_time: Callable[[float], NoReturn]):
+
+        super().__init__()
+        self.stream = stream
+        self.add_read_time = add_read_time
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        started_at = time.perf_counter()
+        try:
+            return self.stream.readinto(buffer)
+        finally:
+            self.add_read_time(time.perf_counter() - started_at)
+
+    def close(self) -> NoReturn:
+        if not self.closed:
+            self.stream.close()
+        super().close()
+
+
+class RunMetrics:
+
+    """
+    Metrics of single run of report generation:
+    - stage_durations - wall time of stages in seconds in order of their start
+    - num_lines - number of parsed log lines
+    - num_bytes - size of parsed log files on disk
+    - num_unique_urls - number of aggregated urls
+    - aggregate_stage_durations - time of decompression and parsing within aggregate stage,
+      they overlap when gzip log is decompressed in background
+    Throughput is calculated for aggregate stage, which includes reading,
+    decompression and parsing of log lines as they are streamed into aggregate
+    """
+
+    def __init__(self):
+
+        self.stage_durations: Dict[str, float] = dict()
+        self.aggregate_stage_durations: Dict[str, float] = dict()
+        self.num_lines = 0
+        self.num_bytes = 0
+        self.num_unique_urls = 0
+
+    @contextmanager
+    def measure_stage(self, stage: str) -> Iterator[NoReturn]:
+
+        """
+        Measures wall time of stage, time of repeated stage is summed
+        :param stage: name of stage
+        """
+
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_durations[stage] = self.stage_durations.get(stage, 0.0) + time.perf_counter() - started_at
+
+    def add_aggregate_stage_time(self, stage: str, duration: float) -> NoReturn:
+        self.aggregate_stage_durations[stage] = self.aggregate_stage_durations.get(stage, 0.0) + duration
+
+    @contextmanager
+    def measure_aggregate_stage(self, stage: str) -> Iterator[NoReturn]:
+
+        """
+        Measures wall time of stage within aggregate stage
+        :param stage: name of stage
+        """
+
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_aggregate_stage_time(stage, time.perf_counter() - started_at)
+
+    @contextmanager
+    def measure_parsing(self) -> Iterator[NoReturn]:
+
+        """
+        Measures time of parsing of log lines that are decompressed in the same thread:
+        time of decompression measured meanwhile is subtracted from wall time
+        """
+
+        decompress_duration = self.aggregate_stage_durations.get(DECOMPRESS_STAGE, 0.0)
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            decompress_duration = self.aggregate_stage_durations.get(DECOMPRESS_STAGE, 0.0) - decompress_duration
+            self.add_aggregate_stage_time(PARSE_STAGE, time.perf_counter() - started_at - decompress_duration)
+
+    def measure_decompression(self, stream: IO[bytes]) -> io.BufferedReader:
+
+        """
+        Wraps decompressed stream, so that time of reads from it is added to decompress stage
+        :param stream: binary stream of decompressed data
+        :return: buffered stream of the same data
+        """
+
+        return io.BufferedReader(TimedReader(
+            stream=stream,
+            add_read_time=lambda duration: self.add_aggregate_stage_time(DECOMPRESS_STAGE, duration)
+        ))
+
+    def open_gzip(self, path: str, mode: str = "rb", encoding: Optional[str] = None) -> IO:
+
+        """
+        Opens gzip file like gzip.open measuring time of its decompression
+        :param path: path to gzip file
+        :param mode: mode to open file with, text or binary
+        :param encoding: encoding of text mode
+        :return: stream of decompressed data
+        """
+
+        gz_log = self.measure_decompression(gzip.open(path, mode="rb"))
+
+        return gz_log if "b" in mode else io.TextIOWrapper(gz_log, encoding=encoding)
+
+    def as_dict(self) -> Dict[str, Union[int, float, None, Dict[str, float]]]:
+
+        """
+        Collects metrics with derived throughput
+        :return: metrics as dictionary ready for json
+        """
+
+        aggregate_duration = self.stage_durations.get(AGGREGATE_STAGE, 0.0)
+        lines_per_sec = bytes_per_sec = None
+        if aggregate_duration > 0:
+            lines_per_sec = round(self.num_lines / aggregate_duration, 1)
+            bytes_per_sec = round(self.num_bytes / aggregate_duration, 1)
+
+        return {
+            "stages": {stage: round(duration, 6) for stage, duration in self.stage_durations.items()},
+            "aggregate_stages": {
+                stage: round(duration, 6) for stage, duration in self.aggregate_stage_durations.items()
+            },
+            "total_sec": round(sum(self.stage_durations.values()), 6),
+            "num_lines": self.num_lines,
+            "num_bytes": self.num_bytes,
+            "num_unique_urls": self.num_unique_urls,
+            "lines_per_sec": lines_per_sec,
+            "bytes_per_sec": bytes_per_sec,
+            "peak_rss_bytes": get_peak_rss_bytes(),
+            "peak_children_rss_bytes": get_peak_rss_bytes(of_children=True)
+        }
+
+    def log(self) -> NoReturn:
+
+        """
+        Writes metrics to script log
+        """
+
+        metrics = self.as_dict()
+        logging.info(
+            "Stage timings: %s",
+            ", ".join(f"{stage} {duration:.3f}s" for stage, duration in metrics["stages"].items())
+        )
+        if metrics["aggregate_stages"]:
+            logging.info(
+                "Aggregate stage timings: %s",
+                ", ".join(f"{stage} {duration:.3f}s" for stage, duration in metrics["aggregate_stages"].items())
+            )
+        logging.info(
+            "Parsed %d lines (%d bytes, %d unique urls) at %s lines/sec, %s bytes/sec, "
+            "peak rss is %s bytes, peak rss of child processes is %s bytes",
+            metrics["num_lines"],
+            metrics["num_bytes"],
+            metrics["num_unique_urls"],
+            metrics["lines_per_sec"],
+            metrics["bytes_per_sec"],
+            metrics["peak_rss_bytes"],
+            metrics["peak_children_rss_bytes"]
+        )
+
+    def write_json(self, path: str) -> NoReturn:
+
+        """
+        Writes metrics to json file
+        :param path: path to metrics file
+        """
+
+        with open(path, "w", encoding="utf-8") as metrics_file:
+            json.dump(self.as_dict(), metrics_file, indent=2)
+
+
+def get_metrics_file_name(report_name: str) -> str:
+
+    """
+    Makes name of metrics file next to report
+    :param report_name: path to report
+    :return: path to metrics file
+    """
+
+    if report_name.endswith(".html"):
+        report_name = report_name[:-len(".html")]
+
+    return report_name + METRICS_FILE_SUFFIX
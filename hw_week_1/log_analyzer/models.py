@@ -9,6 +9,24 @@ class Config(NamedTuple):
     - report_size: size of report
     - report_dir: directory where report will be constructed
     - log_dir: directory where to take logs from
+    - workers: number of processes to parse log file with
+    - aggregator: aggregator of request durations by url: exact or sketch
+    - median_relative_error: relative error of median for sketch aggregator
+    - parser: parser of log lines: default or fast
+    - incremental: whether to keep snapshots of parsed logs and parse only new lines
+    - strip_query_string: whether to cut query string from urls
+    - collapse_url_ids: whether to replace numeric and uuid url path segments with placeholders
+    - max_tracked_urls: maximum number of tracked urls, only the most frequent ones are kept
+    - aggregation_backend: backend of aggregation: python, compact or numpy
+    - gzip_reader: reader of gzip logs: default, pipelined or external
+    - write_metrics: whether to write metrics of run to json file next to report
+    - watch_poll_interval_sec: how often log directory is checked in watch mode without inotify
+    - watch_render_interval_sec: minimal interval between re-renderings of report in watch mode
+    - use_log_catalog: whether to find logs in persisted catalog of log directory instead of scanning it
+    - failures_warmup_lines: number of lines parsed before failures percentage is checked during parsing,
+    None disables the check until the whole log is parsed
+    - failures_confidence: confidence with which failures percentage should exceed threshold to abort parsing
+    - preflight_lines: number of first lines of log to check failures percentage on before parsing whole log
     """
 
     report_size: int
@@ -16,6 +34,23 @@ class Config(NamedTuple):
     log_dir: str
     log_file: str
     failures_percent_threshold: float
+    workers: int = 1
+    aggregator: str = "exact"
+    median_relative_error: float = 0.01
+    parser: str = "default"
+    incremental: bool = False
+    strip_query_string: bool = False
+    collapse_url_ids: bool = False
+    max_tracked_urls: Optional[int] = None
+    aggregation_backend: str = "python"
+    gzip_reader: str = "default"
+    write_metrics: bool = False
+    watch_poll_interval_sec: float = 1.0
+    watch_render_interval_sec: float = 10.0
+    use_log_catalog: bool = False
+    failures_warmup_lines: Optional[int] = None
+    failures_confidence: float = 0.99
+    preflight_lines: Optional[int] = None
 
 
 class LatestLogFile(NamedTuple):
@@ -44,3 +79,15 @@ class SingleLogParserResult(NamedTuple):
     url: Optional[str]
     time: Optional[float]
     is_failed: bool
+
+
+class DateRange(NamedTuple):
+
+    """
+    Class with range of log dates for report such as:
+    - date_from - first date of range
+    - date_to - last date of range (inclusive)
+    """
+
+    date_from: datetime.date
+    date_to: datetime.date
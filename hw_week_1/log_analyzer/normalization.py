@@ -0,0 +1,64 @@
+import re
+from typing import Dict
+
+QUERY_STRING_SEPARATOR = "?"
+NUMERIC_ID_PLACEHOLDER = "{id}"
+UUID_PLACEHOLDER = "{uuid}"
+MAX_CACHED_URLS = 100_000
+
+UUID_SEGMENT_PATTERN = re.compile(
+    r"(?<=/)[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}(?=/|$)"
+)
+NUMERIC_SEGMENT_PATTERN = re.compile(r"(?<=/)\d+(?=/|$)")
+
+
+class UrlNormalizer:
+
+    """
+    Normalizer of urls before aggregation to limit number of unique urls:
+    - strip_query_string - cut everything starting from ?
+    - collapse_ids - replace numeric and uuid path segments with placeholders,
+    e.g. /api/v2/banner/25019354 becomes /api/v2/banner/{id}
+    Results are cached for recent urls, cache is cleared when it becomes too big
+    """
+
+    def __init__(self, strip_query_string: bool, collapse_ids: bool):
+
+        self.strip_query_string = strip_query_string
+        self.collapse_ids = collapse_ids
+        self._cache: Dict[str, str] = dict()
+
+    def _normalize(self, url: str) -> str:
+
+        if self.strip_query_string:
+            url = url.partition(QUERY_STRING_SEPARATOR)[0]
+
+        if self.collapse_ids:
+            path, separator, query_string = url.partition(QUERY_STRING_SEPARATOR)
+            path = UUID_SEGMENT_PATTERN.sub(UUID_PLACEHOLDER, path)
+            path = NUMERIC_SEGMENT_PATTERN.sub(NUMERIC_ID_PLACEHOLDER, path)
+            url = path + separator + query_string
+
+        return url
+
+    def __call__(self, url: str) -> str:
+
+        """
+        Normalizes url
+        :param url: url from log line
+        :return: normalized url
+        """
+
+        normalized_url = self._cache.get(url)
+        if normalized_url is None:
+            if len(self._cache) >= MAX_CACHED_URLS:
+                self._cache.clear()
+            normalized_url = self._cache[url] = self._normalize(url)
+
+        return normalized_url
+
+    def __getstate__(self) -> dict:
+        return {"strip_query_string": self.strip_query_string, "collapse_ids": self.collapse_ids}
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)
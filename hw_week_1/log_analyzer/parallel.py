@@ -0,0 +1,240 @@
+import gzip
+import io
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, List, NoReturn, Optional, Tuple
+
+from aggregation import LogAggregate
+from failures import FailureRateMonitor
+from models import LatestLogFile
+from parsers import aggregate_binary_lines, parse_log_line
+
+DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+MAX_PENDING_BLOCKS_PER_WORKER = 2
+
+
+def aggregate_lines_block(block: bytes, aggregate_factory: Callable[[], LogAggregate]) -> LogAggregate:
+
+    """
+    Aggregates block of log lines. Block should end with the end of line
+    :param block: bytes of log lines
+    :param aggregate_factory: function creating empty aggregate
+    :return: aggregate of lines from block
+    """
+
+    aggregate = aggregate_factory()
+    with io.TextIOWrapper(io.BytesIO(block), encoding="utf-8") as lines:
+        aggregate.add_parsed_lines(map(parse_log_line, lines))
+
+    return aggregate
+
+
+def aggregate_binary_lines_block(block: bytes, aggregate_factory: Callable[[], LogAggregate]) -> LogAggregate:
+
+    """
+    Aggregates block of log lines with binary parser. Block should end with the end of line
+    :param block: bytes of log lines
+    :param aggregate_factory: function creating empty aggregate
+    :return: aggregate of lines from block
+    """
+
+    aggregate = aggregate_factory()
+    aggregate_binary_lines(lines=io.BytesIO(block), aggregate=aggregate)
+
+    return aggregate
+
+
+def split_file_into_shards(path: str, num_shards: int) -> List[Tuple[int, int]]:
+
+    """
+    Splits file into byte ranges with almost equal sizes.
+    Every range starts at the beginning of the line
+    :param path: path to file
+    :param num_shards: desired number of shards
+    :return: list of byte ranges (start, end)
+    """
+
+    file_size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as file:
+        for shard_num in range(1, num_shards):
+            file.seek(max(file_size * shard_num // num_shards - 1, boundaries[-1]))
+            file.readline()
+            boundary = min(file.tell(), file_size)
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    if boundaries[-1] < file_size:
+        boundaries.append(file_size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def iter_shard_blocks(path: str, start: int, end: int, block_size: int) -> Iterator[bytes]:
+
+    """
+    Reads byte range of file by blocks aligned on lines
+    :param path: path to file
+    :param start: beginning of byte range, should be the beginning of line
+    :param end: end of byte range, should be the end of line
+    :param block_size: approximate size of single block
+    :return: generator of blocks
+    """
+
+    with open(path, "rb") as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            block = file.read(min(block_size, end - position))
+            if not block:
+                break
+            if not block.endswith(b"\n") and position + len(block) < end:
+                block += file.readline()
+            position += len(block)
+            yield block
+
+
+def aggregate_file_shard(path: str,
+                         start: int,
+                         end: int,
+                         block_size: int,
+                         block_aggregator: Callable[[bytes], LogAggregate]) -> LogAggregate:
+
+    """
+    Aggregates byte range of plain log file
+    :param path: path to log file
+    :param start: beginning of byte range
+    :param end: end of byte range
+    :param block_size: size of block to read at once
+    :param block_aggregator: function aggregating block of lines
+    :return: aggregate of lines from byte range
+    """
+
+    blocks_gen = iter_shard_blocks(path=path, start=start, end=end, block_size=block_size)
+    aggregate = block_aggregator(next(blocks_gen, b""))
+    for block in blocks_gen:
+        aggregate.merge(block_aggregator(block))
+
+    return aggregate
+
+
+def iter_line_aligned_blocks(stream: io.BufferedIOBase, block_size: int) -> Iterator[bytes]:
+
+    """
+    Reads binary stream by blocks that end with the end of line
+    :param stream: binary stream to read
+    :param block_size: approximate size of single block
+    :return: generator of blocks
+    """
+
+    remainder = b""
+    while True:
+        data = stream.read(block_size)
+        if not data:
+            break
+        data = remainder + data
+        last_line_end = data.rfind(b"\n")
+        if last_line_end == -1:
+            remainder = data
+            continue
+        remainder = data[last_line_end + 1:]
+        yield data[:last_line_end + 1]
+    if remainder:
+        yield remainder
+
+
+def merge_in_order(executor: Executor,
+                   func: Callable[..., LogAggregate],
+                   args_gen: Iterable[Tuple[Any, ...]],
+                   max_pending: int,
+                   aggregate_factory: Callable[[], LogAggregate],
+                   failure_monitor: Optional[FailureRateMonitor] = None) -> LogAggregate:
+
+    """
+    Submits tasks to executor keeping at most max_pending tasks in flight
+    and merges their results in order of submission.
+    Failures percentage is checked after every merge, tasks in flight are cancelled if it is exceeded
+    :param executor: executor to run tasks with
+    :param func: function returning aggregate
+    :param args_gen: generator of arguments for func
+    :param max_pending: maximum number of tasks in flight
+    :param aggregate_factory: function creating empty aggregate
+    :param failure_monitor: monitor of failures percentage
+    :return: merged aggregate
+    """
+
+    def merge_next() -> NoReturn:
+        result.merge(pending.popleft().result())
+        if failure_monitor is not None:
+            failure_monitor.check(result)
+
+    result = aggregate_factory()
+    pending = deque()
+    try:
+        for args in args_gen:
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= max_pending:
+                merge_next()
+        while pending:
+            merge_next()
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+
+    return result
+
+
+def aggregate_log_file_parallel(
+        log_file: LatestLogFile,
+        workers: int,
+        aggregate_factory: Callable[[], LogAggregate] = LogAggregate,
+        use_fast_parser: bool = False,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        failure_monitor: Optional[FailureRateMonitor] = None
+) -> LogAggregate:
+
+    """
+    Aggregates log file with pool of processes.
+    Plain logs are split into byte ranges aligned on lines, every range is processed by separate worker.
+    Gzip logs are decompressed in current process and decompressed blocks are fed to workers
+    :param log_file: log file to aggregate
+    :param workers: number of worker processes
+    :param aggregate_factory: function creating empty aggregate
+    :param use_fast_parser: whether to parse lines with binary parser
+    :param block_size: size of block to read at once
+    :param failure_monitor: monitor of failures percentage checked as results of workers are merged
+    :return: aggregate of whole log file
+    """
+
+    block_aggregator = partial(
+        aggregate_binary_lines_block if use_fast_parser else aggregate_lines_block,
+        aggregate_factory=aggregate_factory
+    )
+    max_pending = workers * MAX_PENDING_BLOCKS_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if log_file.extension == ".gz":
+            with gzip.open(log_file.path, mode="rb") as analyzed_log:
+                blocks_gen = iter_line_aligned_blocks(stream=analyzed_log, block_size=block_size)
+                return merge_in_order(
+                    executor=executor,
+                    func=block_aggregator,
+                    args_gen=((block,) for block in blocks_gen),
+                    max_pending=max_pending,
+                    aggregate_factory=aggregate_factory,
+                    failure_monitor=failure_monitor
+                )
+
+        shards = split_file_into_shards(path=log_file.path, num_shards=workers)
+        return merge_in_order(
+            executor=executor,
+            func=aggregate_file_shard,
+            args_gen=(
+                (log_file.path, start, end, block_size, block_aggregator)
+                for start, end in shards
+            ),
+            max_pending=max_pending,
+            aggregate_factory=aggregate_factory,
+            failure_monitor=failure_monitor
+        )
@@ -0,0 +1,200 @@
+import gzip
+import io
+import logging
+import mmap
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, NoReturn
+
+from aggregation import LogAggregate
+from models import LatestLogFile, SingleLogParserResult
+
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+def parse_log_line(line_: str) -> SingleLogParserResult:
+
+    """
+    Parses single line of nginx log
+    :param line_: line of log file
+    :return: result of line parsing
+    """
+
+    line_parsing_is_failed = False
+    try:
+        logs_line = line_.split()
+        url, duration = logs_line[6], float(logs_line[-1])
+    except Exception:
+        logging.error("Failed parsing line: %s", line_)
+        url, duration = None, None
+        line_parsing_is_failed = True
+
+    return SingleLogParserResult(
+        url=url,
+        time=duration,
+        is_failed=line_parsing_is_failed
+    )
+
+
+def aggregate_binary_lines(lines: Iterable[bytes], aggregate: LogAggregate) -> NoReturn:
+
+    """
+    Parses lines of nginx log as bytes and adds them straight to aggregate.
+    Only url (7th field) and request time (last field) are cut from line:
+    line is split only up to url and request time is taken from the right end of line.
+    Url is decoded only if the line is parsed successfully, so results are the same
+    as with parse_log_line, but no objects are created for single line
+    :param lines: lines of log file as bytes
+    :param aggregate: aggregate to add lines to
+    """
+
+    is_plain = aggregate.is_plain
+    url_aggregators = aggregate.url_aggregators if is_plain else None
+    url_aggregator_factory = aggregate.url_aggregator_factory
+    num_requests = 0
+    num_failures = 0
+    all_requests_time = aggregate.all_requests_time
+
+    for line_ in lines:
+
+        num_requests += 1
+
+        try:
+            raw_url = line_.split(None, 7)[6]
+            duration = float(line_.rsplit(None, 1)[-1])
+            url = raw_url.decode("utf-8")
+        except Exception:
+            logging.error("Failed parsing line: %s", line_.decode("utf-8", errors="replace"))
+            num_failures += 1
+            continue
+
+        if is_plain:
+            url_aggregator = url_aggregators.get(url)
+            if url_aggregator is None:
+                url_aggregator = url_aggregators[url] = url_aggregator_factory()
+        else:
+            url_aggregator = aggregate.get_url_aggregator(url)
+        url_aggregator.add(duration)
+        all_requests_time += duration
+
+    aggregate.num_requests += num_requests
+    aggregate.num_failures += num_failures
+    aggregate.all_requests_time = all_requests_time
+
+
+def iter_binary_log_lines(log_file: LatestLogFile, gzip_opener: Callable = gzip.open) -> Iterator[bytes]:
+
+    """
+    Reads log file line by line without decoding.
+    Plain logs are read through mmap, gzip logs through large read buffer
+    :param log_file: file with logs to read
+    :param gzip_opener: function to open gzip log with
+    :return: generator of lines as bytes
+    """
+
+    if log_file.extension == ".gz":
+        with gzip_opener(log_file.path, mode="rb") as gz_log:
+            yield from io.BufferedReader(gz_log, buffer_size=READ_BUFFER_SIZE)
+        return
+
+    with open(log_file.path, mode="rb") as analyzed_log:
+        try:
+            log_map = mmap.mmap(analyzed_log.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file could not be mapped
+            return
+        with log_map:
+            yield from iter(log_map.readline, b"")
+
+
+def aggregate_log_file_fast(log_file: LatestLogFile, aggregate: LogAggregate) -> NoReturn:
+
+    """
+    Parses log file with binary parser and adds lines to aggregate
+    :param log_file: file with logs to parse
+    :param aggregate: aggregate to add lines to
+    """
+
+    aggregate_binary_lines(lines=iter_binary_log_lines(log_file=log_file), aggregate=aggregate)
+
+
+class CompleteLinesReader:
+
+    """
+    Iterates over lines of binary stream and keeps offset
+    right after the last line that was read.
+    Incomplete last line (still being written) is skipped unless it is allowed
+    """
+
+    def __init__(self, stream: io.BufferedIOBase, offset: int, include_incomplete_line: bool):
+
+        self.stream = stream
+        self.offset = offset
+        self.include_incomplete_line = include_incomplete_line
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line_ in self.stream:
+            if not line_.endswith(b"\n") and not self.include_incomplete_line:
+                return
+            self.offset += len(line_)
+            yield line_
+
+
+@contextmanager
+def read_log_lines_from_offset(log_file: LatestLogFile,
+                               offset: int,
+                               is_finished: bool = False) -> Iterator[CompleteLinesReader]:
+
+    """
+    Opens log file and reads its lines as bytes starting from offset.
+    Offset of gzip log is offset in decompressed data.
+    Incomplete last line of plain log is left for the next time unless log is not written anymore
+    :param log_file: file with logs to read
+    :param offset: offset to start reading from, should be the beginning of line
+    :param is_finished: whether plain log is not written anymore, so its incomplete last line is read too
+    :return: reader of lines keeping offset right after the last read line
+    """
+
+    is_gzip = log_file.extension == ".gz"
+    log_file_opener = gzip.open if is_gzip else open
+    with log_file_opener(log_file.path, mode="rb") as analyzed_log:
+        analyzed_log.seek(offset)
+        yield CompleteLinesReader(
+            stream=io.BufferedReader(analyzed_log, buffer_size=READ_BUFFER_SIZE) if is_gzip else analyzed_log,
+            offset=offset,
+            include_incomplete_line=is_gzip or is_finished
+        )
+
+
+def aggregate_lines(lines: Iterable[bytes], aggregate: LogAggregate, use_fast_parser: bool) -> NoReturn:
+
+    """
+    Parses lines of log read as bytes and adds them to aggregate
+    :param lines: lines of log file as bytes
+    :param aggregate: aggregate to add lines to
+    :param use_fast_parser: whether to parse lines with binary parser
+    """
+
+    if use_fast_parser:
+        aggregate_binary_lines(lines=lines, aggregate=aggregate)
+    else:
+        aggregate.add_parsed_lines(parse_log_line(line_.decode("utf-8")) for line_ in lines)
+
+
+def aggregate_log_file_from_offset(log_file: LatestLogFile,
+                                   offset: int,
+                                   aggregate: LogAggregate,
+                                   use_fast_parser: bool) -> int:
+
+    """
+    Parses log file starting from offset and adds lines to aggregate
+    :param log_file: file with logs to parse
+    :param offset: offset to start parsing from, should be the beginning of line
+    :param aggregate: aggregate to add lines to
+    :param use_fast_parser: whether to parse lines with binary parser
+    :return: offset right after the last parsed line
+    """
+
+    with read_log_lines_from_offset(log_file=log_file, offset=offset) as lines_reader:
+        aggregate_lines(lines=lines_reader, aggregate=aggregate, use_fast_parser=use_fast_parser)
+
+    return lines_reader.offset
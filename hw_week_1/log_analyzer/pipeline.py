@@ -0,0 +1,211 @@
+import gzip
+import io
+import logging
+import queue
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
+from functools import partial
+from typing import Callable, Iterator, NoReturn, Optional, Tuple
+
+from aggregation import LogAggregate
+from failures import FailureRateMonitor
+from metrics import PARSE_STAGE, RunMetrics
+from models import LatestLogFile
+from parallel import (
+    DEFAULT_BLOCK_SIZE,
+    MAX_PENDING_BLOCKS_PER_WORKER,
+    aggregate_binary_lines_block,
+    aggregate_lines_block,
+    iter_line_aligned_blocks,
+    merge_in_order
+)
+from parsers import aggregate_binary_lines, parse_log_line
+
+DEFAULT_GZIP_READER = "default"
+PIPELINED_GZIP_READER = "pipelined"
+EXTERNAL_GZIP_READER = "external"
+
+EXTERNAL_DECOMPRESSORS = (("pigz", "-dc"), ("zcat",))
+MAX_QUEUED_BLOCKS = 4
+_END_OF_BLOCKS = None
+
+
+def find_external_decompressor() -> Optional[Tuple[str, ...]]:
+
+    """
+    Finds command of installed external gzip decompressor, pigz is preferred
+    :return: command without path to file or None if nothing is installed
+    """
+
+    for command in EXTERNAL_DECOMPRESSORS:
+        if shutil.which(command[0]) is not None:
+            return command
+
+    return None
+
+
+@contextmanager
+def open_gzip_stream(path: str, use_external_decompressor: bool) -> Iterator[io.BufferedIOBase]:
+
+    """
+    Opens decompressed stream of gzip file. External decompressor runs as subprocess,
+    so decompression does not share interpreter with parsing
+    :param path: path to gzip file
+    :param use_external_decompressor: whether to decompress with pigz or zcat if installed
+    :return: binary stream of decompressed data
+    """
+
+    command = find_external_decompressor() if use_external_decompressor else None
+    if use_external_decompressor and command is None:
+        logging.info("Neither pigz nor zcat is installed, log is decompressed with gzip module")
+
+    if command is None:
+        with gzip.open(path, mode="rb") as gz_log:
+            yield gz_log
+        return
+
+    process = subprocess.Popen(
+        [*command, path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=DEFAULT_BLOCK_SIZE
+    )
+    try:
+        yield process.stdout
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        return_code = process.wait()
+    if return_code != 0:
+        raise OSError(f"{command[0]} failed to decompress {path}: {stderr.decode('utf-8', errors='replace')}")
+
+
+def iter_blocks_in_background(blocks_gen: Iterator[bytes], max_queued: int = MAX_QUEUED_BLOCKS) -> Iterator[bytes]:
+
+    """
+    Reads blocks in separate thread and passes them through bounded queue,
+    so that reading and decompression overlap with processing of previous blocks.
+    Exception raised while reading is raised in consumer
+    :param blocks_gen: generator of blocks
+    :param max_queued: maximum number of blocks read ahead
+    :return: generator of the same blocks
+    """
+
+    blocks_queue = queue.Queue(maxsize=max_queued)
+    is_stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not is_stopped.is_set():
+            try:
+                blocks_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> NoReturn:
+        try:
+            for block in blocks_gen:
+                if not put(block):
+                    return
+        except Exception as exc:
+            put(exc)
+            return
+        put(_END_OF_BLOCKS)
+
+    producer = threading.Thread(target=produce, name="log-reader", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = blocks_queue.get()
+            if item is _END_OF_BLOCKS:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        is_stopped.set()
+        producer.join()
+
+
+def add_lines_block(block: bytes, aggregate: LogAggregate, use_fast_parser: bool) -> NoReturn:
+
+    """
+    Parses block of log lines and adds them to aggregate
+    :param block: bytes of log lines
+    :param aggregate: aggregate to add lines to
+    :param use_fast_parser: whether to parse lines with binary parser
+    """
+
+    if use_fast_parser:
+        aggregate_binary_lines(lines=io.BytesIO(block), aggregate=aggregate)
+        return
+
+    with io.TextIOWrapper(io.BytesIO(block), encoding="utf-8") as lines:
+        aggregate.add_parsed_lines(map(parse_log_line, lines))
+
+
+def aggregate_gzip_log_pipelined(
+        log_file: LatestLogFile,
+        workers: int = 1,
+        aggregate_factory: Callable[[], LogAggregate] = LogAggregate,
+        use_fast_parser: bool = False,
+        use_external_decompressor: bool = False,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        failure_monitor: Optional[FailureRateMonitor] = None,
+        metrics: Optional[RunMetrics] = None
+) -> LogAggregate:
+
+    """
+    Aggregates gzip log with pipeline: blocks aligned on lines are decompressed
+    in background thread (or external decompressor) and parsed in current process
+    or in pool of worker processes while the next blocks are decompressed.
+    Lines are added to single aggregate in order, so with one worker
+    result is the same as with sequential parsing
+    :param log_file: gzip log file to aggregate
+    :param workers: number of worker processes to parse blocks with
+    :param aggregate_factory: function creating empty aggregate
+    :param use_fast_parser: whether to parse lines with binary parser
+    :param use_external_decompressor: whether to decompress with pigz or zcat if installed
+    :param block_size: size of block to read at once
+    :param failure_monitor: monitor of failures percentage checked after every block
+    :param metrics: metrics of run to add time of decompression and, with one worker, time of parsing to
+    :return: aggregate of whole log file
+    """
+
+    if metrics is None:
+        metrics = RunMetrics()
+
+    with open_gzip_stream(path=log_file.path, use_external_decompressor=use_external_decompressor) as gz_log:
+        blocks_gen = iter_blocks_in_background(iter_line_aligned_blocks(
+            stream=metrics.measure_decompression(gz_log),
+            block_size=block_size
+        ))
+        with closing(blocks_gen):
+
+            if workers <= 1:
+                aggregate = aggregate_factory()
+                for block in blocks_gen:
+                    with metrics.measure_aggregate_stage(PARSE_STAGE):
+                        add_lines_block(block=block, aggregate=aggregate, use_fast_parser=use_fast_parser)
+                    if failure_monitor is not None:
+                        failure_monitor.check(aggregate)
+                return aggregate
+
+            block_aggregator = partial(
+                aggregate_binary_lines_block if use_fast_parser else aggregate_lines_block,
+                aggregate_factory=aggregate_factory
+            )
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return merge_in_order(
+                    executor=executor,
+                    func=block_aggregator,
+                    args_gen=((block,) for block in blocks_gen),
+                    max_pending=workers * MAX_PENDING_BLOCKS_PER_WORKER,
+                    aggregate_factory=aggregate_factory,
+                    failure_monitor=failure_monitor
+                )
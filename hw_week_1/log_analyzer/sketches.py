@@ -0,0 +1,189 @@
+import math
+from bisect import bisect_left, bisect_right
+from functools import reduce
+from operator import add
+from typing import Dict, Iterable, List, NoReturn, Sequence, Tuple
+
+MIN_TRACKED_VALUE = 1e-9
+# upper bounds of latency histogram buckets in seconds, the last bucket counts slower requests
+LATENCY_HISTOGRAM_BOUNDS: Tuple[float, ...] = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class QuantileSketch:
+
+    """
+    Mergeable quantile sketch with relative accuracy guarantee.
+    Values are counted in logarithmic buckets with bounds growing as powers of
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy),
+    so every quantile is estimated with relative error not greater than relative_accuracy.
+    Number of buckets depends only on the range of values, not on their number.
+    Values not greater than MIN_TRACKED_VALUE are counted as zeros
+    """
+
+    __slots__ = ("relative_accuracy", "_gamma", "_log_gamma", "buckets", "zero_count", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"Relative accuracy should be between 0 and 1, not {relative_accuracy}")
+
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = dict()
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> NoReturn:
+
+        """
+        Adds value to sketch
+        :param value: non-negative value
+        """
+
+        self.count += 1
+        if value <= MIN_TRACKED_VALUE:
+            self.zero_count += 1
+            return
+
+        bucket_index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[bucket_index] = self.buckets.get(bucket_index, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> NoReturn:
+
+        """
+        Merges other sketch into current one
+        :param other: sketch with the same relative accuracy
+        """
+
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy could be merged")
+
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for bucket_index, bucket_count in other.buckets.items():
+            self.buckets[bucket_index] = self.buckets.get(bucket_index, 0) + bucket_count
+
+    def _value_at_rank(self, rank: int) -> float:
+
+        """
+        Estimates value with specified rank among sorted added values
+        :param rank: rank of value starting from 0
+        :return: estimated value
+        """
+
+        seen_count = self.zero_count
+        if seen_count > rank:
+            return 0.0
+
+        for bucket_index in sorted(self.buckets):
+            seen_count += self.buckets[bucket_index]
+            if seen_count > rank:
+                break
+
+        return 2 * self._gamma ** bucket_index / (self._gamma + 1)
+
+    def quantile(self, q: float) -> float:
+
+        """
+        Estimates quantile of added values.
+        Like statistics.median, it interpolates between neighbour values
+        when quantile falls between them
+        :param q: quantile level from 0 to 1
+        :return: estimated value of quantile
+        """
+
+        if not self.count:
+            raise ValueError("Quantile of empty sketch is undefined")
+
+        rank = q * (self.count - 1)
+        lower_rank = math.floor(rank)
+        lower_value = self._value_at_rank(lower_rank)
+        if rank == lower_rank:
+            return lower_value
+
+        upper_value = self._value_at_rank(lower_rank + 1)
+
+        return lower_value + (upper_value - lower_value) * (rank - lower_rank)
+
+
+class LatencyHistogram:
+
+    """
+    Mergeable histogram of request durations with fixed buckets.
+    Bucket i counts values not greater than bounds[i] and greater than the previous bound,
+    the last bucket counts values greater than all bounds
+    """
+
+    __slots__ = ("bounds", "counts")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_HISTOGRAM_BOUNDS):
+
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+
+    def add(self, value: float) -> NoReturn:
+        self.counts[bisect_left(self.bounds, value)] += 1
+
+    def merge(self, other: "LatencyHistogram") -> NoReturn:
+
+        """
+        Merges other histogram into current one
+        :param other: histogram with the same bounds
+        """
+
+        if other.bounds != self.bounds:
+            raise ValueError("Only histograms with the same bounds could be merged")
+
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+
+
+def sum_in_order(values: Iterable[float]) -> float:
+
+    """
+    Adds values one by one in order without compensation of rounding errors, like np.bincount with weights.
+    Builtin sum of floats is compensated since python 3.12, so it is not used for sums
+    that should be the same for all aggregation backends
+    :param values: values to add
+    :return: sum of values
+    """
+
+    return reduce(add, values, 0.0)
+
+
+def count_sorted_values_in_buckets(sorted_values: Sequence[float],
+                                   bounds: Tuple[float, ...] = LATENCY_HISTOGRAM_BOUNDS) -> List[int]:
+
+    """
+    Counts sorted values in buckets of latency histogram
+    :param sorted_values: values sorted in ascending order
+    :param bounds: upper bounds of buckets
+    :return: counts of values by bucket, the same as in LatencyHistogram
+    """
+
+    bucket_ends = [bisect_right(sorted_values, bound) for bound in bounds]
+    bucket_ends.append(len(sorted_values))
+
+    return [bucket_end - bucket_start for bucket_start, bucket_end in zip([0] + bucket_ends, bucket_ends)]
+
+
+def quantile_of_sorted(sorted_values: Sequence[float], q: float) -> float:
+
+    """
+    Calculates quantile of sorted values interpolating between neighbour values
+    the same way as QuantileSketch.quantile
+    :param sorted_values: values sorted in ascending order
+    :param q: quantile level from 0 to 1
+    :return: quantile of values
+    """
+
+    if not len(sorted_values):
+        raise ValueError("Quantile of empty sequence is undefined")
+
+    rank = q * (len(sorted_values) - 1)
+    lower_rank = math.floor(rank)
+    lower_value = sorted_values[lower_rank]
+    if rank == lower_rank:
+        return lower_value
+
+    return lower_value + (sorted_values[lower_rank + 1] - lower_value) * (rank - lower_rank)
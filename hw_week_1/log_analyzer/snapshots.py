@@ -0,0 +1,131 @@
+import logging
+import pickle
+import sqlite3
+import zlib
+from typing import NamedTuple, NoReturn, Optional
+
+from aggregation import LogAggregate
+
+SNAPSHOTS_FILE_NAME = "snapshots.sqlite"
+# several processes could update snapshots of different logs at once
+LOCK_TIMEOUT_SEC = 60
+
+CREATE_SNAPSHOTS_TABLE = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    log_path TEXT PRIMARY KEY,
+    log_date TEXT NOT NULL,
+    log_size INTEGER NOT NULL,
+    aggregator TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    aggregate BLOB NOT NULL
+)
+"""
+
+
+class LogSnapshot(NamedTuple):
+
+    """
+    Class with saved state of log file parsing such as:
+    - log_path - path to log file
+    - log_date - date from log file name in YYYYMMDD format
+    - log_size - size of log file when it was parsed
+    - aggregator - name of url aggregator used for aggregate
+    - offset - offset right after the last parsed line
+    - aggregate - aggregate of parsed lines
+    """
+
+    log_path: str
+    log_date: str
+    log_size: int
+    aggregator: str
+    offset: int
+    aggregate: LogAggregate
+
+
+def dump_aggregate(aggregate: LogAggregate) -> bytes:
+    return zlib.compress(pickle.dumps(aggregate, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def load_aggregate(dumped_aggregate: bytes) -> LogAggregate:
+    return pickle.loads(zlib.decompress(dumped_aggregate))
+
+
+class SnapshotStore:
+
+    """
+    SQLite storage of log files aggregates
+    with offsets of the last parsed lines
+    """
+
+    def __init__(self, path: str):
+
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=LOCK_TIMEOUT_SEC)
+        with self._connection:
+            self._connection.execute(CREATE_SNAPSHOTS_TABLE)
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc_info) -> NoReturn:
+        self.close()
+
+    def close(self) -> NoReturn:
+        self._connection.close()
+
+    @staticmethod
+    def _row_to_snapshot(row: tuple) -> LogSnapshot:
+        log_path, log_date, log_size, aggregator, offset, dumped_aggregate = row
+        return LogSnapshot(
+            log_path=log_path,
+            log_date=log_date,
+            log_size=log_size,
+            aggregator=aggregator,
+            offset=offset,
+            aggregate=load_aggregate(dumped_aggregate)
+        )
+
+    def load(self, log_path: str) -> Optional[LogSnapshot]:
+
+        """
+        Loads snapshot of log file. Snapshot saved with other layout of aggregates
+        could not be loaded and is treated as missing
+        :param log_path: path to log file
+        :return: snapshot if log file was parsed before and None otherwise
+        """
+
+        row = self._connection.execute(
+            "SELECT log_path, log_date, log_size, aggregator, offset, aggregate "
+            "FROM snapshots WHERE log_path = ?",
+            (log_path,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        try:
+            return self._row_to_snapshot(row)
+        except (pickle.UnpicklingError, AttributeError, TypeError) as exception:
+            logging.warning("Snapshot of log file %s could not be loaded: %s", log_path, exception)
+            return None
+
+    def save(self, snapshot: LogSnapshot) -> NoReturn:
+
+        """
+        Saves snapshot of log file replacing previous one
+        :param snapshot: snapshot to save
+        """
+
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO snapshots "
+                "(log_path, log_date, log_size, aggregator, offset, aggregate) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    snapshot.log_path,
+                    snapshot.log_date,
+                    snapshot.log_size,
+                    snapshot.aggregator,
+                    snapshot.offset,
+                    dump_aggregate(snapshot.aggregate)
+                )
+            )
@@ -0,0 +1,306 @@
+import pickle
+import random
+import unittest
+from statistics import median
+
+from aggregation import (
+    EXACT_AGGREGATOR,
+    SKETCH_AGGREGATOR,
+    ExactUrlAggregator,
+    LogAggregate,
+    SketchUrlAggregator,
+    get_url_aggregator_factory
+)
+from log_analyzer import calculate_url_stats, parse_log_file
+from models import Config, LatestLogFile
+from sketches import LatencyHistogram, QuantileSketch, count_sorted_values_in_buckets, quantile_of_sorted
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    """
+    Class for testing quantile sketch
+    """
+
+    RELATIVE_ACCURACY = 0.01
+
+    def setUp(self):
+        random_gen = random.Random(42)
+        self.values = [random_gen.lognormvariate(-1.5, 1.0) for _ in range(10001)]
+
+    def test_median_relative_error_is_bounded(self):
+
+        """
+        Tests that median estimation error is not greater than relative accuracy
+        """
+
+        sketch = QuantileSketch(relative_accuracy=TestQuantileSketch.RELATIVE_ACCURACY)
+        for value in self.values:
+            sketch.add(value)
+
+        exact_median = median(self.values)
+        relative_error = abs(sketch.quantile(0.5) - exact_median) / exact_median
+
+        self.assertLessEqual(relative_error, TestQuantileSketch.RELATIVE_ACCURACY)
+
+    def test_merged_sketch_is_the_same(self):
+
+        """
+        Tests that merging sketches gives the same sketch as adding all values to one sketch
+        """
+
+        whole_sketch = QuantileSketch(relative_accuracy=TestQuantileSketch.RELATIVE_ACCURACY)
+        first_sketch = QuantileSketch(relative_accuracy=TestQuantileSketch.RELATIVE_ACCURACY)
+        second_sketch = QuantileSketch(relative_accuracy=TestQuantileSketch.RELATIVE_ACCURACY)
+        for value_num, value in enumerate(self.values):
+            whole_sketch.add(value)
+            (first_sketch if value_num % 2 else second_sketch).add(value)
+        first_sketch.merge(second_sketch)
+
+        with self.subTest():
+            self.assertEqual(whole_sketch.count, first_sketch.count)
+        with self.subTest():
+            self.assertEqual(whole_sketch.buckets, first_sketch.buckets)
+
+    def test_zero_values_are_counted(self):
+
+        """
+        Tests that zero durations are taken into account
+        """
+
+        sketch = QuantileSketch(relative_accuracy=TestQuantileSketch.RELATIVE_ACCURACY)
+        for value in (0.0, 0.0, 0.0, 1.0):
+            sketch.add(value)
+
+        self.assertEqual(0.0, sketch.quantile(0.5))
+
+    def test_merging_different_accuracy_is_not_allowed(self):
+        with self.assertRaises(ValueError):
+            QuantileSketch(relative_accuracy=0.01).merge(QuantileSketch(relative_accuracy=0.05))
+
+    def test_tail_quantiles_relative_error_is_bounded(self):
+
+        """
+        Tests that tail quantiles are estimated with relative accuracy like median
+        """
+
+        sketch = QuantileSketch(relative_accuracy=TestQuantileSketch.RELATIVE_ACCURACY)
+        for value in self.values:
+            sketch.add(value)
+        sorted_values = sorted(self.values)
+
+        for q in (0.9, 0.95, 0.99):
+            exact_quantile = quantile_of_sorted(sorted_values, q)
+            with self.subTest(q=q):
+                self.assertLessEqual(
+                    abs(sketch.quantile(q) - exact_quantile) / exact_quantile,
+                    TestQuantileSketch.RELATIVE_ACCURACY
+                )
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    """
+    Class for testing histogram of request durations with fixed buckets
+    """
+
+    BOUNDS = (0.1, 1.0)
+    VALUES = (0.0, 0.1, 0.5, 1.0, 1.5, 0.05)
+
+    def test_histogram_counts(self):
+
+        """
+        Tests that values equal to bound are counted in its bucket and histogram of sorted values is the same
+        """
+
+        histogram = LatencyHistogram(bounds=TestLatencyHistogram.BOUNDS)
+        for value in TestLatencyHistogram.VALUES:
+            histogram.add(value)
+
+        with self.subTest():
+            self.assertEqual([3, 2, 1], histogram.counts)
+        with self.subTest():
+            self.assertEqual(
+                histogram.counts,
+                count_sorted_values_in_buckets(sorted(TestLatencyHistogram.VALUES), bounds=TestLatencyHistogram.BOUNDS)
+            )
+
+    def test_merged_histogram_is_the_same(self):
+
+        whole_histogram = LatencyHistogram(bounds=TestLatencyHistogram.BOUNDS)
+        first_histogram = LatencyHistogram(bounds=TestLatencyHistogram.BOUNDS)
+        second_histogram = LatencyHistogram(bounds=TestLatencyHistogram.BOUNDS)
+        for value_num, value in enumerate(TestLatencyHistogram.VALUES):
+            whole_histogram.add(value)
+            (first_histogram if value_num % 2 else second_histogram).add(value)
+        first_histogram.merge(second_histogram)
+
+        self.assertEqual(whole_histogram.counts, first_histogram.counts)
+
+    def test_merging_different_bounds_is_not_allowed(self):
+        with self.assertRaises(ValueError):
+            LatencyHistogram(bounds=(0.1,)).merge(LatencyHistogram(bounds=(0.2,)))
+
+
+class TestUrlAggregators(unittest.TestCase):
+
+    """
+    Class for testing aggregators of request durations by url
+    """
+
+    DURATIONS = (0.39, 0.133, 0.199, 0.704, 0.146, 0.628)
+
+    def test_exact_aggregator(self):
+
+        """
+        Tests that exact aggregator gives the same stats as calculated from list of durations
+        """
+
+        aggregator = ExactUrlAggregator()
+        for duration in TestUrlAggregators.DURATIONS:
+            aggregator.add(duration)
+
+        with self.subTest():
+            self.assertEqual(len(TestUrlAggregators.DURATIONS), aggregator.count)
+        with self.subTest():
+            self.assertEqual(sum(TestUrlAggregators.DURATIONS), aggregator.time_sum)
+        with self.subTest():
+            self.assertEqual(max(TestUrlAggregators.DURATIONS), aggregator.time_max)
+        with self.subTest():
+            self.assertEqual(median(TestUrlAggregators.DURATIONS), aggregator.median())
+        with self.subTest():
+            self.assertAlmostEqual(0.666, aggregator.quantile(0.9))
+        with self.subTest():
+            self.assertEqual(
+                count_sorted_values_in_buckets(sorted(TestUrlAggregators.DURATIONS)),
+                aggregator.histogram()
+            )
+        with self.subTest():
+            self.assertEqual(list(TestUrlAggregators.DURATIONS), aggregator.durations)
+
+    def test_exact_aggregator_sorts_durations_once(self):
+
+        """
+        Tests that sorted durations are reused by stats until new durations are added
+        and are not pickled with aggregator
+        """
+
+        aggregator = ExactUrlAggregator()
+        for duration in TestUrlAggregators.DURATIONS:
+            aggregator.add(duration)
+        sorted_durations = aggregator.get_sorted_durations()
+        aggregator.median()
+        aggregator.quantile(0.9)
+        aggregator.histogram()
+
+        with self.subTest():
+            self.assertIs(sorted_durations, aggregator.get_sorted_durations())
+        with self.subTest():
+            self.assertEqual([], pickle.loads(pickle.dumps(aggregator))._sorted_durations)
+
+        aggregator.add(0.001)
+        with self.subTest():
+            self.assertEqual(sorted(TestUrlAggregators.DURATIONS + (0.001,)), aggregator.get_sorted_durations())
+        with self.subTest():
+            self.assertEqual(median(TestUrlAggregators.DURATIONS + (0.001,)), aggregator.median())
+
+    def test_sketch_aggregator(self):
+
+        """
+        Tests that sketch aggregator keeps exact count, sum and max and approximate median
+        """
+
+        aggregator = SketchUrlAggregator(relative_accuracy=0.01)
+        for duration in TestUrlAggregators.DURATIONS:
+            aggregator.add(duration)
+
+        with self.subTest():
+            self.assertEqual(len(TestUrlAggregators.DURATIONS), aggregator.count)
+        with self.subTest():
+            self.assertEqual(sum(TestUrlAggregators.DURATIONS), aggregator.time_sum)
+        with self.subTest():
+            self.assertEqual(max(TestUrlAggregators.DURATIONS), aggregator.time_max)
+        with self.subTest():
+            self.assertAlmostEqual(median(TestUrlAggregators.DURATIONS), aggregator.median(), delta=0.01 * 0.4)
+        with self.subTest():
+            self.assertEqual(
+                count_sorted_values_in_buckets(sorted(TestUrlAggregators.DURATIONS)),
+                aggregator.histogram()
+            )
+
+    def test_unknown_aggregator(self):
+        with self.assertRaises(ValueError):
+            get_url_aggregator_factory(aggregator_name="unknown", relative_accuracy=0.01)
+
+    def test_merging_log_aggregates(self):
+
+        """
+        Tests that url aggregators are merged by url
+        """
+
+        first_aggregate = LogAggregate()
+        first_aggregate.url_aggregators["/a"] = ExactUrlAggregator()
+        first_aggregate.url_aggregators["/a"].add(1.0)
+        second_aggregate = LogAggregate()
+        second_aggregate.url_aggregators["/a"] = ExactUrlAggregator()
+        second_aggregate.url_aggregators["/a"].add(3.0)
+        second_aggregate.url_aggregators["/b"] = ExactUrlAggregator()
+        second_aggregate.url_aggregators["/b"].add(2.0)
+
+        first_aggregate.merge(second_aggregate)
+
+        with self.subTest():
+            self.assertEqual([1.0, 3.0], first_aggregate.url_aggregators["/a"].durations)
+        with self.subTest():
+            self.assertEqual([2.0], first_aggregate.url_aggregators["/b"].durations)
+
+
+class TestSketchUrlStats(unittest.TestCase):
+
+    """
+    Class for testing url stats calculated with sketch aggregator
+    """
+
+    LOG_FILE = LatestLogFile(
+        path="./nginx_logs/test_sample.txt",
+        date_of_creation=None,
+        extension=".txt"
+    )
+
+    def _calculate_url_stats(self, aggregator: str):
+        cfg = Config(
+            report_size=1000,
+            report_dir="./reports",
+            log_dir="./nginx_logs",
+            log_file="./script_logs/test.log",
+            failures_percent_threshold=50.0,
+            aggregator=aggregator,
+            median_relative_error=0.01
+        )
+        parsed_line_gen = parse_log_file(log_file=TestSketchUrlStats.LOG_FILE, log_file_opener=open)
+        return {
+            single_url_stat["url"]: single_url_stat
+            for single_url_stat in calculate_url_stats(parsed_line_gen=parsed_line_gen, cfg=cfg)
+        }
+
+    def test_sketch_stats_are_close_to_exact(self):
+
+        """
+        Tests that only median and percentiles differ between exact and sketch stats
+        """
+
+        exact_stats = self._calculate_url_stats(aggregator=EXACT_AGGREGATOR)
+        sketch_stats = self._calculate_url_stats(aggregator=SKETCH_AGGREGATOR)
+
+        self.assertEqual(exact_stats.keys(), sketch_stats.keys())
+        for url, exact_url_stat in exact_stats.items():
+            sketch_url_stat = sketch_stats[url]
+            with self.subTest(url=url):
+                for stat_name in ("count", "count_perc", "time_sum", "time_perc", "time_avg", "time_max", "time_hist"):
+                    self.assertEqual(exact_url_stat[stat_name], sketch_url_stat[stat_name])
+                for stat_name in ("time_med", "time_p90", "time_p95", "time_p99"):
+                    self.assertAlmostEqual(
+                        exact_url_stat[stat_name],
+                        sketch_url_stat[stat_name],
+                        delta=0.01 * exact_url_stat[stat_name] + 10 ** -3
+                    )
@@ -0,0 +1,165 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from typing import NoReturn
+
+from catalog import LOG_CATALOG_FILE_NAME, LogCatalog
+from log_analyzer import LOG_FILE_PATTERN, find_latest_log, find_logs_in_range, generate_report
+from models import Config, DateRange
+
+
+class TestLogCatalog(unittest.TestCase):
+
+    """
+    Class for testing catalog of log directory
+    """
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+    TEST_LOG_NAMES = (
+        "nginx-access-ui.log-20191101.log",
+        "nginx-access-ui.log-20191103.gz",
+        "nginx-access-ui.log-20191110.txt",
+        "nginx-access-ui.log-20191105.bz2",
+        "apache-access-ui.log-20191111.log"
+    )
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates folders with logs and report template
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.test_folder, "logs")
+        os.mkdir(self.log_dir)
+        for log_name in TestLogCatalog.TEST_LOG_NAMES:
+            shutil.copy(TestLogCatalog.SAMPLE_LOG_PATH, os.path.join(self.log_dir, log_name))
+        self._make_log_dir_old()
+        shutil.copy("./reports/report.html", self.test_folder)
+        self.catalog = LogCatalog(path=os.path.join(self.test_folder, LOG_CATALOG_FILE_NAME))
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes test folder
+        """
+
+        self.catalog.close()
+        shutil.rmtree(self.test_folder)
+
+    def _make_log_dir_old(self) -> NoReturn:
+        # mtime of just changed directory is not trusted by catalog
+        os.utime(self.log_dir, ns=(0, os.stat(self.log_dir).st_mtime_ns - 10 ** 10))
+
+    def test_logs_are_the_same_as_with_scanning(self):
+
+        """
+        Tests that catalog finds the same logs as scanning of directory
+        """
+
+        self.catalog.refresh(log_dir=self.log_dir, log_file_pattern=LOG_FILE_PATTERN)
+        date_range = DateRange(date_from=datetime.date(2019, 11, 1), date_to=datetime.date(2019, 11, 7))
+
+        with self.subTest():
+            self.assertEqual(
+                find_latest_log(log_dir=self.log_dir, log_file_pattern=LOG_FILE_PATTERN),
+                self.catalog.find_latest_log(log_dir=self.log_dir)
+            )
+        with self.subTest():
+            self.assertEqual(
+                find_logs_in_range(log_dir=self.log_dir, log_file_pattern=LOG_FILE_PATTERN, date_range=date_range),
+                self.catalog.find_logs_in_range(log_dir=self.log_dir, date_range=date_range)
+            )
+
+    def test_logs_with_invalid_date_are_skipped(self):
+
+        shutil.copy(TestLogCatalog.SAMPLE_LOG_PATH, os.path.join(self.log_dir, "nginx-access-ui.log-20191199.log"))
+        self.catalog.refresh(log_dir=self.log_dir, log_file_pattern=LOG_FILE_PATTERN)
+
+        self.assertEqual(
+            "nginx-access-ui.log-20191110.txt",
+            os.path.basename(self.catalog.find_latest_log(log_dir=self.log_dir).path)
+        )
+
+    def test_directory_is_scanned_only_when_changed(self):
+
+        with self.subTest():
+            self.assertTrue(self.catalog.refresh(log_dir=self.log_dir, log_file_pattern=LOG_FILE_PATTERN))
+        with self.subTest():
+            self.assertFalse(self.catalog.refresh(log_dir=self.log_dir, log_file_pattern=LOG_FILE_PATTERN))
+
+        new_log_path = os.path.join(self.log_dir, "nginx-access-ui.log-20191120.log")
+        shutil.copy(TestLogCatalog.SAMPLE_LOG_PATH, new_log_path)
+        os.remove(os.path.join(self.log_dir, "nginx-access-ui.log-20191101.log"))
+        self._make_log_dir_old()
+        with self.subTest():
+            self.assertTrue(self.catalog.refresh(log_dir=self.log_dir, log_file_pattern=LOG_FILE_PATTERN))
+        with self.subTest():
+            self.assertEqual(new_log_path, self.catalog.find_latest_log(log_dir=self.log_dir).path)
+        with self.subTest():
+            self.assertEqual(
+                ["nginx-access-ui.log-20191103.gz"],
+                [
+                    os.path.basename(log_file.path)
+                    for log_file in self.catalog.find_logs_in_range(
+                        log_dir=self.log_dir,
+                        date_range=DateRange(date_from=datetime.date(2019, 11, 1), date_to=datetime.date(2019, 11, 7))
+                    )
+                ]
+            )
+
+    def test_processed_logs(self):
+
+        """
+        Tests that processed flag is kept until log is changed
+        """
+
+        self.catalog.refresh(log_dir=self.log_dir, log_file_pattern=LOG_FILE_PATTERN)
+        latest_log_file = self.catalog.find_latest_log(log_dir=self.log_dir)
+        self.catalog.mark_processed(log_file=latest_log_file)
+
+        with self.subTest():
+            self.assertTrue(self.catalog.is_processed(log_file=latest_log_file))
+
+        with open(latest_log_file.path, "ab") as log:
+            log.write(b"\n")
+        with self.subTest():
+            self.assertFalse(self.catalog.is_processed(log_file=latest_log_file))
+
+    def test_report_is_generated_with_catalog(self):
+
+        """
+        Tests that report is generated again only if log was changed since report was done
+        """
+
+        config = Config(
+            report_size=1000,
+            report_dir=self.test_folder,
+            log_dir=self.log_dir,
+            log_file="./script_logs/test.log",
+            failures_percent_threshold=50.0,
+            use_log_catalog=True
+        )
+        report_name = os.path.join(self.test_folder, "report-2019.11.10.html")
+        generate_report(config=config, log_file_pattern=LOG_FILE_PATTERN)
+        latest_log_file = self.catalog.find_latest_log(log_dir=self.log_dir)
+
+        with self.subTest():
+            self.assertTrue(os.path.exists(report_name))
+        with self.subTest():
+            self.assertTrue(self.catalog.is_processed(log_file=latest_log_file))
+
+        os.utime(report_name, ns=(0, 0))
+        generate_report(config=config, log_file_pattern=LOG_FILE_PATTERN)
+        with self.subTest():
+            self.assertEqual(0, os.stat(report_name).st_mtime_ns)
+
+        with open(latest_log_file.path, "ab") as log:
+            log.write(b"\n")
+        generate_report(config=config, log_file_pattern=LOG_FILE_PATTERN)
+        with self.subTest():
+            self.assertNotEqual(0, os.stat(report_name).st_mtime_ns)
+        with self.subTest():
+            self.assertTrue(self.catalog.is_processed(log_file=latest_log_file))
@@ -0,0 +1,264 @@
+import datetime
+import json
+import pickle
+import random
+import unittest
+
+from columnar import COMPACT_BACKEND, NUMPY_BACKEND, ColumnarLogAggregate, CompactLogAggregate, np
+from log_analyzer import (
+    FAST_PARSER,
+    aggregate_log_file,
+    calculate_url_stats_from_aggregate,
+    get_log_aggregate_factory,
+    make_log_aggregate
+)
+from models import Config, LatestLogFile, SingleLogParserResult
+
+
+@unittest.skipUnless(np is not None, "numpy is not installed")
+class TestColumnarAggregate(unittest.TestCase):
+
+    """
+    Class for testing aggregation of log lines with numpy backend
+    """
+
+    TEST_CONFIG = Config(
+        report_size=1000,
+        report_dir="./reports",
+        log_dir="./nginx_logs",
+        log_file="./script_logs/test.log",
+        failures_percent_threshold=50.0
+    )
+
+    SAMPLE_LOG_FILE = LatestLogFile(
+        path="./nginx_logs/test_sample.txt",
+        date_of_creation=datetime.datetime(year=2017, month=6, day=30),
+        extension=".txt"
+    )
+
+    def _generate_parsed_lines(self, seed: int, num_lines: int = 5000):
+        random_gen = random.Random(seed)
+        for _ in range(num_lines):
+            yield SingleLogParserResult(
+                url=f"/api/v2/banner/{int(300 ** random_gen.random())}",
+                time=round(random_gen.lognormvariate(-1.5, 1.0), 3),
+                is_failed=random_gen.random() < 0.01
+            )
+
+    def _render_stats(self, aggregate) -> str:
+        return json.dumps(
+            calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=TestColumnarAggregate.TEST_CONFIG)
+        )
+
+    def test_sample_log_report_is_the_same(self):
+
+        """
+        Tests that report json of sample log is the same for both backends and parsers
+        """
+
+        for parser in ("default", FAST_PARSER):
+            cfg = TestColumnarAggregate.TEST_CONFIG._replace(parser=parser)
+            with self.subTest(parser=parser):
+                self.assertEqual(
+                    self._render_stats(aggregate_log_file(log_file=TestColumnarAggregate.SAMPLE_LOG_FILE, cfg=cfg)),
+                    self._render_stats(aggregate_log_file(
+                        log_file=TestColumnarAggregate.SAMPLE_LOG_FILE,
+                        cfg=cfg._replace(aggregation_backend=NUMPY_BACKEND)
+                    ))
+                )
+
+    def test_merged_aggregates_report_is_the_same(self):
+
+        """
+        Tests that merging aggregates of consecutive parts gives the same report as python backend
+        """
+
+        python_aggregate = make_log_aggregate(cfg=TestColumnarAggregate.TEST_CONFIG)
+        numpy_aggregate = ColumnarLogAggregate()
+        for seed in (1, 2, 3):
+            python_part = make_log_aggregate(cfg=TestColumnarAggregate.TEST_CONFIG)
+            python_part.add_parsed_lines(self._generate_parsed_lines(seed=seed))
+            python_aggregate.merge(python_part)
+
+            numpy_part = ColumnarLogAggregate()
+            numpy_part.add_parsed_lines(self._generate_parsed_lines(seed=seed))
+            numpy_aggregate.merge(numpy_part)
+
+        with self.subTest():
+            self.assertEqual(python_aggregate.num_failures, numpy_aggregate.num_failures)
+        with self.subTest():
+            self.assertEqual(self._render_stats(python_aggregate), self._render_stats(numpy_aggregate))
+
+    def test_stats_are_recalculated_after_adding_lines(self):
+
+        aggregate = ColumnarLogAggregate()
+        aggregate.add_parsed_lines([SingleLogParserResult(url="/a", time=1.0, is_failed=False)])
+        self.assertEqual(1, aggregate.url_aggregators["/a"].count)
+
+        aggregate.get_url_aggregator("/a").add(3.0)
+        with self.subTest():
+            self.assertEqual(2, aggregate.url_aggregators["/a"].count)
+        with self.subTest():
+            self.assertEqual(2.0, aggregate.url_aggregators["/a"].median())
+
+    def test_sums_are_added_in_order_of_lines(self):
+
+        """
+        Tests that sums of durations are not compensated like builtin sum of floats in newer pythons,
+        so they are the same as in python backend
+        """
+
+        lines = [SingleLogParserResult(url="/a", time=0.1, is_failed=False)] * 10
+        python_aggregate = make_log_aggregate(cfg=TestColumnarAggregate.TEST_CONFIG)
+        python_aggregate.add_parsed_lines(lines)
+        numpy_aggregate = ColumnarLogAggregate()
+        numpy_aggregate.add_parsed_lines(lines)
+
+        with self.subTest():
+            self.assertEqual(0.9999999999999999, numpy_aggregate.url_aggregators["/a"].time_sum)
+        with self.subTest():
+            self.assertEqual(
+                python_aggregate.url_aggregators["/a"].time_sum,
+                numpy_aggregate.url_aggregators["/a"].time_sum
+            )
+
+    def test_aggregate_could_be_pickled(self):
+
+        aggregate = ColumnarLogAggregate()
+        aggregate.add_parsed_lines(self._generate_parsed_lines(seed=1))
+        expected_stats = self._render_stats(aggregate)
+
+        self.assertEqual(expected_stats, self._render_stats(pickle.loads(pickle.dumps(aggregate))))
+
+    def test_unsupported_settings_are_rejected(self):
+
+        for cfg in (
+            TestColumnarAggregate.TEST_CONFIG._replace(aggregation_backend=NUMPY_BACKEND, aggregator="sketch"),
+            TestColumnarAggregate.TEST_CONFIG._replace(aggregation_backend=NUMPY_BACKEND, max_tracked_urls=10),
+            TestColumnarAggregate.TEST_CONFIG._replace(aggregation_backend="unknown")
+        ):
+            with self.subTest(cfg=cfg):
+                with self.assertRaises(ValueError):
+                    get_log_aggregate_factory(cfg=cfg)
+
+    def test_parallel_report_is_the_same(self):
+
+        """
+        Tests that report of sample log parsed with pool of processes is the same for both backends
+        """
+
+        cfg = TestColumnarAggregate.TEST_CONFIG._replace(workers=2)
+
+        self.assertEqual(
+            self._render_stats(aggregate_log_file(log_file=TestColumnarAggregate.SAMPLE_LOG_FILE, cfg=cfg)),
+            self._render_stats(aggregate_log_file(
+                log_file=TestColumnarAggregate.SAMPLE_LOG_FILE,
+                cfg=cfg._replace(aggregation_backend=NUMPY_BACKEND)
+            ))
+        )
+
+
+class TestCompactAggregate(unittest.TestCase):
+
+    """
+    Class for testing aggregation of log lines with compact backend
+    """
+
+    TEST_CONFIG = TestColumnarAggregate.TEST_CONFIG
+    SAMPLE_LOG_FILE = TestColumnarAggregate.SAMPLE_LOG_FILE
+
+    _generate_parsed_lines = TestColumnarAggregate._generate_parsed_lines
+    _render_stats = TestColumnarAggregate._render_stats
+
+    def test_sample_log_report_is_the_same(self):
+
+        """
+        Tests that report json of sample log is the same as with python backend for both parsers
+        """
+
+        for parser in ("default", FAST_PARSER):
+            cfg = TestCompactAggregate.TEST_CONFIG._replace(parser=parser)
+            with self.subTest(parser=parser):
+                self.assertEqual(
+                    self._render_stats(aggregate_log_file(log_file=TestCompactAggregate.SAMPLE_LOG_FILE, cfg=cfg)),
+                    self._render_stats(aggregate_log_file(
+                        log_file=TestCompactAggregate.SAMPLE_LOG_FILE,
+                        cfg=cfg._replace(aggregation_backend=COMPACT_BACKEND)
+                    ))
+                )
+
+    def test_merged_aggregates_report_is_the_same(self):
+
+        """
+        Tests that merging aggregates of consecutive parts gives the same report as python backend
+        """
+
+        python_aggregate = make_log_aggregate(cfg=TestCompactAggregate.TEST_CONFIG)
+        compact_aggregate = CompactLogAggregate()
+        for seed in (1, 2, 3):
+            python_part = make_log_aggregate(cfg=TestCompactAggregate.TEST_CONFIG)
+            python_part.add_parsed_lines(self._generate_parsed_lines(seed=seed))
+            python_aggregate.merge(python_part)
+
+            compact_part = CompactLogAggregate()
+            compact_part.add_parsed_lines(self._generate_parsed_lines(seed=seed))
+            compact_aggregate.merge(compact_part)
+
+        with self.subTest():
+            self.assertEqual(python_aggregate.num_failures, compact_aggregate.num_failures)
+        with self.subTest():
+            self.assertEqual(self._render_stats(python_aggregate), self._render_stats(compact_aggregate))
+
+    def test_stats_are_updated_after_adding_lines(self):
+
+        aggregate = CompactLogAggregate()
+        aggregate.add_parsed_lines([SingleLogParserResult(url="/a", time=1.0, is_failed=False)])
+        self.assertEqual(1, aggregate.url_aggregators["/a"].count)
+
+        aggregate.get_url_aggregator("/b").add(2.0)
+        aggregate.get_url_aggregator("/a").add(3.0)
+        with self.subTest():
+            self.assertEqual(["/a", "/b"], list(aggregate.url_aggregators))
+        with self.subTest():
+            self.assertEqual(2, aggregate.url_aggregators["/a"].count)
+        with self.subTest():
+            self.assertEqual(2.0, aggregate.url_aggregators["/a"].median())
+        with self.subTest():
+            self.assertEqual(3.0, aggregate.url_aggregators["/a"].time_max)
+
+    def test_sums_are_added_in_order_of_lines(self):
+
+        aggregate = CompactLogAggregate()
+        aggregate.add_parsed_lines([SingleLogParserResult(url="/a", time=0.1, is_failed=False)] * 10)
+
+        self.assertEqual(0.9999999999999999, aggregate.url_aggregators["/a"].time_sum)
+
+    def test_aggregate_could_be_pickled(self):
+
+        aggregate = CompactLogAggregate()
+        aggregate.add_parsed_lines(self._generate_parsed_lines(seed=1))
+        expected_stats = self._render_stats(aggregate)
+
+        self.assertEqual(expected_stats, self._render_stats(pickle.loads(pickle.dumps(aggregate))))
+
+    def test_unsupported_settings_are_rejected(self):
+
+        for cfg in (
+            TestCompactAggregate.TEST_CONFIG._replace(aggregation_backend=COMPACT_BACKEND, aggregator="sketch"),
+            TestCompactAggregate.TEST_CONFIG._replace(aggregation_backend=COMPACT_BACKEND, max_tracked_urls=10)
+        ):
+            with self.subTest(cfg=cfg):
+                with self.assertRaises(ValueError):
+                    get_log_aggregate_factory(cfg=cfg)
+
+    def test_parallel_report_is_the_same(self):
+
+        cfg = TestCompactAggregate.TEST_CONFIG._replace(workers=2)
+
+        self.assertEqual(
+            self._render_stats(aggregate_log_file(log_file=TestCompactAggregate.SAMPLE_LOG_FILE, cfg=cfg)),
+            self._render_stats(aggregate_log_file(
+                log_file=TestCompactAggregate.SAMPLE_LOG_FILE,
+                cfg=cfg._replace(aggregation_backend=COMPACT_BACKEND)
+            ))
+        )
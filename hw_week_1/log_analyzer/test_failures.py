@@ -0,0 +1,146 @@
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from typing import NoReturn
+
+from aggregation import LogAggregate
+from failures import FAILURES_CHECK_INTERVAL_LINES, FailureRateMonitor, FailuresPercentageError, wilson_lower_bound
+from log_analyzer import FAST_PARSER, aggregate_log_file
+from models import Config, LatestLogFile
+from pipeline import aggregate_gzip_log_pipelined
+
+
+class TestFailureRateMonitor(unittest.TestCase):
+
+    """
+    Class for testing online check of failures percentage
+    """
+
+    @staticmethod
+    def _make_aggregate(num_lines: int, num_failures: int) -> LogAggregate:
+        aggregate = LogAggregate()
+        aggregate.num_requests, aggregate.num_failures = num_lines, num_failures
+        return aggregate
+
+    def test_wilson_lower_bound(self):
+
+        with self.subTest():
+            self.assertEqual(0.0, wilson_lower_bound(num_failures=0, num_lines=100, z=2.33))
+        with self.subTest():
+            self.assertLess(wilson_lower_bound(num_failures=10, num_lines=100, z=2.33), 0.1)
+        with self.subTest():
+            self.assertAlmostEqual(0.1, wilson_lower_bound(num_failures=10 ** 5, num_lines=10 ** 6, z=2.33), places=2)
+
+    def test_parsing_is_aborted_only_after_warmup(self):
+
+        monitor = FailureRateMonitor(threshold_percent=10.0, warmup_lines=1000, confidence=0.99)
+
+        monitor.check(self._make_aggregate(num_lines=999, num_failures=999))
+        with self.assertRaises(FailuresPercentageError):
+            monitor.check(self._make_aggregate(num_lines=1000, num_failures=1000))
+
+    def test_parsing_is_not_aborted_without_confidence(self):
+
+        """
+        Tests that parsing is not aborted when failures percentage is above threshold only by chance
+        """
+
+        monitor = FailureRateMonitor(threshold_percent=10.0, warmup_lines=100, confidence=0.99)
+
+        monitor.check(self._make_aggregate(num_lines=100, num_failures=15))
+        with self.assertRaises(FailuresPercentageError):
+            monitor.check(self._make_aggregate(num_lines=10000, num_failures=1500))
+
+    def test_lines_are_checked_by_chunks_after_warmup(self):
+
+        """
+        Tests that warm-up sample is checked as one chunk and the following lines by chunks of check interval,
+        which is not shortened by short warm-up
+        """
+
+        for warmup_lines in (0, 1, 100, FAILURES_CHECK_INTERVAL_LINES * 3):
+            monitor = FailureRateMonitor(threshold_percent=10.0, warmup_lines=warmup_lines, confidence=0.99)
+            with self.subTest(warmup_lines=warmup_lines):
+                self.assertEqual(
+                    warmup_lines or FAILURES_CHECK_INTERVAL_LINES,
+                    monitor.get_num_lines_to_next_check(num_lines=0)
+                )
+                self.assertEqual(
+                    FAILURES_CHECK_INTERVAL_LINES,
+                    monitor.get_num_lines_to_next_check(num_lines=warmup_lines)
+                )
+
+
+class TestEarlyAbort(unittest.TestCase):
+
+    """
+    Class for testing that parsing of bad log is aborted before the end of log
+    """
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+    NUM_BAD_LINES = 2000
+    NUM_GOOD_LINES = 20000
+
+    TEST_CONFIG = Config(
+        report_size=1000,
+        report_dir="./reports",
+        log_dir="./nginx_logs",
+        log_file="./script_logs/test.log",
+        failures_percent_threshold=20.0
+    )
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates log starting with bad lines, failures percentage of the whole log is below threshold
+        """
+
+        with open(TestEarlyAbort.SAMPLE_LOG_PATH, "rb") as sample_log:
+            good_line = sample_log.readline()
+        log_lines = b"bad line\n" * TestEarlyAbort.NUM_BAD_LINES + good_line * TestEarlyAbort.NUM_GOOD_LINES
+
+        self.test_folder = tempfile.mkdtemp()
+        self.log_file = LatestLogFile(
+            path=os.path.join(self.test_folder, "nginx-access-ui.log-20191105.log"),
+            date_of_creation=datetime.datetime(year=2019, month=11, day=5),
+            extension=".log"
+        )
+        with open(self.log_file.path, "wb") as log:
+            log.write(log_lines)
+        self.gz_log_file = self.log_file._replace(path=self.log_file.path + ".gz", extension=".gz")
+        with gzip.open(self.gz_log_file.path, "wb") as gz_log:
+            gz_log.write(log_lines)
+
+    def tearDown(self) -> NoReturn:
+        shutil.rmtree(self.test_folder)
+
+    def test_whole_log_passes_final_check(self):
+
+        aggregate = aggregate_log_file(log_file=self.log_file, cfg=TestEarlyAbort.TEST_CONFIG)
+
+        self.assertEqual(TestEarlyAbort.NUM_BAD_LINES + TestEarlyAbort.NUM_GOOD_LINES, aggregate.num_requests)
+
+    def test_parsing_is_aborted_after_warmup(self):
+
+        cfg = TestEarlyAbort.TEST_CONFIG._replace(failures_warmup_lines=500)
+        for parser in ("default", FAST_PARSER):
+            with self.subTest(parser=parser):
+                with self.assertRaises(FailuresPercentageError):
+                    aggregate_log_file(log_file=self.log_file, cfg=cfg._replace(parser=parser))
+
+    def test_pipelined_parsing_is_aborted_after_warmup(self):
+
+        monitor = FailureRateMonitor(threshold_percent=20.0, warmup_lines=500, confidence=0.99)
+        with self.assertRaises(FailuresPercentageError):
+            aggregate_gzip_log_pipelined(log_file=self.gz_log_file, failure_monitor=monitor, block_size=4096)
+
+    def test_preflight_aborts_parallel_parsing(self):
+
+        cfg = TestEarlyAbort.TEST_CONFIG._replace(preflight_lines=100, workers=2)
+        for log_file in (self.log_file, self.gz_log_file):
+            with self.subTest(extension=log_file.extension):
+                with self.assertRaises(FailuresPercentageError):
+                    aggregate_log_file(log_file=log_file, cfg=cfg)
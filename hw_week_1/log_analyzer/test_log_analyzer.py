@@ -1,11 +1,28 @@
 import datetime
+import json
 import os
+import shutil
+import tempfile
 import unittest
+from string import Template
 from typing import NoReturn, Tuple
 
+from aggregation import ExactUrlAggregator, LogAggregate
 from log_analyzer import LOG_FILE_PATTERN
 from log_analyzer import find_latest_log, parse_log_file, calculate_url_stats
+from log_analyzer import (
+    aggregate_log_files,
+    calculate_url_stats_from_aggregate,
+    find_logs_in_range,
+    generate_range_report,
+    get_last_days_range,
+    parse_date_range,
+    render_report,
+    select_top_urls
+)
 from models import Config, LatestLogFile
+from models import DateRange
+from sketches import LATENCY_HISTOGRAM_BOUNDS
 
 
 class TestLatestLogFileFinder(unittest.TestCase):
@@ -189,4 +206,245 @@ class TestUrlStatsCalculator(unittest.TestCase):
                 self.assertIn("time_avg", single_url_stat)
                 self.assertIn("time_max", single_url_stat)
                 self.assertIn("time_med", single_url_stat)
+                self.assertIn("time_p90", single_url_stat)
+                self.assertIn("time_p95", single_url_stat)
+                self.assertIn("time_p99", single_url_stat)
+                self.assertIn("time_hist", single_url_stat)
 
+        with self.subTest():
+            for single_url_stat in url_stats:
+                self.assertLessEqual(single_url_stat["time_med"], single_url_stat["time_p90"])
+                self.assertLessEqual(single_url_stat["time_p90"], single_url_stat["time_p95"])
+                self.assertLessEqual(single_url_stat["time_p95"], single_url_stat["time_p99"])
+                self.assertLessEqual(single_url_stat["time_p99"], single_url_stat["time_max"])
+                self.assertEqual(single_url_stat["count"], sum(single_url_stat["time_hist"]))
+
+    def test_top_urls_are_the_same_as_with_full_sort(self):
+
+        """
+        Tests that heap selection of top urls gives the same urls in the same order as full sort,
+        including urls with equal total time
+        """
+
+        aggregate = LogAggregate()
+        aggregate.add_parsed_lines(parse_log_file(log_file=TestUrlStatsCalculator.LOG_FILE, log_file_opener=open))
+        for url in ("/tie/first", "/tie/second", "/tie/third"):
+            aggregate.url_aggregators[url] = ExactUrlAggregator()
+            aggregate.url_aggregators[url].add(0.1)
+
+        fully_sorted_urls = [
+            url for url, _ in sorted(
+                aggregate.url_aggregators.items(),
+                key=lambda url_aggregator: round(url_aggregator[1].time_sum, 3),
+                reverse=True
+            )
+        ]
+
+        for report_size in (1, 50, len(fully_sorted_urls)):
+            top_urls = select_top_urls(url_aggregators=aggregate.url_aggregators, report_size=report_size)
+            with self.subTest(report_size=report_size):
+                self.assertEqual(fully_sorted_urls[:report_size], [url for url, _ in top_urls])
+
+
+class TestRangeReport(unittest.TestCase):
+
+    """
+    Class for testing report over range of dates
+    """
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+    TEST_LOG_DATES = ("20191101", "20191102", "20191103", "20191110")
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates test folder with several copies of sample log and report template
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        for log_date in TestRangeReport.TEST_LOG_DATES:
+            shutil.copy(
+                TestRangeReport.SAMPLE_LOG_PATH,
+                os.path.join(self.test_folder, f"nginx-access-ui.log-{log_date}.log")
+            )
+        shutil.copy("./reports/report.html", self.test_folder)
+        self.config = Config(
+            report_size=1000,
+            report_dir=self.test_folder,
+            log_dir=self.test_folder,
+            log_file="./script_logs/test.log",
+            failures_percent_threshold=50.0
+        )
+        self.date_range = DateRange(
+            date_from=datetime.date(year=2019, month=11, day=1),
+            date_to=datetime.date(year=2019, month=11, day=7)
+        )
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes test folder
+        """
+
+        shutil.rmtree(self.test_folder)
+
+    def test_parsing_date_range(self):
+
+        """
+        Tests parsing of date range from command line
+        """
+
+        with self.subTest():
+            self.assertEqual(self.date_range, parse_date_range("2019-11-01..2019-11-07"))
+        with self.subTest():
+            with self.assertRaises(ValueError):
+                parse_date_range("2019-11-07..2019-11-01")
+        with self.subTest():
+            with self.assertRaises(ValueError):
+                parse_date_range("2019-11-07")
+        with self.subTest():
+            self.assertEqual(
+                self.date_range,
+                get_last_days_range(num_days=7, today=datetime.date(year=2019, month=11, day=7))
+            )
+
+    def test_finding_logs_in_range(self):
+
+        """
+        Tests that only logs from date range are found and they are ordered by date
+        """
+
+        log_files = find_logs_in_range(
+            log_dir=self.test_folder,
+            log_file_pattern=LOG_FILE_PATTERN,
+            date_range=self.date_range
+        )
+
+        self.assertEqual(
+            [os.path.join(self.test_folder, f"nginx-access-ui.log-{log_date}.log")
+             for log_date in TestRangeReport.TEST_LOG_DATES[:3]],
+            [log_file.path for log_file in log_files]
+        )
+
+    def test_parallel_aggregation_is_the_same(self):
+
+        """
+        Tests that aggregating files with pool of processes gives the same stats as sequential one
+        """
+
+        log_files = find_logs_in_range(
+            log_dir=self.test_folder,
+            log_file_pattern=LOG_FILE_PATTERN,
+            date_range=self.date_range
+        )
+
+        sequential_aggregate = aggregate_log_files(log_files=log_files, cfg=self.config)
+        parallel_aggregate = aggregate_log_files(log_files=log_files, cfg=self.config._replace(workers=2))
+
+        with self.subTest():
+            self.assertEqual(3 * 1000, parallel_aggregate.num_requests)
+        with self.subTest():
+            self.assertEqual(
+                calculate_url_stats_from_aggregate(aggregate=sequential_aggregate, cfg=self.config),
+                calculate_url_stats_from_aggregate(aggregate=parallel_aggregate, cfg=self.config)
+            )
+
+    def test_range_report_is_generated(self):
+
+        """
+        Tests that one report is generated for date range
+        """
+
+        generate_range_report(config=self.config, log_file_pattern=LOG_FILE_PATTERN, date_range=self.date_range)
+
+        self.assertTrue(os.path.exists(os.path.join(self.test_folder, "report-2019.11.01-2019.11.07.html")))
+
+
+class TestReportRendering(unittest.TestCase):
+
+    """
+    Class for testing rendering of report from template
+    """
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates test folder with report template
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        shutil.copy("./reports/report.html", self.test_folder)
+        self.config = Config(
+            report_size=1000,
+            report_dir=self.test_folder,
+            log_dir=self.test_folder,
+            log_file="./script_logs/test.log",
+            failures_percent_threshold=50.0
+        )
+        self.report_name = os.path.join(self.test_folder, "report-2019.11.05.html")
+        self.url_stats = [
+            {"count": url_num, "time_sum": url_num / 3, "url": f"/api/v2/banner/{url_num}?q=\"$x\""}
+            for url_num in range(2500)
+        ]
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes test folder
+        """
+
+        shutil.rmtree(self.test_folder)
+
+    def _render_with_template_substitution(self, url_stats) -> str:
+        with open(os.path.join(self.test_folder, "report.html"), encoding="utf-8") as report_template:
+            return Template(report_template.read()).safe_substitute(
+                table_json=json.dumps(url_stats),
+                histogram_bounds=json.dumps(LATENCY_HISTOGRAM_BOUNDS)
+            )
+
+    def _read_report(self) -> str:
+        with open(self.report_name, encoding="utf-8") as report:
+            return report.read()
+
+    def test_streamed_report_is_the_same(self):
+
+        """
+        Tests that streamed report is the same as report with substituted json string
+        """
+
+        for url_stats in (self.url_stats, self.url_stats[:1], []):
+            with self.subTest(num_urls=len(url_stats)):
+                render_report(url_stats_for_json=url_stats, cfg=self.config, report_name=self.report_name)
+                self.assertEqual(self._render_with_template_substitution(url_stats), self._read_report())
+
+    def test_changed_template_is_reloaded(self):
+
+        template_path = os.path.join(self.test_folder, "report.html")
+        render_report(url_stats_for_json=self.url_stats, cfg=self.config, report_name=self.report_name)
+
+        with open(template_path, "w", encoding="utf-8") as report_template:
+            report_template.write("$$ $other var table = $table_json; $table_json")
+        os.utime(template_path, ns=(0, 0))
+        render_report(url_stats_for_json=self.url_stats[:2], cfg=self.config, report_name=self.report_name)
+
+        self.assertEqual(self._render_with_template_substitution(self.url_stats[:2]), self._read_report())
+
+    def test_failed_rendering_keeps_previous_report(self):
+
+        """
+        Tests that report is replaced only when it is completely written
+        """
+
+        render_report(url_stats_for_json=self.url_stats, cfg=self.config, report_name=self.report_name)
+        previous_report = self._read_report()
+
+        with self.assertRaises(TypeError):
+            render_report(url_stats_for_json=[{"url": object()}], cfg=self.config, report_name=self.report_name)
+
+        with self.subTest():
+            self.assertEqual(previous_report, self._read_report())
+        with self.subTest():
+            self.assertEqual(
+                sorted(["report.html", "report-2019.11.05.html"]),
+                sorted(os.listdir(self.test_folder))
+            )
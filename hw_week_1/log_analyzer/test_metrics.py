@@ -0,0 +1,170 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from typing import NoReturn
+
+from log_analyzer import FAST_PARSER, LOG_FILE_PATTERN, generate_report
+from metrics import (
+    AGGREGATE_STAGE,
+    DECOMPRESS_STAGE,
+    FIND_STAGE,
+    PARSE_STAGE,
+    RENDER_STAGE,
+    STATS_STAGE,
+    RunMetrics,
+    get_metrics_file_name
+)
+from models import Config
+from pipeline import PIPELINED_GZIP_READER
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    """
+    Class for testing metrics of report generation
+    """
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates test folder with sample log and report template
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.test_folder, "nginx-access-ui.log-20191105.log")
+        shutil.copy(TestRunMetrics.SAMPLE_LOG_PATH, self.log_path)
+        shutil.copy("./reports/report.html", self.test_folder)
+        self.config = Config(
+            report_size=1000,
+            report_dir=self.test_folder,
+            log_dir=self.test_folder,
+            log_file="./script_logs/test.log",
+            failures_percent_threshold=50.0,
+            write_metrics=True
+        )
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes test folder
+        """
+
+        shutil.rmtree(self.test_folder)
+
+    def test_repeated_stage_time_is_summed(self):
+
+        metrics = RunMetrics()
+        with metrics.measure_stage(FIND_STAGE):
+            pass
+        first_duration = metrics.stage_durations[FIND_STAGE]
+        with metrics.measure_stage(FIND_STAGE):
+            pass
+
+        with self.subTest():
+            self.assertGreaterEqual(metrics.stage_durations[FIND_STAGE], first_duration)
+        with self.subTest():
+            self.assertIsNone(metrics.as_dict()["lines_per_sec"])
+
+    def test_metrics_file_name(self):
+
+        with self.subTest():
+            self.assertEqual("./reports/report-2019.11.05.metrics.json",
+                             get_metrics_file_name("./reports/report-2019.11.05.html"))
+        with self.subTest():
+            self.assertEqual("report.metrics.json", get_metrics_file_name("report"))
+
+    def test_metrics_are_written_next_to_report(self):
+
+        """
+        Tests that metrics of all stages are written to json file when report is generated
+        """
+
+        generate_report(config=self.config, log_file_pattern=LOG_FILE_PATTERN)
+
+        with open(os.path.join(self.test_folder, "report-2019.11.05.metrics.json"), encoding="utf-8") as metrics_file:
+            metrics = json.load(metrics_file)
+
+        with open(TestRunMetrics.SAMPLE_LOG_PATH, "rb") as sample_log:
+            sample_content = sample_log.read()
+
+        with self.subTest():
+            self.assertEqual([FIND_STAGE, AGGREGATE_STAGE, STATS_STAGE, RENDER_STAGE], list(metrics["stages"]))
+        with self.subTest():
+            self.assertEqual(sample_content.count(b"\n"), metrics["num_lines"])
+        with self.subTest():
+            self.assertEqual(len(sample_content), metrics["num_bytes"])
+        with self.subTest():
+            self.assertGreater(metrics["num_unique_urls"], 0)
+        with self.subTest():
+            self.assertGreater(metrics["lines_per_sec"], 0)
+        with self.subTest():
+            self.assertEqual([PARSE_STAGE], list(metrics["aggregate_stages"]))
+        with self.subTest():
+            self.assertIn("peak_children_rss_bytes", metrics)
+
+    def _generate_report_for_gzip_log(self, cfg: Config) -> dict:
+        gz_log_dir = os.path.join(self.test_folder, "gz_logs")
+        os.makedirs(gz_log_dir, exist_ok=True)
+        with open(TestRunMetrics.SAMPLE_LOG_PATH, "rb") as sample_log:
+            with gzip.open(os.path.join(gz_log_dir, "nginx-access-ui.log-20191105.gz"), "wb") as gz_log:
+                shutil.copyfileobj(sample_log, gz_log)
+
+        generate_report(config=cfg._replace(log_dir=gz_log_dir), log_file_pattern=LOG_FILE_PATTERN)
+
+        with open(os.path.join(self.test_folder, "report-2019.11.05.metrics.json"), encoding="utf-8") as metrics_file:
+            return json.load(metrics_file)
+
+    def test_decompression_and_parsing_are_measured(self):
+
+        """
+        Tests that time of decompression and parsing of gzip log are measured separately
+        for sequential parsing with both parsers and for pipelined gzip reader
+        """
+
+        configs = [
+            self.config,
+            self.config._replace(parser=FAST_PARSER),
+            self.config._replace(gzip_reader=PIPELINED_GZIP_READER)
+        ]
+
+        for cfg in configs:
+            with self.subTest(cfg=cfg):
+                metrics = self._generate_report_for_gzip_log(cfg=cfg)
+                self.assertEqual({DECOMPRESS_STAGE, PARSE_STAGE}, set(metrics["aggregate_stages"]))
+                self.assertGreater(metrics["aggregate_stages"][DECOMPRESS_STAGE], 0)
+                self.assertGreater(metrics["aggregate_stages"][PARSE_STAGE], 0)
+                os.remove(os.path.join(self.test_folder, "report-2019.11.05.html"))
+
+    def test_parsing_time_excludes_decompression(self):
+
+        """
+        Tests that time of decompression in the same thread is not counted as time of parsing
+        """
+
+        metrics = RunMetrics()
+        with metrics.measure_parsing():
+            with metrics.measure_aggregate_stage(DECOMPRESS_STAGE):
+                time.sleep(0.05)
+
+        with self.subTest():
+            self.assertGreaterEqual(metrics.aggregate_stage_durations[DECOMPRESS_STAGE], 0.05)
+        with self.subTest():
+            self.assertLess(metrics.aggregate_stage_durations[PARSE_STAGE], 0.01)
+
+    def test_children_rss_is_reported_for_workers(self):
+
+        """
+        Tests that peak rss of worker processes is reported when log is parsed by pool of processes
+        """
+
+        metrics = self._generate_report_for_gzip_log(cfg=self.config._replace(workers=2))
+
+        if metrics["peak_rss_bytes"] is None:
+            self.skipTest("Resource usage is not available on platform")
+        self.assertGreater(metrics["peak_children_rss_bytes"], 0)
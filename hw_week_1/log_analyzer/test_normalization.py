@@ -0,0 +1,127 @@
+import pickle
+import random
+import unittest
+
+from aggregation import LogAggregate
+from models import SingleLogParserResult
+from normalization import UrlNormalizer
+
+
+class TestUrlNormalizer(unittest.TestCase):
+
+    """
+    Class for testing normalization of urls
+    """
+
+    def test_stripping_query_string(self):
+
+        normalizer = UrlNormalizer(strip_query_string=True, collapse_ids=False)
+
+        with self.subTest():
+            self.assertEqual(
+                "/api/1/photogenic_banners/list/",
+                normalizer("/api/1/photogenic_banners/list/?server_name=WIN7RB4")
+            )
+        with self.subTest():
+            self.assertEqual("/api/v2/banner/25019354", normalizer("/api/v2/banner/25019354"))
+
+    def test_collapsing_ids(self):
+
+        normalizer = UrlNormalizer(strip_query_string=False, collapse_ids=True)
+
+        with self.subTest():
+            self.assertEqual("/api/v2/banner/{id}", normalizer("/api/v2/banner/25019354"))
+        with self.subTest():
+            self.assertEqual(
+                "/api/v2/internal/banner/{id}/info",
+                normalizer("/api/v2/internal/banner/24294027/info")
+            )
+        with self.subTest():
+            self.assertEqual(
+                "/api/v2/group/{uuid}/statistic/sites/?date_type=day&date_from=2017-06-28",
+                normalizer(
+                    "/api/v2/group/0f8e3a36-7a8b-4b41-a3b6-7f1c9c5e0d2a/statistic/sites/"
+                    "?date_type=day&date_from=2017-06-28"
+                )
+            )
+        with self.subTest():
+            # ids inside segments are kept
+            self.assertEqual("/api/v2/slot/4705a/groups", normalizer("/api/v2/slot/4705a/groups"))
+
+    def test_normalizer_could_be_pickled(self):
+
+        normalizer = UrlNormalizer(strip_query_string=True, collapse_ids=True)
+        normalizer("/api/v2/banner/25019354?x=1")
+
+        unpickled_normalizer = pickle.loads(pickle.dumps(normalizer))
+
+        self.assertEqual("/api/v2/banner/{id}", unpickled_normalizer("/api/v2/banner/1?y=2"))
+
+
+class TestHeavyHitters(unittest.TestCase):
+
+    """
+    Class for testing aggregation of only the most frequent urls
+    """
+
+    MAX_TRACKED_URLS = 20
+    HEAVY_URLS = tuple(f"/heavy/{url_num}" for url_num in range(5))
+
+    def _generate_parsed_lines(self, seed: int, num_lines: int = 20000):
+        random_gen = random.Random(seed)
+        for line_num in range(num_lines):
+            if random_gen.random() < 0.5:
+                url = random_gen.choice(TestHeavyHitters.HEAVY_URLS)
+            else:
+                url = f"/rare/{seed}/{line_num}"
+            yield SingleLogParserResult(url=url, time=0.1, is_failed=False)
+
+    def test_heavy_urls_are_kept(self):
+
+        """
+        Tests that number of urls is bounded and frequent urls are not evicted
+        """
+
+        aggregate = LogAggregate(max_tracked_urls=TestHeavyHitters.MAX_TRACKED_URLS)
+        aggregate.add_parsed_lines(self._generate_parsed_lines(seed=1))
+
+        with self.subTest():
+            self.assertLessEqual(len(aggregate.url_aggregators), TestHeavyHitters.MAX_TRACKED_URLS)
+        with self.subTest():
+            self.assertTrue(set(TestHeavyHitters.HEAVY_URLS) <= set(aggregate.url_aggregators))
+        with self.subTest():
+            self.assertEqual(20000, aggregate.num_requests)
+        with self.subTest():
+            self.assertGreater(aggregate.num_evicted_urls, 0)
+
+    def test_merged_aggregate_is_bounded(self):
+
+        """
+        Tests that merged aggregate keeps the limit of tracked urls and frequent urls
+        """
+
+        aggregate = LogAggregate(max_tracked_urls=TestHeavyHitters.MAX_TRACKED_URLS)
+        for seed in (1, 2):
+            part_aggregate = LogAggregate(max_tracked_urls=TestHeavyHitters.MAX_TRACKED_URLS)
+            part_aggregate.add_parsed_lines(self._generate_parsed_lines(seed=seed))
+            aggregate.merge(part_aggregate)
+
+        with self.subTest():
+            self.assertLessEqual(len(aggregate.url_aggregators), TestHeavyHitters.MAX_TRACKED_URLS)
+        with self.subTest():
+            self.assertTrue(set(TestHeavyHitters.HEAVY_URLS) <= set(aggregate.url_aggregators))
+
+        # aggregate stays usable after merge
+        aggregate.add_parsed_lines(self._generate_parsed_lines(seed=3, num_lines=1000))
+        with self.subTest():
+            self.assertLessEqual(len(aggregate.url_aggregators), TestHeavyHitters.MAX_TRACKED_URLS)
+
+    def test_normalized_urls_are_aggregated_together(self):
+
+        aggregate = LogAggregate(url_normalizer=UrlNormalizer(strip_query_string=True, collapse_ids=True))
+        aggregate.add_parsed_lines(
+            SingleLogParserResult(url=f"/api/v2/banner/{banner_id}?rnd={banner_id}", time=0.1, is_failed=False)
+            for banner_id in range(100)
+        )
+
+        self.assertEqual(["/api/v2/banner/{id}"], list(aggregate.url_aggregators))
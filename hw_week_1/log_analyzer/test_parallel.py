@@ -0,0 +1,244 @@
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from typing import NoReturn
+
+from benchmarks.synthetic import write_log_file
+from columnar import COMPACT_BACKEND, NUMPY_BACKEND, np
+from log_analyzer import (
+    FAST_PARSER,
+    aggregate_log_file,
+    calculate_url_stats,
+    calculate_url_stats_from_aggregate,
+    get_log_aggregate_factory,
+    parse_log_file
+)
+from models import Config, LatestLogFile
+from parallel import aggregate_log_file_parallel, split_file_into_shards
+from pipeline import PIPELINED_GZIP_READER
+
+
+class TestParallelParsing(unittest.TestCase):
+
+    """
+    Class for testing parsing of log file with pool of processes
+    """
+
+    TEST_CONFIG = Config(
+        report_size=1000,
+        report_dir="./reports",
+        log_dir="./nginx_logs",
+        log_file="./script_logs/test.log",
+        failures_percent_threshold=50.0
+    )
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+    TEST_BLOCK_SIZE = 4096
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates temporary folder with gzipped copy of sample log
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        self.gz_log_path = os.path.join(self.test_folder, "nginx-access-ui.log-20191105.gz")
+        with open(TestParallelParsing.SAMPLE_LOG_PATH, "rb") as sample_log:
+            with gzip.open(self.gz_log_path, "wb") as gz_log:
+                shutil.copyfileobj(sample_log, gz_log)
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes temporary folder
+        """
+
+        shutil.rmtree(self.test_folder)
+
+    def _calculate_url_stats_sequentially(self, log_file: LatestLogFile, log_file_opener):
+        parsed_line_gen = parse_log_file(log_file=log_file, log_file_opener=log_file_opener)
+        return calculate_url_stats(parsed_line_gen=parsed_line_gen, cfg=TestParallelParsing.TEST_CONFIG)
+
+    def _calculate_url_stats_parallel(self, log_file: LatestLogFile, use_fast_parser: bool = False):
+        aggregate = aggregate_log_file_parallel(
+            log_file=log_file,
+            workers=3,
+            use_fast_parser=use_fast_parser,
+            block_size=TestParallelParsing.TEST_BLOCK_SIZE
+        )
+        return calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=TestParallelParsing.TEST_CONFIG)
+
+    def test_shards_are_aligned_on_lines(self):
+
+        """
+        Tests that shards cover the whole file and start at the beginning of lines
+        """
+
+        shards = split_file_into_shards(path=TestParallelParsing.SAMPLE_LOG_PATH, num_shards=4)
+
+        with open(TestParallelParsing.SAMPLE_LOG_PATH, "rb") as sample_log:
+            content = sample_log.read()
+
+        with self.subTest():
+            self.assertEqual(4, len(shards))
+        with self.subTest():
+            self.assertEqual(0, shards[0][0])
+        with self.subTest():
+            self.assertEqual(len(content), shards[-1][1])
+        for (_, prev_end), (start, _) in zip(shards[:-1], shards[1:]):
+            with self.subTest(start=start):
+                self.assertEqual(prev_end, start)
+                self.assertEqual(b"\n", content[start - 1:start])
+
+    def test_plain_log_stats_are_the_same(self):
+
+        """
+        Tests that parallel parsing of plain log gives the same stats as sequential one
+        """
+
+        log_file = LatestLogFile(
+            path=TestParallelParsing.SAMPLE_LOG_PATH,
+            date_of_creation=datetime.date(year=2019, month=11, day=5),
+            extension=".txt"
+        )
+
+        self.assertEqual(
+            self._calculate_url_stats_sequentially(log_file=log_file, log_file_opener=open),
+            self._calculate_url_stats_parallel(log_file=log_file)
+        )
+
+    def test_gzip_log_stats_are_the_same(self):
+
+        """
+        Tests that parallel parsing of gzip log gives the same stats as sequential one
+        """
+
+        log_file = LatestLogFile(
+            path=self.gz_log_path,
+            date_of_creation=datetime.date(year=2019, month=11, day=5),
+            extension=".gz"
+        )
+
+        self.assertEqual(
+            self._calculate_url_stats_sequentially(log_file=log_file, log_file_opener=gzip.open),
+            self._calculate_url_stats_parallel(log_file=log_file)
+        )
+
+    def test_fast_parser_stats_are_the_same(self):
+
+        """
+        Tests that parallel parsing with binary parser gives the same stats as sequential one
+        """
+
+        log_file = LatestLogFile(
+            path=TestParallelParsing.SAMPLE_LOG_PATH,
+            date_of_creation=datetime.date(year=2019, month=11, day=5),
+            extension=".txt"
+        )
+
+        self.assertEqual(
+            self._calculate_url_stats_sequentially(log_file=log_file, log_file_opener=open),
+            self._calculate_url_stats_parallel(log_file=log_file, use_fast_parser=True)
+        )
+
+    def test_normalized_urls_stats_are_the_same(self):
+
+        """
+        Tests that url normalization settings are passed to worker processes
+        """
+
+        cfg = TestParallelParsing.TEST_CONFIG._replace(strip_query_string=True, collapse_url_ids=True)
+        log_file = LatestLogFile(
+            path=TestParallelParsing.SAMPLE_LOG_PATH,
+            date_of_creation=datetime.date(year=2019, month=11, day=5),
+            extension=".txt"
+        )
+
+        sequential_stats = calculate_url_stats(
+            parsed_line_gen=parse_log_file(log_file=log_file, log_file_opener=open),
+            cfg=cfg
+        )
+        parallel_aggregate = aggregate_log_file_parallel(
+            log_file=log_file,
+            workers=3,
+            aggregate_factory=get_log_aggregate_factory(cfg=cfg),
+            block_size=TestParallelParsing.TEST_BLOCK_SIZE
+        )
+
+        self.assertEqual(
+            sequential_stats,
+            calculate_url_stats_from_aggregate(aggregate=parallel_aggregate, cfg=cfg)
+        )
+
+
+class TestParallelParsingOnLargeLog(unittest.TestCase):
+
+    """
+    Class for testing that parallel parsing gives the same report as sequential one
+    on log big enough for different order of summation to change sums of durations
+    """
+
+    TEST_CONFIG = TestParallelParsing.TEST_CONFIG
+    NUM_LINES = 30_000
+    NUM_URLS = 200
+
+    @classmethod
+    def setUpClass(cls) -> NoReturn:
+
+        """
+        Creates temporary folder with synthetic plain and gzipped logs
+        """
+
+        cls.test_folder = tempfile.mkdtemp()
+        cls.log_files = list()
+        for extension in (".log", ".gz"):
+            log_path = os.path.join(cls.test_folder, f"nginx-access-ui.log-20170630{extension}")
+            write_log_file(path=log_path, num_lines=cls.NUM_LINES, num_urls=cls.NUM_URLS)
+            cls.log_files.append(LatestLogFile(
+                path=log_path,
+                date_of_creation=datetime.date(year=2017, month=6, day=30),
+                extension=extension
+            ))
+
+    @classmethod
+    def tearDownClass(cls) -> NoReturn:
+
+        """
+        Deletes temporary folder
+        """
+
+        shutil.rmtree(cls.test_folder)
+
+    def test_stats_are_the_same(self):
+
+        """
+        Tests that sums of durations by url and report stats do not depend on number of workers
+        for all parsers, aggregation backends and gzip readers
+        """
+
+        configs = [
+            TestParallelParsingOnLargeLog.TEST_CONFIG,
+            TestParallelParsingOnLargeLog.TEST_CONFIG._replace(parser=FAST_PARSER),
+            TestParallelParsingOnLargeLog.TEST_CONFIG._replace(aggregation_backend=COMPACT_BACKEND),
+            TestParallelParsingOnLargeLog.TEST_CONFIG._replace(gzip_reader=PIPELINED_GZIP_READER)
+        ]
+        if np is not None:
+            configs.append(TestParallelParsingOnLargeLog.TEST_CONFIG._replace(aggregation_backend=NUMPY_BACKEND))
+
+        for log_file in TestParallelParsingOnLargeLog.log_files:
+            for cfg in configs:
+                sequential_aggregate = aggregate_log_file(log_file=log_file, cfg=cfg)
+                for workers in (2, 3):
+                    parallel_aggregate = aggregate_log_file(log_file=log_file, cfg=cfg._replace(workers=workers))
+                    with self.subTest(log_file=log_file.path, cfg=cfg, workers=workers):
+                        self.assertEqual(
+                            {url: stats.time_sum for url, stats in sequential_aggregate.url_aggregators.items()},
+                            {url: stats.time_sum for url, stats in parallel_aggregate.url_aggregators.items()}
+                        )
+                        self.assertEqual(
+                            calculate_url_stats_from_aggregate(aggregate=sequential_aggregate, cfg=cfg),
+                            calculate_url_stats_from_aggregate(aggregate=parallel_aggregate, cfg=cfg)
+                        )
@@ -0,0 +1,124 @@
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from typing import NoReturn
+
+from aggregation import LogAggregate
+from log_analyzer import parse_log_file
+from models import LatestLogFile
+from parsers import aggregate_binary_lines, aggregate_log_file_fast, parse_log_line
+
+
+class TestFastParser(unittest.TestCase):
+
+    """
+    Class for testing binary parser of log lines
+    """
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates temporary folder with gzipped copy of sample log
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        self.gz_log_path = os.path.join(self.test_folder, "nginx-access-ui.log-20191105.gz")
+        with open(TestFastParser.SAMPLE_LOG_PATH, "rb") as sample_log:
+            with gzip.open(self.gz_log_path, "wb") as gz_log:
+                shutil.copyfileobj(sample_log, gz_log)
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes temporary folder
+        """
+
+        shutil.rmtree(self.test_folder)
+
+    def _assert_aggregates_are_equal(self, expected: LogAggregate, actual: LogAggregate) -> NoReturn:
+
+        with self.subTest():
+            self.assertEqual(expected.num_requests, actual.num_requests)
+        with self.subTest():
+            self.assertEqual(expected.num_failures, actual.num_failures)
+        with self.subTest():
+            self.assertEqual(expected.all_requests_time, actual.all_requests_time)
+        with self.subTest():
+            self.assertEqual(
+                {url: url_aggregator.durations for url, url_aggregator in expected.url_aggregators.items()},
+                {url: url_aggregator.durations for url, url_aggregator in actual.url_aggregators.items()}
+            )
+
+    def _check_log_file(self, log_file: LatestLogFile, log_file_opener) -> NoReturn:
+
+        expected = LogAggregate()
+        expected.add_parsed_lines(parse_log_file(log_file=log_file, log_file_opener=log_file_opener))
+        actual = LogAggregate()
+        aggregate_log_file_fast(log_file=log_file, aggregate=actual)
+
+        self._assert_aggregates_are_equal(expected=expected, actual=actual)
+
+    def test_plain_log_is_parsed_the_same(self):
+        self._check_log_file(
+            log_file=LatestLogFile(
+                path=TestFastParser.SAMPLE_LOG_PATH,
+                date_of_creation=datetime.date(year=2019, month=11, day=5),
+                extension=".txt"
+            ),
+            log_file_opener=open
+        )
+
+    def test_gzip_log_is_parsed_the_same(self):
+        self._check_log_file(
+            log_file=LatestLogFile(
+                path=self.gz_log_path,
+                date_of_creation=datetime.date(year=2019, month=11, day=5),
+                extension=".gz"
+            ),
+            log_file_opener=gzip.open
+        )
+
+    def test_empty_log_file(self):
+
+        """
+        Tests that empty plain log is parsed without errors
+        """
+
+        empty_log_path = os.path.join(self.test_folder, "nginx-access-ui.log-20191106.log")
+        with open(empty_log_path, "wb"):
+            pass
+
+        aggregate = LogAggregate()
+        aggregate_log_file_fast(
+            log_file=LatestLogFile(path=empty_log_path, date_of_creation=None, extension=".log"),
+            aggregate=aggregate
+        )
+
+        self.assertEqual(0, aggregate.num_requests)
+
+    def test_failed_lines_are_counted_the_same(self):
+
+        """
+        Tests that broken lines are counted as failures like with text parser
+        """
+
+        lines = [
+            "",
+            "\n",
+            "1.196.116.32 -  - [29/Jun/2017:03:50:22 +0300]\n",
+            '1.196.116.32 -  - [29/Jun/2017:03:50:22 +0300] "GET /api/v2/banner/1 HTTP/1.1" 200 927 "-"\n',
+            '1.196.116.32 -  - [29/Jun/2017:03:50:22 +0300] "GET /api/v2/banner/1 HTTP/1.1" 200 927 0.390\n',
+            '1.196.116.32 -  - [29/Jun/2017:03:50:22 +0300] "GET /api/v2/banner/2 HTTP/1.1" 200 927 1e-3',
+        ]
+
+        expected = LogAggregate()
+        expected.add_parsed_lines(map(parse_log_line, lines))
+        actual = LogAggregate()
+        aggregate_binary_lines(lines=(line_.encode("utf-8") for line_ in lines), aggregate=actual)
+
+        self._assert_aggregates_are_equal(expected=expected, actual=actual)
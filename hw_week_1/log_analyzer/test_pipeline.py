@@ -0,0 +1,139 @@
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from typing import NoReturn
+
+from log_analyzer import (
+    FAST_PARSER,
+    aggregate_log_file,
+    calculate_url_stats_from_aggregate,
+    get_log_aggregate_factory
+)
+from models import Config, LatestLogFile
+from pipeline import (
+    EXTERNAL_GZIP_READER,
+    PIPELINED_GZIP_READER,
+    aggregate_gzip_log_pipelined,
+    find_external_decompressor,
+    iter_blocks_in_background
+)
+
+
+class TestPipelinedGzipReader(unittest.TestCase):
+
+    """
+    Class for testing pipelined reading of gzip logs
+    """
+
+    TEST_CONFIG = Config(
+        report_size=1000,
+        report_dir="./reports",
+        log_dir="./nginx_logs",
+        log_file="./script_logs/test.log",
+        failures_percent_threshold=50.0
+    )
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+    TEST_BLOCK_SIZE = 4096
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates temporary folder with gzipped copy of sample log
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        self.log_file = LatestLogFile(
+            path=os.path.join(self.test_folder, "nginx-access-ui.log-20191105.gz"),
+            date_of_creation=datetime.datetime(year=2019, month=11, day=5),
+            extension=".gz"
+        )
+        with open(TestPipelinedGzipReader.SAMPLE_LOG_PATH, "rb") as sample_log:
+            with gzip.open(self.log_file.path, "wb") as gz_log:
+                shutil.copyfileobj(sample_log, gz_log)
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes temporary folder
+        """
+
+        shutil.rmtree(self.test_folder)
+
+    def _calculate_url_stats(self, cfg: Config):
+        aggregate = aggregate_log_file(log_file=self.log_file, cfg=cfg)
+        return calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=cfg)
+
+    def test_pipelined_stats_are_the_same(self):
+
+        """
+        Tests that stats of gzip log read with pipeline are the same as with default reader
+        """
+
+        for parser in ("default", FAST_PARSER):
+            for workers in (1, 2):
+                cfg = TestPipelinedGzipReader.TEST_CONFIG._replace(parser=parser, workers=workers)
+                with self.subTest(parser=parser, workers=workers):
+                    self.assertEqual(
+                        self._calculate_url_stats(cfg=cfg._replace(workers=1)),
+                        self._calculate_url_stats(cfg=cfg._replace(gzip_reader=PIPELINED_GZIP_READER))
+                    )
+
+    def test_small_blocks_are_parsed_in_order(self):
+
+        """
+        Tests that log split into many small blocks gives the same aggregate as sequential parsing
+        """
+
+        aggregate = aggregate_gzip_log_pipelined(
+            log_file=self.log_file,
+            aggregate_factory=get_log_aggregate_factory(cfg=TestPipelinedGzipReader.TEST_CONFIG),
+            block_size=TestPipelinedGzipReader.TEST_BLOCK_SIZE
+        )
+        expected_aggregate = aggregate_log_file(log_file=self.log_file, cfg=TestPipelinedGzipReader.TEST_CONFIG)
+
+        with self.subTest():
+            self.assertEqual(expected_aggregate.num_requests, aggregate.num_requests)
+        with self.subTest():
+            self.assertEqual(
+                {url: url_aggregator.durations for url, url_aggregator in expected_aggregate.url_aggregators.items()},
+                {url: url_aggregator.durations for url, url_aggregator in aggregate.url_aggregators.items()}
+            )
+
+    @unittest.skipIf(find_external_decompressor() is None, "neither pigz nor zcat is installed")
+    def test_external_decompressor_stats_are_the_same(self):
+
+        cfg = TestPipelinedGzipReader.TEST_CONFIG._replace(parser=FAST_PARSER)
+
+        self.assertEqual(
+            self._calculate_url_stats(cfg=cfg),
+            self._calculate_url_stats(cfg=cfg._replace(gzip_reader=EXTERNAL_GZIP_READER))
+        )
+
+    def test_corrupted_gzip_log_raises_error(self):
+
+        with open(self.log_file.path, "r+b") as gz_log:
+            gz_log.truncate(os.path.getsize(self.log_file.path) // 2)
+
+        for gzip_reader in (PIPELINED_GZIP_READER, EXTERNAL_GZIP_READER):
+            with self.subTest(gzip_reader=gzip_reader):
+                with self.assertRaises((EOFError, OSError)):
+                    aggregate_log_file(
+                        log_file=self.log_file,
+                        cfg=TestPipelinedGzipReader.TEST_CONFIG._replace(gzip_reader=gzip_reader)
+                    )
+
+    def test_reading_could_be_stopped(self):
+
+        """
+        Tests that reader thread stops when consumer does not read all blocks
+        """
+
+        blocks_gen = iter_blocks_in_background(iter(range(100)), max_queued=2)
+        self.assertEqual(0, next(blocks_gen))
+        blocks_gen.close()
+
+        self.assertEqual([1, 2], list(iter_blocks_in_background(iter([1, 2]))))
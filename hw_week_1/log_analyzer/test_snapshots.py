@@ -0,0 +1,246 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from typing import NoReturn
+
+from aggregation import ExactUrlAggregator, LogAggregate
+from failures import FailuresPercentageError
+from log_analyzer import aggregate_log_file, calculate_url_stats_from_aggregate, update_log_snapshot
+from models import Config, LatestLogFile
+from pipeline import PIPELINED_GZIP_READER
+from snapshots import LogSnapshot, SnapshotStore
+
+
+class OutdatedExactUrlAggregator:
+
+    """
+    Pickled like exact aggregator which kept running sum of durations
+    """
+
+    def __reduce__(self):
+        return ExactUrlAggregator, (), (
+            None, {"count": 1, "time_sum": 0.5, "time_max": 0.5, "durations": [0.5]}
+        )
+
+
+class TestSnapshots(unittest.TestCase):
+
+    """
+    Class for testing incremental parsing of log files with saved snapshots
+    """
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates temporary folder with snapshots storage
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        self.config = Config(
+            report_size=1000,
+            report_dir=self.test_folder,
+            log_dir=self.test_folder,
+            log_file="./script_logs/test.log",
+            failures_percent_threshold=50.0,
+            incremental=True
+        )
+        self.snapshot_store = SnapshotStore(path=os.path.join(self.test_folder, "snapshots.sqlite"))
+        self.log_file = LatestLogFile(
+            path=os.path.join(self.test_folder, "nginx-access-ui.log-20191105.log"),
+            date_of_creation=datetime.datetime(year=2019, month=11, day=5),
+            extension=".log"
+        )
+        with open(TestSnapshots.SAMPLE_LOG_PATH, "rb") as sample_log:
+            self.sample_content = sample_log.read()
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes temporary folder
+        """
+
+        self.snapshot_store.close()
+        shutil.rmtree(self.test_folder)
+
+    def _write_log(self, content: bytes) -> NoReturn:
+        with open(self.log_file.path, "wb") as log:
+            log.write(content)
+
+    def test_save_and_load_snapshot(self):
+
+        """
+        Tests that loaded snapshot is the same as saved one
+        """
+
+        aggregate = LogAggregate()
+        aggregate.num_requests = 42
+        self.snapshot_store.save(LogSnapshot(
+            log_path=self.log_file.path,
+            log_date="20191105",
+            log_size=100,
+            aggregator="exact",
+            offset=90,
+            aggregate=aggregate
+        ))
+
+        snapshot = self.snapshot_store.load(log_path=self.log_file.path)
+
+        with self.subTest():
+            self.assertEqual(90, snapshot.offset)
+        with self.subTest():
+            self.assertEqual(42, snapshot.aggregate.num_requests)
+        with self.subTest():
+            self.assertIsNone(self.snapshot_store.load(log_path="non_existent_log"))
+
+    def test_growing_log_is_parsed_from_offset(self):
+
+        """
+        Tests that log being written is parsed by parts with the same result as the whole log
+        """
+
+        middle = len(self.sample_content) // 2
+        self._write_log(self.sample_content[:middle])
+        first_aggregate, first_is_changed = update_log_snapshot(
+            log_file=self.log_file,
+            cfg=self.config,
+            snapshot_store=self.snapshot_store
+        )
+        first_num_requests = first_aggregate.num_requests
+
+        self._write_log(self.sample_content)
+        second_aggregate, second_is_changed = update_log_snapshot(
+            log_file=self.log_file,
+            cfg=self.config,
+            snapshot_store=self.snapshot_store
+        )
+        _, third_is_changed = update_log_snapshot(
+            log_file=self.log_file,
+            cfg=self.config,
+            snapshot_store=self.snapshot_store
+        )
+
+        whole_store = SnapshotStore(path=os.path.join(self.test_folder, "whole.sqlite"))
+        whole_aggregate, _ = update_log_snapshot(
+            log_file=self.log_file,
+            cfg=self.config,
+            snapshot_store=whole_store
+        )
+        whole_store.close()
+
+        with self.subTest():
+            self.assertEqual(self.sample_content[:middle].count(b"\n"), first_num_requests)
+        with self.subTest():
+            self.assertEqual((True, True, False), (first_is_changed, second_is_changed, third_is_changed))
+        with self.subTest():
+            self.assertEqual(
+                calculate_url_stats_from_aggregate(aggregate=whole_aggregate, cfg=self.config),
+                calculate_url_stats_from_aggregate(aggregate=second_aggregate, cfg=self.config)
+            )
+
+    def test_last_line_without_newline_is_parsed_when_log_stops_growing(self):
+
+        """
+        Tests that incomplete last line is left while log grows and is parsed when log has not changed
+        since the last snapshot, so that finished log gives the same result as the whole log
+        """
+
+        content = self.sample_content.rstrip(b"\n")
+        self._write_log(content)
+
+        results = [
+            update_log_snapshot(log_file=self.log_file, cfg=self.config, snapshot_store=self.snapshot_store)
+            for _ in range(3)
+        ]
+        whole_aggregate = aggregate_log_file(log_file=self.log_file, cfg=self.config)
+
+        with self.subTest():
+            self.assertEqual(content.count(b"\n"), results[0][0].num_requests)
+        with self.subTest():
+            self.assertEqual([True, True, False], [is_changed for _, is_changed in results])
+        with self.subTest():
+            self.assertEqual(whole_aggregate.num_requests, results[2][0].num_requests)
+        with self.subTest():
+            self.assertEqual(
+                calculate_url_stats_from_aggregate(aggregate=whole_aggregate, cfg=self.config),
+                calculate_url_stats_from_aggregate(aggregate=results[2][0], cfg=self.config)
+            )
+
+    def test_snapshot_of_outdated_aggregate_is_parsed_from_scratch(self):
+
+        """
+        Tests that snapshot which could not be loaded with current aggregators is treated as missing
+        """
+
+        self._write_log(self.sample_content)
+        aggregate = LogAggregate()
+        aggregate.url_aggregators["/api/v2/banner/1"] = OutdatedExactUrlAggregator()
+        self.snapshot_store.save(LogSnapshot(
+            log_path=self.log_file.path,
+            log_date="20191105",
+            log_size=len(self.sample_content),
+            aggregator="exact",
+            offset=len(self.sample_content),
+            aggregate=aggregate
+        ))
+
+        aggregate, is_changed = update_log_snapshot(
+            log_file=self.log_file,
+            cfg=self.config,
+            snapshot_store=self.snapshot_store
+        )
+
+        with self.subTest():
+            self.assertTrue(is_changed)
+        with self.subTest():
+            self.assertEqual(self.sample_content.count(b"\n"), aggregate.num_requests)
+
+    def test_truncated_log_is_parsed_from_scratch(self):
+
+        """
+        Tests that log replaced with smaller one is parsed from the beginning
+        """
+
+        self._write_log(self.sample_content)
+        update_log_snapshot(log_file=self.log_file, cfg=self.config, snapshot_store=self.snapshot_store)
+
+        self._write_log(self.sample_content[:self.sample_content.index(b"\n") + 1])
+        aggregate, _ = update_log_snapshot(
+            log_file=self.log_file,
+            cfg=self.config,
+            snapshot_store=self.snapshot_store
+        )
+
+        self.assertEqual(1, aggregate.num_requests)
+
+    def test_failures_are_checked_while_log_is_parsed(self):
+
+        """
+        Tests that parsing of bad log is aborted after warm-up or pre-flight check
+        and its snapshot is not saved
+        """
+
+        self._write_log(b"bad line\n" * 1000 + self.sample_content)
+        for cfg in (
+            self.config._replace(failures_warmup_lines=100, failures_percent_threshold=20.0),
+            self.config._replace(preflight_lines=100, failures_percent_threshold=20.0)
+        ):
+            with self.subTest(cfg=cfg):
+                with self.assertRaises(FailuresPercentageError):
+                    update_log_snapshot(log_file=self.log_file, cfg=cfg, snapshot_store=self.snapshot_store)
+                self.assertIsNone(self.snapshot_store.load(log_path=self.log_file.path))
+
+    def test_parallel_options_are_rejected(self):
+
+        """
+        Tests that options of parallel parsing are not ignored silently in incremental mode
+        """
+
+        self._write_log(self.sample_content)
+        for cfg in (self.config._replace(workers=2), self.config._replace(gzip_reader=PIPELINED_GZIP_READER)):
+            with self.subTest(cfg=cfg):
+                with self.assertRaises(ValueError):
+                    update_log_snapshot(log_file=self.log_file, cfg=cfg, snapshot_store=self.snapshot_store)
@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from typing import NoReturn
+
+from log_analyzer import LOG_FILE_PATTERN, calculate_url_stats_from_aggregate, make_log_aggregate
+from models import Config
+from parsers import parse_log_line
+from watcher import LogWatcher
+
+
+class TestLogWatcher(unittest.TestCase):
+
+    """
+    Class for testing daemon following the latest log
+    """
+
+    SAMPLE_LOG_PATH = "./nginx_logs/test_sample.txt"
+
+    def setUp(self) -> NoReturn:
+
+        """
+        Creates test folder with report template
+        """
+
+        self.test_folder = tempfile.mkdtemp()
+        shutil.copy("./reports/report.html", self.test_folder)
+        self.config = Config(
+            report_size=1000,
+            report_dir=self.test_folder,
+            log_dir=self.test_folder,
+            log_file="./script_logs/test.log",
+            failures_percent_threshold=50.0
+        )
+        self.watcher = LogWatcher(
+            cfg=self.config,
+            log_file_pattern=LOG_FILE_PATTERN,
+            poll_interval=0.01,
+            render_interval=0.0
+        )
+        with open(TestLogWatcher.SAMPLE_LOG_PATH, "rb") as sample_log:
+            self.sample_lines = sample_log.readlines()
+
+    def tearDown(self) -> NoReturn:
+
+        """
+        Deletes test folder
+        """
+
+        shutil.rmtree(self.test_folder)
+
+    def _append_to_log(self, log_date: str, content: bytes) -> NoReturn:
+        with open(os.path.join(self.test_folder, f"nginx-access-ui.log-{log_date}.log"), "ab") as log:
+            log.write(content)
+
+    def _read_report_table(self, report_date: str):
+        with open(os.path.join(self.test_folder, f"report-{report_date}.html"), encoding="utf-8") as report:
+            report_html = report.read()
+        table_start = report_html.index("var table = ") + len("var table = ")
+        return json.JSONDecoder().raw_decode(report_html, table_start)[0]
+
+    def _expected_table(self, lines):
+        aggregate = make_log_aggregate(cfg=self.config)
+        aggregate.add_parsed_lines(parse_log_line(line_.decode("utf-8")) for line_ in lines)
+        return calculate_url_stats_from_aggregate(aggregate=aggregate, cfg=self.config)
+
+    def test_growing_log_is_followed(self):
+
+        """
+        Tests that report is re-rendered with lines appended to log, incomplete line is left for later
+        """
+
+        first_lines, second_lines = self.sample_lines[:300], self.sample_lines[300:]
+        self._append_to_log("20191105", b"".join(first_lines) + second_lines[0][:10])
+        self.watcher.check_logs()
+        self.watcher.render()
+        with self.subTest():
+            self.assertEqual(self._expected_table(first_lines), self._read_report_table("2019.11.05"))
+
+        self._append_to_log("20191105", b"".join(second_lines)[10:])
+        self.watcher.check_logs()
+        self.watcher.render()
+        with self.subTest():
+            self.assertEqual(self._expected_table(self.sample_lines), self._read_report_table("2019.11.05"))
+
+    def test_rotated_log_gets_final_report(self):
+
+        """
+        Tests that lines written to previous log before rotation get into its report
+        """
+
+        self._append_to_log("20191105", b"".join(self.sample_lines[:100]))
+        self.watcher.check_logs()
+        self.watcher.render()
+
+        self._append_to_log("20191105", b"".join(self.sample_lines[100:200]))
+        self._append_to_log("20191106", b"".join(self.sample_lines[200:]))
+        self.watcher.check_logs()
+        self.watcher.render()
+
+        with self.subTest():
+            self.assertEqual(self._expected_table(self.sample_lines[:200]), self._read_report_table("2019.11.05"))
+        with self.subTest():
+            self.assertEqual(self._expected_table(self.sample_lines[200:]), self._read_report_table("2019.11.06"))
+
+    def test_truncated_log_is_parsed_from_beginning(self):
+
+        log_path = os.path.join(self.test_folder, "nginx-access-ui.log-20191105.log")
+        self._append_to_log("20191105", b"".join(self.sample_lines))
+        self.watcher.check_logs()
+
+        with open(log_path, "wb") as log:
+            log.write(b"".join(self.sample_lines[:10]))
+        self.watcher.check_logs()
+
+        self.assertEqual(10, self.watcher.tail.aggregate.num_requests)
+
+    def test_lines_are_not_added_twice_after_failed_parsing(self):
+
+        """
+        Tests that lines parsed before error are not kept in aggregate, so that they are not added again
+        when log is parsed from the same offset next time
+        """
+
+        self._append_to_log("20191105", b"".join(self.sample_lines[:100]))
+        self.watcher.check_logs()
+        self._append_to_log("20191105", b"".join(self.sample_lines[100:200]) + b"\xff\n")
+
+        for _ in range(2):
+            with self.assertRaises(UnicodeDecodeError):
+                self.watcher.check_logs()
+            with self.subTest():
+                self.assertEqual(100, self.watcher.tail.aggregate.num_requests)
+
+    def test_watcher_could_be_stopped(self):
+
+        self._append_to_log("20191105", b"".join(self.sample_lines))
+        watcher_thread = threading.Thread(target=self.watcher.run)
+        watcher_thread.start()
+        threading.Timer(0.2, self.watcher.stop).start()
+        watcher_thread.join(timeout=10)
+
+        with self.subTest():
+            self.assertFalse(watcher_thread.is_alive())
+        with self.subTest():
+            self.assertEqual(self._expected_table(self.sample_lines), self._read_report_table("2019.11.05"))
@@ -0,0 +1,236 @@
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, NoReturn, Optional
+
+from aggregation import LogAggregate
+from log_analyzer import (
+    FAST_PARSER,
+    FailuresPercentageError,
+    calculate_url_stats_from_aggregate,
+    find_latest_log,
+    generate_report_name,
+    get_log_aggregate_factory,
+    render_report
+)
+from models import Config, LatestLogFile
+from parsers import aggregate_log_file_from_offset
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+
+class LogTail:
+
+    """
+    Follows growing log file and keeps live aggregate of its lines.
+    Plain log is parsed from offset of the last complete line,
+    gzip log (already rotated) is parsed from the beginning when it changes.
+    Log replaced with another file or truncated is parsed from the beginning.
+    New lines are parsed into separate aggregate which is merged into live one only
+    when parsing succeeds, so lines are not added twice if parsing fails halfway
+    """
+
+    def __init__(self,
+                 log_file: LatestLogFile,
+                 aggregate_factory: Callable[[], LogAggregate],
+                 use_fast_parser: bool):
+
+        self.log_file = log_file
+        self.aggregate_factory = aggregate_factory
+        self.use_fast_parser = use_fast_parser
+        self.aggregate = aggregate_factory()
+        self.offset = 0
+        self.inode: Optional[int] = None
+        self.size: Optional[int] = None
+
+    def update(self) -> bool:
+
+        """
+        Parses lines added to log since the last update
+        :return: whether aggregate was changed
+        """
+
+        try:
+            log_stat = os.stat(self.log_file.path)
+        except FileNotFoundError:
+            logging.info("Log file %s was removed", self.log_file.path)
+            return False
+
+        if log_stat.st_ino == self.inode and log_stat.st_size == self.size:
+            return False
+
+        is_gzip = self.log_file.extension == ".gz"
+        is_replaced = self.inode is not None and (log_stat.st_ino != self.inode or log_stat.st_size < self.size)
+        if is_replaced:
+            logging.info("Log file %s was replaced, it is parsed from the beginning", self.log_file.path)
+
+        offset = 0 if is_replaced or is_gzip else self.offset
+        new_lines_aggregate = self.aggregate_factory()
+        self.offset = aggregate_log_file_from_offset(
+            log_file=self.log_file,
+            offset=offset,
+            aggregate=new_lines_aggregate,
+            use_fast_parser=self.use_fast_parser
+        )
+        if offset:
+            self.aggregate.merge(new_lines_aggregate)
+        else:
+            self.aggregate = new_lines_aggregate
+        self.inode, self.size = log_stat.st_ino, log_stat.st_size
+
+        return True
+
+
+class PollingNotifier:
+
+    """
+    Waits for changes in directory by sleeping for poll interval
+    """
+
+    def __init__(self, stop_event: threading.Event):
+        self.stop_event = stop_event
+
+    def wait(self, timeout: float) -> NoReturn:
+        self.stop_event.wait(timeout)
+
+    def close(self) -> NoReturn:
+        pass
+
+
+class InotifyNotifier:
+
+    """
+    Waits for changes in directory with inotify, wakes up as soon as file
+    in directory is created, written or moved in
+    """
+
+    WATCH_FLAGS = ("CREATE", "MODIFY", "MOVED_TO", "CLOSE_WRITE")
+
+    def __init__(self, directory: str):
+
+        self.inotify = inotify_simple.INotify()
+        watch_flags = 0
+        for flag_name in InotifyNotifier.WATCH_FLAGS:
+            watch_flags |= getattr(inotify_simple.flags, flag_name)
+        self.inotify.add_watch(directory, watch_flags)
+
+    def wait(self, timeout: float) -> NoReturn:
+        self.inotify.read(timeout=int(timeout * 1000))
+
+    def close(self) -> NoReturn:
+        self.inotify.close()
+
+
+class LogWatcher:
+
+    """
+    Daemon following the latest log in log directory.
+    New lines of the latest log are added to live aggregate as they are written,
+    report for the day of log is re-rendered not more often than render interval.
+    When log of the next day appears, the previous log is parsed till the end,
+    its final report is rendered and the new log is followed
+    """
+
+    def __init__(self,
+                 cfg: Config,
+                 log_file_pattern: re.Pattern,
+                 poll_interval: float,
+                 render_interval: float):
+
+        self.cfg = cfg
+        self.log_file_pattern = log_file_pattern
+        self.poll_interval = poll_interval
+        self.render_interval = render_interval
+        self.aggregate_factory = get_log_aggregate_factory(cfg=cfg)
+        self.tail: Optional[LogTail] = None
+        self.has_unrendered_changes = False
+        self.last_rendered_at = -float("inf")
+        self.stop_event = threading.Event()
+
+    def stop(self) -> NoReturn:
+        self.stop_event.set()
+
+    def make_notifier(self):
+
+        """
+        Creates notifier of changes in log directory, inotify is used if it is installed
+        :return: inotify or polling notifier
+        """
+
+        if inotify_simple is not None:
+            try:
+                return InotifyNotifier(directory=self.cfg.log_dir)
+            except OSError:
+                logging.exception("Failed to watch %s with inotify, falling back to polling", self.cfg.log_dir)
+
+        return PollingNotifier(stop_event=self.stop_event)
+
+    def check_logs(self) -> NoReturn:
+
+        """
+        Switches to the latest log if it has changed and parses its new lines
+        """
+
+        latest_log_file = find_latest_log(log_dir=self.cfg.log_dir, log_file_pattern=self.log_file_pattern)
+        if latest_log_file is None:
+            return
+
+        if self.tail is None or self.tail.log_file.path != latest_log_file.path:
+            if self.tail is not None:
+                logging.info("Log was rotated, rendering final report for %s", self.tail.log_file.path)
+                self.has_unrendered_changes |= self.tail.update()
+                self.render()
+            logging.info("Following log file %s", latest_log_file.path)
+            self.tail = LogTail(
+                log_file=latest_log_file,
+                aggregate_factory=self.aggregate_factory,
+                use_fast_parser=self.cfg.parser == FAST_PARSER
+            )
+
+        self.has_unrendered_changes |= self.tail.update()
+
+    def render(self) -> NoReturn:
+
+        """
+        Renders report for followed log if it has changed since the last rendering
+        """
+
+        self.last_rendered_at = time.monotonic()
+        if self.tail is None or not self.has_unrendered_changes or not self.tail.aggregate.num_requests:
+            return
+
+        self.has_unrendered_changes = False
+        report_name = generate_report_name(cfg=self.cfg, log_file=self.tail.log_file)
+        try:
+            url_stats = calculate_url_stats_from_aggregate(aggregate=self.tail.aggregate, cfg=self.cfg)
+        except FailuresPercentageError:
+            return
+        render_report(url_stats_for_json=url_stats, cfg=self.cfg, report_name=report_name)
+        logging.info("Report %s is rendered for %d lines", report_name, self.tail.aggregate.num_requests)
+
+    def run(self) -> NoReturn:
+
+        """
+        Follows logs until watcher is stopped
+        """
+
+        notifier = self.make_notifier()
+        logging.info("Started to watch log directory %s with %s", self.cfg.log_dir, type(notifier).__name__)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.check_logs()
+                    if time.monotonic() - self.last_rendered_at >= self.render_interval:
+                        self.render()
+                except Exception:
+                    logging.exception("Something went wrong during watching logs")
+                notifier.wait(timeout=self.poll_interval)
+            self.render()
+        finally:
+            notifier.close()
+            logging.info("Stopped to watch log directory %s", self.cfg.log_dir)
@@ -2,13 +2,21 @@ from __future__ import annotations
 
 import datetime
 import hashlib
+import hmac
 import json
 import logging
+import re
+import signal
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from optparse import OptionParser
 from typing import (
     Any,
+    Callable,
     Dict,
     List,
     NoReturn,
@@ -19,8 +27,10 @@ from typing import (
 
 from dateutil.relativedelta import relativedelta
 
-from scoring import get_score, get_interests
-from store import KeyValueStorage
+from cache import DEFAULT_LOCAL_CACHE_TTL_SEC, DEFAULT_NEGATIVE_TTL_SEC, TieredKeyValueStorage
+from scoring import get_many_interests, get_score
+from store import DEFAULT_MAX_CONNECTIONS, KeyValueStorage
+from write_behind import DROP_POLICY, OVERFLOW_POLICIES, WriteBehindKeyValueStorage
 
 SALT = "Otus"
 ADMIN_LOGIN = "admin"
@@ -47,18 +57,76 @@ GENDERS = {
     FEMALE: "female",
 }
 DATE_FORMAT = "%d.%m.%Y"
+DATE_PATTERN = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})\Z")
+ADMIN_SCORE = 42
+AUTH_CACHE_SIZE = 10_000
+DEFAULT_BACKLOG = 128
+DEFAULT_KEEPALIVE_TIMEOUT_SEC = 5
+
+
+EMPTY_VALUES = ("", (), [], {})
+
+Check = Callable[[Any], NoReturn]
+
+
+def parse_date(value: str) -> datetime.date:
+
+    """
+    Parses date in DATE_FORMAT (day.month.year) without strptime
+    :param value: date as string
+    :return: parsed date
+    """
+
+    if not isinstance(value, str):
+        raise TypeError(f"strptime() argument 1 must be str, not {type(value).__name__}")
+    match = DATE_PATTERN.match(value)
+    if match is None:
+        raise ValueError(f"time data {value!r} does not match format {DATE_FORMAT!r}")
+    day, month, year = match.groups()
+
+    return datetime.date(int(year), int(month), int(day))
+
+
+class TodayBounds:
+
+    """
+    Today's date and the earliest allowed birthday calculated once per day
+    """
+
+    def __init__(self, max_years_ago: int):
+
+        self.max_years_ago = max_years_ago
+        self._valid_until = 0.0
+        self._bounds = None
+
+    def get(self) -> Tuple[datetime.date, datetime.date]:
+
+        """
+        :return: today's date and date max_years_ago years ago
+        """
+
+        if time.time() >= self._valid_until:
+            today = datetime.date.today()
+            tomorrow = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time())
+            self._bounds = (today, today + relativedelta(years=-self.max_years_ago))
+            self._valid_until = tomorrow.timestamp()
+
+        return self._bounds
 
 
 class BaseField:
 
     """
-    Base class for all fields
+    Base class for all fields.
+    Every field compiles its validation into flat tuple of checks once,
+    checks that can not fail for field settings are skipped
     """
 
     def __init__(self, required: bool, nullable: bool):
 
         self.required = required
         self.nullable = nullable
+        self.checks: Tuple[Check, ...] = tuple(self.make_checks())
 
     def __get__(self, instance, owner):
         return instance.__dict__[self.name]
@@ -66,21 +134,26 @@ class BaseField:
     def __set_name__(self, owner, name: str):
         self.name = name
 
-    def _check_required_and_nullable(self, value: Any) -> NoReturn:
+    def make_checks(self) -> List[Check]:
 
         """
-        Checks required and nullable fields and values
+        Makes checks of required and nullable fields and values
         """
 
-        if self.required and value is None:
-            raise ValueError(f"Field {self.name} is required")
-
-        if not self.nullable and value in ("", (), [], {}):
-            raise ValueError(f"Field {self.name} is not nullable but empty value found")
+        checks = []
+        if self.required:
+            def check_required(value: Any) -> NoReturn:
+                if value is None:
+                    raise ValueError(f"Field {self.name} is required")
+            checks.append(check_required)
 
-    def _validate(self, value: Any) -> NoReturn:
+        if not self.nullable:
+            def check_not_empty(value: Any) -> NoReturn:
+                if value in EMPTY_VALUES:
+                    raise ValueError(f"Field {self.name} is not nullable but empty value found")
+            checks.append(check_not_empty)
 
-        self._check_required_and_nullable(value)
+        return checks
 
     def __set__(self, instance: Any, value: Any):
 
@@ -88,21 +161,20 @@ class BaseField:
         Sets the value to field
         """
 
-        self._validate(value)
+        for check in self.checks:
+            check(value)
         instance.__dict__[self.name] = value
 
 
-class CharField(BaseField):
+def check_str(value: Optional[str]) -> NoReturn:
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"value should be str, not {type(value)}")
 
-    def _validate(self, value: str) -> NoReturn:
 
-        """
-        Validates field value
-        """
+class CharField(BaseField):
 
-        super()._validate(value)
-        if value is not None and not isinstance(value, str):
-            raise ValueError(f"value should be str, not {type(value)}")
+    def make_checks(self) -> List[Check]:
+        return super().make_checks() + [check_str]
 
     def __add__(self, other: CharField) -> CharField:
         result = CharField(required=self.required, nullable=self.nullable)
@@ -110,22 +182,28 @@ class CharField(BaseField):
         result.__dict__[self.name] = result_value
 
 
+def check_arguments(value: Dict[str, Union[int, str]]) -> NoReturn:
+    if not isinstance(value, dict):
+        raise ValueError(
+            f"Arguments should be dict not {type(value)}"
+        )
+
+
 class ArgumentsField(BaseField):
 
-    def _validate(self, value: Dict[str, Union[int, str]]):
-        super()._validate(value)
-        if not isinstance(value, dict):
-            raise ValueError(
-                f"Arguments should be dict not {type(value)}"
-            )
+    def make_checks(self) -> List[Check]:
+        return super().make_checks() + [check_arguments]
+
+
+def check_email(value: Optional[str]) -> NoReturn:
+    if value is not None and "@" not in value:
+        raise ValueError("Email should contain @")
 
 
 class EmailField(CharField):
 
-    def _validate(self, value: Optional[str]) -> NoReturn:
-        super()._validate(value)
-        if value is not None and "@" not in value:
-            raise ValueError("Email should contain @")
+    def make_checks(self) -> List[Check]:
+        return super().make_checks() + [check_email]
 
 
 class PhoneField(BaseField):
@@ -133,88 +211,111 @@ class PhoneField(BaseField):
     PHONE_NUM_LENGTH = 11
     PHONE_NUM_START_VALUE = "7"
 
-    def _validate(self, value: Optional[Union[int, str]]) -> NoReturn:
+    @staticmethod
+    def check_phone(value: Optional[Union[int, str]]) -> NoReturn:
 
-        super()._validate(value)
         if value is not None:
             if not isinstance(value, (int, str)):
                 raise ValueError(
                     f"Phone number should be one of int, str, not {type(value)}",
                 )
 
-            if (phone_num_len := len(str(value))) != PhoneField.PHONE_NUM_LENGTH:
+            phone_num_str = value if isinstance(value, str) else str(value)
+            if (phone_num_len := len(phone_num_str)) != PhoneField.PHONE_NUM_LENGTH:
                 raise ValueError(
                     f"Phone number length should be "
                     f"{PhoneField.PHONE_NUM_LENGTH}, not {phone_num_len}"
                 )
 
-            if not (phone_num_str := str(value)).startswith(PhoneField.PHONE_NUM_START_VALUE):
+            if not phone_num_str.startswith(PhoneField.PHONE_NUM_START_VALUE):
                 raise ValueError(
                     f"Phone number length should start with "
                     f"{PhoneField.PHONE_NUM_START_VALUE}, not {phone_num_str[0]}",
                 )
 
+    def make_checks(self) -> List[Check]:
+        return super().make_checks() + [self.check_phone]
+
+
+def check_date(value: Optional[str]) -> NoReturn:
+    if value is not None:
+        parse_date(value)
+
 
 class DateField(BaseField):
 
-    def _validate(self, value: Optional[str]) -> NoReturn:
-        super()._validate(value)
-        if value is not None:
-            datetime.datetime.strptime(value, DATE_FORMAT)
+    def make_checks(self) -> List[Check]:
+        return super().make_checks() + [check_date]
 
 
 class BirthDayField(DateField):
 
     MAX_YEARS_AGO = 70
+    today_bounds = TodayBounds(max_years_ago=MAX_YEARS_AGO)
 
-    def _validate(self, value: Optional[str]) -> NoReturn:
+    @staticmethod
+    def check_birthday(value: Optional[str]) -> NoReturn:
 
-        super()._validate(value)
         if value is not None:
 
-            current_date = datetime.datetime.today()
-            birthday_as_date = datetime.datetime.strptime(value, DATE_FORMAT)
-            date_max_years_ago = datetime.datetime.today() + relativedelta(years=-BirthDayField.MAX_YEARS_AGO)
+            birthday_as_date = parse_date(value)
+            current_date, date_max_years_ago = BirthDayField.today_bounds.get()
 
-            if birthday_as_date.date() < date_max_years_ago.date():
+            if birthday_as_date < date_max_years_ago:
                 raise ValueError("Birth date should be later than 70 years ago")
-            if birthday_as_date.date() > current_date.date():
+            if birthday_as_date > current_date:
                 raise ValueError(
                     f"Birth date can't be later than current date: {current_date}"
                 )
 
+    def make_checks(self) -> List[Check]:
+
+        # date is parsed by check of birthday, so check of date format is not needed
+        return BaseField.make_checks(self) + [self.check_birthday]
+
+
+def check_gender(value: Optional[int]) -> NoReturn:
+    if value is not None and value not in GENDERS:
+        raise ValueError(f"Value should be is one of {GENDERS}")
+
 
 class GenderField(BaseField):
 
-    def _validate(self, value: Optional[int]) -> NoReturn:
-        super()._validate(value)
-        if value is not None and value not in GENDERS:
-            raise ValueError(f"Value should be is one of {GENDERS}")
+    def make_checks(self) -> List[Check]:
+        return super().make_checks() + [check_gender]
 
 
-class ClientIDsField(BaseField):
+def check_client_ids(value: Optional[List[int]]) -> NoReturn:
 
-    def __init__(self, required: bool, nullable: bool = False):
+    client_ids = [] if value is None else value
+    if not isinstance(client_ids, (list, tuple)):
+        raise ValueError(f"client ids should be of type list, not {type(client_ids)}")
 
-        super().__init__(required, nullable)
+    if not client_ids:
+        raise ValueError("Client ids should be not empty")
 
-    def _validate(self, value: Optional[List[int]]) -> NoReturn:
+    for single_id in client_ids:
+        if not isinstance(single_id, int):
+            raise ValueError(f"Client id should be int, not {type(single_id)}")
 
-        super()._validate(value)
-        client_ids = [] if value is None else value
-        if not isinstance(client_ids, (list, tuple)):
-            raise ValueError(f"client ids should be of type list, not {type(client_ids)}")
 
-        if not client_ids:
-            raise ValueError("Client ids should be not empty")
+class ClientIDsField(BaseField):
 
-        for single_id in client_ids:
-            if not isinstance(single_id, int):
-                raise ValueError(f"Client id should be int, not {type(single_id)}")
+    def __init__(self, required: bool, nullable: bool = False):
+
+        super().__init__(required, nullable)
+
+    def make_checks(self) -> List[Check]:
+        return super().make_checks() + [check_client_ids]
 
 
 class RequestMeta(type):
 
+    """
+    Collects fields of request class and compiles them
+    into flat tuple of field names and their checks once at class creation
+    """
+
     def __new__(mcs, name, bases, attrs):
 
         fields = []
@@ -224,6 +325,7 @@ class RequestMeta(type):
                 fields.append((attr_name, attr_value))
 
         attrs["fields"] = fields
+        attrs["compiled_checks"] = tuple((field_name, field_.checks) for field_name, field_ in fields)
 
         return super().__new__(mcs, name, bases, attrs)
 
@@ -241,12 +343,16 @@ class BaseRequest(metaclass=RequestMeta):
         """
 
         validation_errors = dict()
-        for field_name, field_ in self.fields:
+        values = self.__dict__
+        for field_name, checks in self.compiled_checks:
             try:
                 field_request_value = self.request_body.get(field_name)
-                setattr(self, field_name, field_request_value)
+                for check in checks:
+                    check(field_request_value)
             except Exception as exc:
                 validation_errors[field_name] = str(exc)
+            else:
+                values[field_name] = field_request_value
 
         return validation_errors
 
@@ -314,20 +420,74 @@ class MethodRequest(BaseRequest):
         return self.login == ADMIN_LOGIN
 
 
+class HourlyAdminDigest:
+
+    """
+    Digest of admin token calculated once per hour
+    """
+
+    def __init__(self):
+
+        self._valid_until = 0.0
+        self._digest = None
+
+    def get(self) -> bytes:
+
+        """
+        :return: hex digest of current hour and admin salt
+        """
+
+        if time.time() >= self._valid_until:
+            now = datetime.datetime.now()
+            next_hour = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+            self._digest = hashlib.sha512((now.strftime("%Y%m%d%H") + ADMIN_SALT).encode("utf-8")).hexdigest().encode()
+            self._valid_until = next_hour.timestamp()
+
+        return self._digest
+
+
+admin_digest = HourlyAdminDigest()
+
+
+@lru_cache(maxsize=AUTH_CACHE_SIZE)
+def get_account_digest(account: str, login: str) -> bytes:
+
+    """
+    Calculates digest of account token, recently used digests are cached
+    :return: hex digest of account, login and salt
+    """
+
+    return hashlib.sha512((account + login + SALT).encode("utf-8")).hexdigest().encode()
+
+
 def check_auth(request: MethodRequest):
 
     if request.is_admin:
-        digest = hashlib.sha512(
-            (datetime.datetime.now().strftime("%Y%m%d%H") + ADMIN_SALT).encode("utf-8")
-        ).hexdigest()
+        digest = admin_digest.get()
     else:
-        digest = hashlib.sha512(
-            (request.account + request.login + SALT).encode("utf-8")
-        ).hexdigest()
-    if digest == request.token:
-        return True
+        digest = get_account_digest(request.account, request.login)
+
+    # comparison time does not depend on matched prefix of token
+    return hmac.compare_digest(digest, request.token.encode("utf-8"))
+
+
+def validate_clients_interests_request(
+        method_request: MethodRequest,
+        context
+) -> Tuple[Optional[ClientsInterestsRequest], Optional[Dict[str, str]]]:
+
+    """
+    Validates arguments of clients interests request
+    :return: valid request and None or None and validation errors
+    """
+
+    client_interests_request = ClientsInterestsRequest(request_body=method_request.arguments)
+    request_is_valid, errors = client_interests_request.is_valid()
+    if not request_is_valid:
+        return None, errors
+    context["nclients"] = len(client_interests_request.client_ids)
 
-    return False
+    return client_interests_request, None
 
 
 def handle_clients_interests_request(method_request: MethodRequest,
@@ -337,19 +497,37 @@ def handle_clients_interests_request(method_request: MethodRequest,
     Handles clients interest request
     """
 
-    client_interests_request = ClientsInterestsRequest(request_body=method_request.arguments)
-    request_is_valid, errors = client_interests_request.is_valid()
-    if not request_is_valid:
+    client_interests_request, errors = validate_clients_interests_request(method_request, context)
+    if client_interests_request is None:
         return errors, INVALID_REQUEST
-    response = {
-        client_id: get_interests(store=store, client_id=client_id)
-        for client_id in client_interests_request.client_ids
-    }
-    context["nclients"] = len(client_interests_request.client_ids)
+    client_ids = client_interests_request.client_ids
+    response = dict(zip(client_ids, get_many_interests(store=store, client_ids=client_ids)))
 
     return response, OK
 
 
+def validate_online_score_request(
+        method_request: MethodRequest,
+        context
+) -> Tuple[Optional[OnlineScoreRequest], Optional[Union[Dict[str, str], str]]]:
+
+    """
+    Validates arguments of online score request
+    :return: valid request and None or None and validation errors
+    """
+
+    online_score_request = OnlineScoreRequest(request_body=method_request.arguments)
+    request_is_valid, errors = online_score_request.is_valid()
+    if not request_is_valid:
+        return None, errors
+    context["has"] = [
+        field_val[0] for field_val in online_score_request.fields
+        if online_score_request.__dict__.get(field_val[0]) is not None
+    ]
+
+    return online_score_request, None
+
+
 def handle_online_score_request(method_request: MethodRequest,
                                 store,
                                 context) -> Tuple[Dict, str]:
@@ -357,13 +535,11 @@ def handle_online_score_request(method_request: MethodRequest,
     Handles online score request
     """
 
-    online_score_request = OnlineScoreRequest(request_body=method_request.arguments)
-    request_is_valid, errors = online_score_request.is_valid()
-    if not request_is_valid:
+    online_score_request, errors = validate_online_score_request(method_request, context)
+    if online_score_request is None:
         return errors, INVALID_REQUEST
 
-    admin_score_response = 42
-    score = admin_score_response if method_request.is_admin else get_score(
+    score = ADMIN_SCORE if method_request.is_admin else get_score(
         store=store,
         email=online_score_request.email,
         birthday=online_score_request.birthday,
@@ -372,13 +548,8 @@ def handle_online_score_request(method_request: MethodRequest,
         last_name=online_score_request.last_name,
         phone=online_score_request.phone
     )
-    response = {"score": score}
-    context["has"] = [
-        field_val[0] for field_val in online_score_request.fields
-        if online_score_request.__dict__.get(field_val[0]) is not None
-    ]
 
-    return response, OK
+    return {"score": score}, OK
 
 
 def handle_request_method(method_request: MethodRequest,
@@ -408,21 +579,35 @@ def handle_request_method(method_request: MethodRequest,
         return "Unknown method", INVALID_REQUEST
 
 
-def method_handler(request: Dict[str, Union[int, str]],
-                   ctx,
-                   store):
+def validate_method_request(
+        request: Dict[str, Union[int, str]]
+) -> Tuple[MethodRequest, Optional[Tuple[Union[Dict[str, str], str], int]]]:
+
+    """
+    Validates method request and checks authorization
+    :return: method request and None if it is valid and authorized or error response with code otherwise
+    """
+
     method_request = MethodRequest(request_body=request["body"])
 
     # Validate request method
     request_method_is_valid, request_method_errors = method_request.is_valid()
     if not request_method_is_valid:
-        code = INVALID_REQUEST
-        return request_method_errors, code
+        return method_request, (request_method_errors, INVALID_REQUEST)
 
     # Check authorization
     if not check_auth(request=method_request):
-        code = FORBIDDEN
-        return "Forbidden", code
+        return method_request, ("Forbidden", FORBIDDEN)
+
+    return method_request, None
+
+
+def method_handler(request: Dict[str, Union[int, str]],
+                   ctx,
+                   store):
+    method_request, error = validate_method_request(request)
+    if error is not None:
+        return error
 
     # Get method
     response, code = handle_request_method(
@@ -434,8 +619,37 @@ def method_handler(request: Dict[str, Union[int, str]],
     return response, code
 
 
+def make_response_body(response: Union[Dict, str], code: int, context: Dict[str, Any]) -> bytes:
+
+    """
+    Makes body of api response and logs it with request context
+    :param response: response of method or error description
+    :param code: code of response
+    :param context: context of request
+    :return: response encoded as json
+    """
+
+    if code not in ERRORS:
+        r = {"response": response, "code": code}
+    else:
+        r = {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
+    context.update(r)
+    logging.info(context)
+
+    return json.dumps(r).encode("utf-8")
+
+
 class MainHTTPHandler(BaseHTTPRequestHandler):
 
+    """
+    Handler of api requests. Connections are kept alive between requests
+    only if server supports it, otherwise every response closes connection
+    """
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, without nagle small response waits for delayed ack of client
+    disable_nagle_algorithm = True
+
     router = {
         "method": method_handler
     }
@@ -450,13 +664,21 @@ class MainHTTPHandler(BaseHTTPRequestHandler):
     def get_request_id(headers):
         return headers.get('HTTP_X_REQUEST_ID', uuid.uuid4().hex)
 
+    def setup(self):
+
+        # idle keep-alive connection is closed after timeout, so that it does not hold worker forever
+        self.timeout = getattr(self.server, "keepalive_timeout", None)
+        super().setup()
+
     def do_POST(self):
 
         response, code = dict(), OK
         context = {"request_id": self.get_request_id(self.headers)}
         request = None
+        body_is_read = False
         try:
             data_string = self.rfile.read(int(self.headers['Content-Length']))
+            body_is_read = True
             request = json.loads(data_string)
         except:
             code = BAD_REQUEST
@@ -475,28 +697,157 @@ class MainHTTPHandler(BaseHTTPRequestHandler):
             else:
                 code = NOT_FOUND
 
+        response_body = make_response_body(response=response, code=code, context=context)
+
+        # request without body length leaves unknown rest of request in connection
+        if not body_is_read or not getattr(self.server, "keep_alive", False):
+            self.close_connection = True
+
         self.send_response(code)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response_body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
         self.end_headers()
-        if code not in ERRORS:
-            r = {"response": response, "code": code}
-        else:
-            r = {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
-        context.update(r)
-        logging.info(context)
-        self.wfile.write(json.dumps(r))
+        self.wfile.write(response_body)
         return
 
 
+class SerialHTTPServer(HTTPServer):
+
+    """
+    HTTP server handling requests one by one, connection is closed after every response
+    """
+
+    keep_alive = False
+
+    def __init__(self, server_address: Tuple[str, int], handler_class, backlog: int = DEFAULT_BACKLOG):
+
+        self.request_queue_size = backlog
+        super().__init__(server_address, handler_class)
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+
+    """
+    HTTP server handling connections in bounded pool of worker threads.
+    Connections are kept alive between requests until keep-alive timeout.
+    When all workers are busy, accepting of new connections waits for free worker
+    and new connections are queued in listen backlog of socket
+    """
+
+    keep_alive = True
+
+    def __init__(self,
+                 server_address: Tuple[str, int],
+                 handler_class,
+                 workers: int,
+                 backlog: int = DEFAULT_BACKLOG,
+                 keepalive_timeout: Optional[float] = DEFAULT_KEEPALIVE_TIMEOUT_SEC):
+
+        self.request_queue_size = backlog
+        self.keepalive_timeout = keepalive_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        self._free_workers = threading.BoundedSemaphore(workers)
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        self._free_workers.acquire()
+        self._executor.submit(self._process_request_in_worker, request, client_address)
+
+    def _process_request_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._free_workers.release()
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def make_server(server_address: Tuple[str, int],
+                workers: int = 1,
+                backlog: int = DEFAULT_BACKLOG,
+                keepalive_timeout: Optional[float] = DEFAULT_KEEPALIVE_TIMEOUT_SEC,
+                handler_class=MainHTTPHandler) -> HTTPServer:
+
+    """
+    Creates api server: serial server for single worker
+    and server with pool of threads and keep-alive connections for several workers
+    :param server_address: host and port to listen
+    :param workers: number of worker threads
+    :param backlog: size of queue of not accepted connections
+    :param keepalive_timeout: time in seconds idle connection is kept alive
+    :param handler_class: handler of requests
+    :return: server ready to serve
+    """
+
+    if workers <= 1:
+        return SerialHTTPServer(server_address, handler_class, backlog=backlog)
+
+    return ThreadPoolHTTPServer(
+        server_address,
+        handler_class,
+        workers=workers,
+        backlog=backlog,
+        keepalive_timeout=keepalive_timeout
+    )
+
+
+def serve_until_terminated(server: HTTPServer, store) -> NoReturn:
+
+    """
+    Serves requests until SIGTERM or keyboard interrupt. On SIGTERM server is shut down
+    from separate thread after current request, as shutdown waits for loop of serve_forever.
+    Server and storage are closed in any case, so that queued cache writes are written before exit
+    :param server: server to run
+    :param store: storage of server
+    """
+
+    def shutdown_on_sigterm(signum, frame):
+        logging.info("Got SIGTERM, shutting down server")
+        threading.Thread(target=server.shutdown, name="server-shutdown").start()
+
+    previous_handler = signal.signal(signal.SIGTERM, shutdown_on_sigterm)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        server.server_close()
+        # queued cache writes are written before exit
+        store.close()
+
+
 if __name__ == "__main__":
 
     op = OptionParser()
     op.add_option("-p", "--port", action="store", type=int, default=8080)
     op.add_option("-l", "--log", action="store", default=None)
+    op.add_option("-w", "--workers", action="store", type=int, default=1,
+                  help="number of worker threads, requests are served one by one with single worker")
+    op.add_option("--backlog", action="store", type=int, default=DEFAULT_BACKLOG)
+    op.add_option("--keepalive-timeout", action="store", type=float, default=DEFAULT_KEEPALIVE_TIMEOUT_SEC)
     op.add_option("--store-host", action="store", default="localhost")
     op.add_option("--store-port", action="store", default=6379)
     op.add_option("--store-max-retries", action="store", default=3)
     op.add_option("--store-timeout", action="store", default=3)
+    op.add_option("--store-max-connections", action="store", type=int, default=DEFAULT_MAX_CONNECTIONS,
+                  help="size of pool of connections to storage")
+    op.add_option("--local-cache-size", action="store", type=int, default=0,
+                  help="size of in-process cache of scores in front of redis, disabled if 0")
+    op.add_option("--local-cache-ttl", action="store", type=float, default=DEFAULT_LOCAL_CACHE_TTL_SEC)
+    op.add_option("--negative-cache-ttl", action="store", type=float, default=DEFAULT_NEGATIVE_TTL_SEC,
+                  help="time cache misses caused by redis errors are kept in local cache, disabled if 0")
+    op.add_option("--write-behind-queue-size", action="store", type=int, default=0,
+                  help="size of queue of cache writes done in background, cache is written by requests if 0")
+    op.add_option("--write-behind-policy", action="store", type="choice", choices=OVERFLOW_POLICIES,
+                  default=DROP_POLICY, help="what to do with cache write when queue is full: drop or block")
     opts, args = op.parse_args()
     logging.basicConfig(
         filename=opts.log,
@@ -504,17 +855,32 @@ if __name__ == "__main__":
         format='[%(asctime)s] %(levelname).1s %(message)s',
         datefmt='%Y.%m.%d %H:%M:%S'
     )
-    MainHTTPHandler.set_store(KeyValueStorage(
+    store = KeyValueStorage(
         host=opts.store_host,
         port=opts.store_port,
         retries_limit=opts.store_max_retries,
-        timeout=opts.store_timeout
-    ))
-    server = HTTPServer(("localhost", opts.port), MainHTTPHandler)
-    logging.info("Starting server at %s" % opts.port)
-
-    try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        pass
-    server.server_close()
+        timeout=opts.store_timeout,
+        max_connections=opts.store_max_connections
+    )
+    if opts.write_behind_queue_size > 0:
+        store = WriteBehindKeyValueStorage(
+            store=store,
+            max_queue_size=opts.write_behind_queue_size,
+            overflow_policy=opts.write_behind_policy
+        )
+    if opts.local_cache_size > 0:
+        store = TieredKeyValueStorage(
+            store=store,
+            max_size=opts.local_cache_size,
+            ttl_sec=opts.local_cache_ttl,
+            negative_ttl_sec=opts.negative_cache_ttl or None
+        )
+    MainHTTPHandler.set_store(store)
+    server = make_server(
+        ("localhost", opts.port),
+        workers=opts.workers,
+        backlog=opts.backlog,
+        keepalive_timeout=opts.keepalive_timeout
+    )
+    logging.info("Starting server at %s with %d workers" % (opts.port, opts.workers))
+    serve_until_terminated(server=server, store=store)
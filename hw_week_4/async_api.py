@@ -0,0 +1,288 @@
+import asyncio
+import http.client
+import io
+import json
+import logging
+import uuid
+from optparse import OptionParser
+from typing import Dict, NoReturn, Optional, Set, Tuple, Union
+
+from api import (
+    ADMIN_SCORE,
+    BAD_REQUEST,
+    DEFAULT_BACKLOG,
+    DEFAULT_KEEPALIVE_TIMEOUT_SEC,
+    INTERNAL_ERROR,
+    INVALID_REQUEST,
+    NOT_FOUND,
+    OK,
+    MethodRequest,
+    make_response_body,
+    validate_clients_interests_request,
+    validate_method_request,
+    validate_online_score_request
+)
+from async_store import AsyncKeyValueStorage
+from scoring import get_many_interests_async, get_score_async
+from store import DEFAULT_MAX_CONNECTIONS
+
+MAX_HEADERS = 100
+
+
+async def handle_clients_interests_request_async(method_request: MethodRequest,
+                                                 store: AsyncKeyValueStorage,
+                                                 context) -> Tuple[Dict, int]:
+    """
+    Handles clients interest request
+    """
+
+    client_interests_request, errors = validate_clients_interests_request(method_request, context)
+    if client_interests_request is None:
+        return errors, INVALID_REQUEST
+    client_ids = client_interests_request.client_ids
+    interests = await get_many_interests_async(store=store, client_ids=client_ids)
+
+    return dict(zip(client_ids, interests)), OK
+
+
+async def handle_online_score_request_async(method_request: MethodRequest,
+                                            store: AsyncKeyValueStorage,
+                                            context) -> Tuple[Dict, int]:
+    """
+    Handles online score request
+    """
+
+    online_score_request, errors = validate_online_score_request(method_request, context)
+    if online_score_request is None:
+        return errors, INVALID_REQUEST
+
+    score = ADMIN_SCORE if method_request.is_admin else await get_score_async(
+        store=store,
+        email=online_score_request.email,
+        birthday=online_score_request.birthday,
+        gender=online_score_request.gender,
+        first_name=online_score_request.first_name,
+        last_name=online_score_request.last_name,
+        phone=online_score_request.phone
+    )
+
+    return {"score": score}, OK
+
+
+async def method_handler_async(request: Dict[str, Union[int, str]],
+                               ctx,
+                               store: AsyncKeyValueStorage):
+    method_request, error = validate_method_request(request)
+    if error is not None:
+        return error
+
+    if method_request.method == "clients_interests":
+        return await handle_clients_interests_request_async(method_request=method_request, store=store, context=ctx)
+    elif method_request.method == "online_score":
+        return await handle_online_score_request_async(method_request=method_request, store=store, context=ctx)
+
+    return "Unknown method", INVALID_REQUEST
+
+
+class AsyncAPIServer:
+
+    """
+    Api server handling all connections in single event loop.
+    Requests waiting for storage do not hold threads, so many requests share one process.
+    Connections are kept alive between requests until keep-alive timeout
+    """
+
+    keep_alive = True
+
+    router = {
+        "method": method_handler_async
+    }
+
+    def __init__(self,
+                 store: AsyncKeyValueStorage,
+                 backlog: int = DEFAULT_BACKLOG,
+                 keepalive_timeout: Optional[float] = DEFAULT_KEEPALIVE_TIMEOUT_SEC):
+
+        self.store = store
+        self.backlog = backlog
+        self.keepalive_timeout = keepalive_timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connection_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def server_address(self) -> Tuple[str, int]:
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self, host: str, port: int) -> NoReturn:
+        self._server = await asyncio.start_server(self._handle_connection, host, port, backlog=self.backlog)
+
+    async def serve_forever(self) -> NoReturn:
+        await self._server.serve_forever()
+
+    async def close(self) -> NoReturn:
+
+        """
+        Stops accepting of connections, closes open connections and connections to storage
+        """
+
+        self._server.close()
+        for task in self._connection_tasks:
+            task.cancel()
+        await asyncio.gather(*self._connection_tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        await self.store.close()
+
+    async def _read_request(
+            self,
+            reader: asyncio.StreamReader
+    ) -> Optional[Tuple[str, str, str, http.client.HTTPMessage]]:
+
+        """
+        Reads request line and headers of next request in connection
+        :return: method, path, version and headers or None if connection is closed by client or idle for too long
+        """
+
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=self.keepalive_timeout)
+            if not request_line:
+                return None
+            header_lines = list()
+            while len(header_lines) <= MAX_HEADERS:
+                header_line = await reader.readline()
+                header_lines.append(header_line)
+                if header_line in (b"\r\n", b"\n", b""):
+                    break
+        except (asyncio.TimeoutError, ConnectionError, ValueError, asyncio.LimitOverrunError):
+            return None
+
+        request_line_parts = request_line.decode("latin-1").split()
+        if len(request_line_parts) != 3 or len(header_lines) > MAX_HEADERS:
+            return None
+        method, path, version = request_line_parts
+        headers = http.client.parse_headers(io.BytesIO(b"".join(header_lines)))
+
+        return method, path, version, headers
+
+    async def _process_request(self, method: str, path: str, headers, body: Optional[bytes]) -> Tuple[bytes, int]:
+
+        """
+        Routes request to method handler
+        :return: response body and code
+        """
+
+        response, code = dict(), OK
+        context = {"request_id": headers.get('HTTP_X_REQUEST_ID', uuid.uuid4().hex)}
+        request = None
+        try:
+            if method != "POST":
+                raise ValueError(f"Unsupported method {method}")
+            request = json.loads(body)
+        except Exception:
+            code = BAD_REQUEST
+
+        if request:
+            route = path.strip("/")
+            logging.info("%s: %s %s" % (path, body, context["request_id"]))
+            if route in self.router:
+                try:
+                    response, code = await self.router[route]({"body": request, "headers": headers}, context, self.store)
+                except Exception as e:
+                    logging.exception("Unexpected error: %s" % e)
+                    code = INTERNAL_ERROR
+            else:
+                code = NOT_FOUND
+
+        return make_response_body(response=response, code=code, context=context), code
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> NoReturn:
+
+        """
+        Serves requests of single connection one by one until it is closed
+        """
+
+        task = asyncio.current_task()
+        self._connection_tasks.add(task)
+        try:
+            while True:
+                parsed_request = await self._read_request(reader)
+                if parsed_request is None:
+                    break
+                method, path, version, headers = parsed_request
+
+                body = None
+                try:
+                    body = await reader.readexactly(int(headers["Content-Length"]))
+                except (TypeError, ValueError, asyncio.IncompleteReadError):
+                    pass
+
+                response_body, code = await self._process_request(method, path, headers, body)
+
+                # request without body length leaves unknown rest of request in connection
+                close_connection = (
+                    body is None
+                    or version != "HTTP/1.1"
+                    or headers.get("Connection", "").lower() == "close"
+                )
+                response_headers = [
+                    f"HTTP/1.1 {code} {http.client.responses.get(code, '')}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(response_body)}"
+                ]
+                if close_connection:
+                    response_headers.append("Connection: close")
+                writer.write(("\r\n".join(response_headers) + "\r\n\r\n").encode("latin-1") + response_body)
+                await writer.drain()
+                if close_connection:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self._connection_tasks.discard(task)
+
+
+async def run_server(server: AsyncAPIServer, host: str, port: int) -> NoReturn:
+
+    await server.start(host, port)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+
+    op = OptionParser()
+    op.add_option("-p", "--port", action="store", type=int, default=8080)
+    op.add_option("-l", "--log", action="store", default=None)
+    op.add_option("--backlog", action="store", type=int, default=DEFAULT_BACKLOG)
+    op.add_option("--keepalive-timeout", action="store", type=float, default=DEFAULT_KEEPALIVE_TIMEOUT_SEC)
+    op.add_option("--store-host", action="store", default="localhost")
+    op.add_option("--store-port", action="store", type=int, default=6379)
+    op.add_option("--store-max-retries", action="store", type=int, default=3)
+    op.add_option("--store-timeout", action="store", type=float, default=3)
+    op.add_option("--store-max-connections", action="store", type=int, default=DEFAULT_MAX_CONNECTIONS)
+    opts, args = op.parse_args()
+    logging.basicConfig(
+        filename=opts.log,
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname).1s %(message)s',
+        datefmt='%Y.%m.%d %H:%M:%S'
+    )
+    api_server = AsyncAPIServer(
+        store=AsyncKeyValueStorage(
+            host=opts.store_host,
+            port=opts.store_port,
+            retries_limit=opts.store_max_retries,
+            timeout=opts.store_timeout,
+            max_connections=opts.store_max_connections
+        ),
+        backlog=opts.backlog,
+        keepalive_timeout=opts.keepalive_timeout
+    )
+    logging.info("Starting asyncio server at %s" % opts.port)
+
+    try:
+        asyncio.run(run_server(api_server, host="localhost", port=opts.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+from typing import Any, List, NoReturn, Optional, Tuple, Union
+
+from redis.exceptions import ConnectionError, ResponseError, TimeoutError
+from store import (
+    DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+    DEFAULT_CIRCUIT_RESET_TIMEOUT_SEC,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MAX_RETRY_BACKOFF_SEC,
+    DEFAULT_RETRY_BACKOFF_SEC,
+    MGET_BATCH_SIZE,
+    CircuitBreaker,
+    get_retry_delay
+)
+
+
+def encode_command(*args: Union[str, int, float, bytes]) -> bytes:
+
+    """
+    Encodes command to redis serialization protocol (RESP)
+    :param args: command name and its arguments
+    :return: command as array of bulk strings
+    """
+
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+
+    """
+    Reads single reply of redis server
+    :param reader: stream of connection to redis
+    :return: bytes for bulk strings, str for simple strings, int for integers and list for arrays
+    """
+
+    line = await reader.readuntil(b"\r\n")
+    reply_type, payload = line[:1], line[1:-2]
+    if reply_type == b"+":
+        return payload.decode("utf-8")
+    if reply_type == b"-":
+        raise ResponseError(payload.decode("utf-8"))
+    if reply_type == b":":
+        return int(payload)
+    if reply_type == b"$":
+        length = int(payload)
+        if length == -1:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if reply_type == b"*":
+        length = int(payload)
+        if length == -1:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+
+    raise ConnectionError(f"Unexpected reply from redis: {line!r}")
+
+
+class AsyncKeyValueStorage:
+
+    """
+    Key value storage with redis server accessed without blocking of event loop.
+    Connections are opened on demand and reused, at most max_connections commands are in flight at once
+    """
+
+    def __init__(self,
+                 host: str,
+                 port: int,
+                 retries_limit: int,
+                 timeout: float,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 retry_backoff_sec: float = DEFAULT_RETRY_BACKOFF_SEC,
+                 max_retry_backoff_sec: float = DEFAULT_MAX_RETRY_BACKOFF_SEC,
+                 circuit_failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+                 circuit_reset_timeout_sec: float = DEFAULT_CIRCUIT_RESET_TIMEOUT_SEC):
+
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries_limit = retries_limit
+        self.max_connections = max_connections
+        self.retry_backoff_sec = retry_backoff_sec
+        self.max_retry_backoff_sec = max_retry_backoff_sec
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=circuit_failure_threshold,
+            reset_timeout_sec=circuit_reset_timeout_sec
+        )
+        self._idle_connections: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = list()
+        self._connections_limit = None
+
+    async def _open_connection(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+
+        """
+        Opens new connection to redis server
+        :return: reader and writer of connection
+        """
+
+        try:
+            return await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timeout connecting to redis with host {self.host} and port {self.port}")
+        except OSError as exception:
+            raise ConnectionError(
+                f"Error connecting to redis with host {self.host} and port {self.port}: {exception}"
+            )
+
+    async def _execute_once(self, *commands: Tuple[Union[str, int, float], ...]) -> List[Any]:
+
+        """
+        Sends commands at once over idle or new connection and reads their replies.
+        Connection is closed instead of reuse if any command failed
+        """
+
+        connection = self._idle_connections.pop() if self._idle_connections else await self._open_connection()
+        reader, writer = connection
+        try:
+            writer.write(b"".join(encode_command(*command) for command in commands))
+            await writer.drain()
+            replies = [await asyncio.wait_for(read_reply(reader), timeout=self.timeout) for _ in commands]
+        except asyncio.TimeoutError:
+            writer.close()
+            raise TimeoutError("Timeout reading from redis")
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as exception:
+            writer.close()
+            raise ConnectionError(f"Error while reading from redis: {exception}")
+        except BaseException:
+            writer.close()
+            raise
+
+        self._idle_connections.append(connection)
+        return replies
+
+    async def execute_pipeline(self, *commands: Tuple[Union[str, int, float], ...]) -> List[Any]:
+
+        """
+        Executes several redis commands in single round trip
+        retrying them over new connection after connection errors and timeouts
+        with exponential backoff and jitter until circuit breaker is opened.
+        Error replies of redis are not retried, but they close circuit.
+        Trial call of circuit breaker is released even if it is cancelled
+        :param commands: tuples of command name and its arguments
+        :return: replies of redis server in order of commands
+        """
+
+        if self._connections_limit is None:
+            self._connections_limit = asyncio.Semaphore(self.max_connections)
+
+        for attempt in range(self.retries_limit + 1):
+            is_trial = self.circuit_breaker.check()
+            try:
+                async with self._connections_limit:
+                    replies = await self._execute_once(*commands)
+            except (ConnectionError, TimeoutError):
+                self.circuit_breaker.record_failure()
+                if attempt == self.retries_limit or self.circuit_breaker.is_open:
+                    raise
+            except ResponseError:
+                self.circuit_breaker.record_success()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return replies
+            finally:
+                if is_trial:
+                    self.circuit_breaker.release_trial()
+            logging.error("Something went wrong. Retrying...")
+            await asyncio.sleep(get_retry_delay(attempt, self.retry_backoff_sec, self.max_retry_backoff_sec))
+
+    async def execute_command(self, *args: Union[str, int, float]) -> Any:
+
+        """
+        Executes redis command with retries of execute_pipeline
+        :param args: command name and its arguments
+        :return: reply of redis server
+        """
+
+        replies = await self.execute_pipeline(args)
+
+        return replies[0]
+
+    async def get(self, key: str) -> Optional[str]:
+
+        """
+        Gets value by key as from persistent data storage
+        :param key: key to get value for
+        :return: value for specified key
+        """
+
+        result = await self.execute_command("GET", key)
+
+        return result.decode("utf-8") if result is not None else result
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+
+        """
+        Gets values of several keys in single round trip to storage
+        :param keys: keys to get values for
+        :return: values in order of keys, None for missing keys
+        """
+
+        if not keys:
+            return []
+
+        batches_results = await self.execute_pipeline(*(
+            ("MGET", *keys[batch_start:batch_start + MGET_BATCH_SIZE])
+            for batch_start in range(0, len(keys), MGET_BATCH_SIZE)
+        ))
+
+        return [
+            result.decode("utf-8") if result is not None else result
+            for batch_results in batches_results
+            for result in batch_results
+        ]
+
+    async def cache_get(self, key: str) -> Optional[float]:
+
+        """
+        Gets value by key from cache
+        :param key: key to get value for
+        :return: float value if found some in cache and None otherwise
+        """
+
+        result = None
+        try:
+            result = await self.get(key)
+        except (ConnectionError, TimeoutError) as exception:
+            logging.error(
+                "Could not get value from cache. Encountered error: %s",
+                str(exception)
+            )
+
+        return float(result) if result is not None else result
+
+    async def cache_set(self, key: str,
+                        value: Union[float, int],
+                        key_expire_time_sec: int) -> NoReturn:
+
+        """
+        Sets the value into cache by specified key
+        :param key: key to set value for
+        :param value: value for setting
+        :param key_expire_time_sec: time in which key will be expired
+        """
+
+        try:
+            await self.execute_command("SET", key, str(value), "EX", key_expire_time_sec)
+        except (ConnectionError, TimeoutError) as exception:
+            logging.error(
+                "Could not set value to cache. Encountered error: %s",
+                str(exception)
+            )
+
+    async def clear(self) -> NoReturn:
+        await self.execute_command("FLUSHALL")
+
+    async def close(self) -> NoReturn:
+
+        """
+        Closes idle connections to redis server
+        """
+
+        while self._idle_connections:
+            _, writer = self._idle_connections.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
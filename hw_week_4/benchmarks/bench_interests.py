@@ -0,0 +1,80 @@
+"""
+Compares latency of getting interests of several clients one by one (GET per client)
+and in single round trip (MGET batches in one pipeline) as function of number of client ids.
+By default stand-in redis server on localhost is used, real redis could be used with --store-host.
+Run from hw_week_4 directory:
+
+    python -m benchmarks.bench_interests --num-ids 1 10 100 1000 --repeats 20
+"""
+import json
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Callable, List
+
+from scoring import get_interests, get_many_interests
+from store import KeyValueStorage
+from tests.redis_server import StandInRedisServer
+
+
+def measure_latency_ms(get_all_interests: Callable[[List[int]], List[List[str]]],
+                       client_ids: List[int],
+                       repeats: int) -> float:
+
+    """
+    Measures median latency of getting interests of all clients
+    :param get_all_interests: function getting interests of list of clients
+    :param client_ids: ids of clients
+    :param repeats: number of measurements
+    :return: median latency in milliseconds
+    """
+
+    latencies = list()
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        get_all_interests(client_ids)
+        latencies.append(time.perf_counter() - started_at)
+
+    return 1000 * statistics.median(latencies)
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--num-ids", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--store-host", default=None, help="Use redis on this host instead of stand-in server")
+    parser.add_argument("--store-port", type=int, default=6379)
+    args = parser.parse_args()
+
+    stand_in_server = None
+    host, port = args.store_host, args.store_port
+    if host is None:
+        stand_in_server = StandInRedisServer()
+        stand_in_server.start()
+        host, port = stand_in_server.server_address
+
+    store = KeyValueStorage(host=host, port=port, retries_limit=3, timeout=3)
+    store.clear()
+    max_client_id = max(args.num_ids)
+    for client_id in range(max_client_id):
+        store.cache_set(f"i:{client_id}", json.dumps(["cars", "books"]), key_expire_time_sec=60 * 60)
+
+    print(f"{'ids':>8}{'one by one, ms':>16}{'batched, ms':>14}{'speedup':>10}")
+    for num_ids in args.num_ids:
+        client_ids = list(range(num_ids))
+        one_by_one_ms = measure_latency_ms(
+            lambda ids: [get_interests(store=store, client_id=client_id) for client_id in ids],
+            client_ids=client_ids,
+            repeats=args.repeats
+        )
+        batched_ms = measure_latency_ms(
+            lambda ids: get_many_interests(store=store, client_ids=ids),
+            client_ids=client_ids,
+            repeats=args.repeats
+        )
+        print(f"{num_ids:>8}{one_by_one_ms:>16.2f}{batched_ms:>14.2f}{one_by_one_ms / batched_ms:>10.1f}")
+
+    store.clear()
+    if stand_in_server is not None:
+        stand_in_server.stop()
@@ -0,0 +1,110 @@
+"""
+Compares latency of get_score with redis cache only and with in-process cache in front of redis
+at different shares of repeated (hot) requests.
+With --write-behind scores are written to redis in background by WriteBehindKeyValueStorage.
+By default stand-in redis server on localhost is used, real redis could be used with --store-host.
+Run from hw_week_4 directory:
+
+    python -m benchmarks.bench_score_cache --requests 5000 --hit-ratios 0 0.5 0.9 0.99 [--write-behind]
+"""
+import random
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Dict, List, NoReturn
+
+from cache import TieredKeyValueStorage
+from scoring import get_score
+from store import KeyValueStorage
+from tests.redis_server import StandInRedisServer
+from write_behind import WriteBehindKeyValueStorage
+
+NUM_HOT_PHONES = 100
+
+
+def make_hot_phones() -> List[str]:
+    return [f"7{phone_num:010d}" for phone_num in range(NUM_HOT_PHONES)]
+
+
+def make_phones(num_requests: int, hit_ratio: float) -> List[str]:
+
+    """
+    Makes phones of requests, share hit_ratio of them is repeated phones from small hot set
+    """
+
+    random.seed(num_requests)
+    hot_phones = make_hot_phones()
+    return [
+        random.choice(hot_phones) if random.random() < hit_ratio else f"79{request_num:09d}"
+        for request_num in range(num_requests)
+    ]
+
+
+def warm_up(store) -> NoReturn:
+
+    """
+    Caches scores of hot phones before measurement
+    """
+
+    for phone in make_hot_phones():
+        get_score(store=store, phone=phone, email="stupnikov@otus.ru")
+
+
+def measure_latency(store, phones: List[str]) -> Dict[str, float]:
+
+    """
+    Measures latency of get_score for every phone
+    :return: latency percentiles in milliseconds
+    """
+
+    latencies = list()
+    for phone in phones:
+        started_at = time.perf_counter()
+        get_score(store=store, phone=phone, email="stupnikov@otus.ru")
+        latencies.append(time.perf_counter() - started_at)
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {"p50_ms": 1000 * percentiles[49], "p99_ms": 1000 * percentiles[98]}
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--hit-ratios", type=float, nargs="+", default=[0, 0.5, 0.9, 0.99])
+    parser.add_argument("--write-behind", action="store_true", help="Write scores to redis in background")
+    parser.add_argument("--store-host", default=None, help="Use redis on this host instead of stand-in server")
+    parser.add_argument("--store-port", type=int, default=6379)
+    args = parser.parse_args()
+
+    stand_in_server = None
+    host, port = args.store_host, args.store_port
+    if host is None:
+        stand_in_server = StandInRedisServer()
+        stand_in_server.start()
+        host, port = stand_in_server.server_address
+
+    print(f"{'hit ratio':>10}{'redis p50':>11}{'redis p99':>11}{'local p50':>11}{'local p99':>11}{'local hits':>12}")
+    for hit_ratio in args.hit_ratios:
+        phones = make_phones(num_requests=args.requests, hit_ratio=hit_ratio)
+        redis_store = KeyValueStorage(host=host, port=port, retries_limit=3, timeout=3)
+        if args.write_behind:
+            redis_store = WriteBehindKeyValueStorage(store=redis_store)
+        redis_store.clear()
+        warm_up(store=redis_store)
+        redis_result = measure_latency(store=redis_store, phones=phones)
+        redis_store.clear()
+        tiered_store = TieredKeyValueStorage(store=redis_store)
+        warm_up(store=tiered_store)
+        local_hits_before = tiered_store.stats()["local_hits"]
+        tiered_result = measure_latency(store=tiered_store, phones=phones)
+        local_hits = tiered_store.stats()["local_hits"] - local_hits_before
+        tiered_store.clear()
+        tiered_store.close()
+        print(
+            f"{hit_ratio:>10.2f}{redis_result['p50_ms']:>11.3f}{redis_result['p99_ms']:>11.3f}"
+            f"{tiered_result['p50_ms']:>11.3f}{tiered_result['p99_ms']:>11.3f}{local_hits:>12}"
+        )
+
+    if stand_in_server is not None:
+        stand_in_server.stop()
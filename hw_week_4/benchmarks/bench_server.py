@@ -0,0 +1,193 @@
+"""
+Load test of api server: several clients send online_score requests over keep-alive connections,
+requests/sec and latency percentiles are compared for serial server, thread pool servers
+and asyncio server (with --asyncio).
+By default storage is replaced with in-memory storage answering with delay like redis,
+real redis could be used with --store-host.
+Run from hw_week_4 directory:
+
+    python -m benchmarks.bench_server --clients 16 --requests 4000 --workers 1 4 16 --asyncio --store-delay-ms 2
+"""
+import asyncio
+import http.client
+import json
+import statistics
+import threading
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NoReturn, Optional, Union
+
+import api
+from async_api import AsyncAPIServer
+from async_store import AsyncKeyValueStorage
+from store import KeyValueStorage
+from tests.utils import set_valid_auth
+
+
+class DelayedStorage:
+
+    """
+    In-memory storage answering with fixed delay like remote storage
+    """
+
+    def __init__(self, delay_sec: float):
+
+        self.delay_sec = delay_sec
+        self._kv_store = dict()
+
+    def get(self, key: str) -> Optional[str]:
+        time.sleep(self.delay_sec)
+        return self._kv_store.get(key)
+
+    def cache_get(self, key: str) -> Optional[float]:
+        time.sleep(self.delay_sec)
+        return self._kv_store.get(key)
+
+    def cache_set(self, key: str, value: Union[int, float], key_expire_time_sec: int) -> NoReturn:
+        time.sleep(self.delay_sec)
+        self._kv_store[key] = value
+
+
+class DelayedAsyncStorage(DelayedStorage):
+
+    """
+    In-memory asynchronous storage answering with fixed delay like remote storage
+    """
+
+    async def get(self, key: str) -> Optional[str]:
+        await asyncio.sleep(self.delay_sec)
+        return self._kv_store.get(key)
+
+    async def cache_get(self, key: str) -> Optional[float]:
+        await asyncio.sleep(self.delay_sec)
+        return self._kv_store.get(key)
+
+    async def cache_set(self, key: str, value: Union[int, float], key_expire_time_sec: int) -> NoReturn:
+        await asyncio.sleep(self.delay_sec)
+        self._kv_store[key] = value
+
+    async def close(self) -> NoReturn:
+        pass
+
+
+class QuietHandler(api.MainHTTPHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_request_bodies(num_requests: int) -> List[bytes]:
+
+    """
+    Makes bodies of online_score requests with different phones, so that every request misses cache
+    """
+
+    bodies = list()
+    for request_num in range(num_requests):
+        request = {
+            "account": "horns&hoofs", "login": "h&f", "method": "online_score",
+            "arguments": {"phone": f"7{request_num:010d}", "email": "stupnikov@otus.ru"}
+        }
+        set_valid_auth(request)
+        bodies.append(json.dumps(request).encode("utf-8"))
+
+    return bodies
+
+
+def run_clients(server_address, bodies: List[bytes], num_clients: int) -> Dict[str, float]:
+
+    """
+    Sends requests from several clients, every client keeps its connection alive if server allows
+    :return: requests per second and latency percentiles in milliseconds
+    """
+
+    def run_client(client_num: int) -> List[float]:
+        connection = http.client.HTTPConnection(*server_address, timeout=30)
+        latencies = list()
+        for body in bodies[client_num::num_clients]:
+            started_at = time.perf_counter()
+            connection.request("POST", "/method/", body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started_at)
+            if response.status != api.OK:
+                raise RuntimeError(f"Unexpected response status {response.status}")
+        connection.close()
+        return latencies
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_clients) as executor:
+        latencies = [latency for client_latencies in executor.map(run_client, range(num_clients))
+                     for latency in client_latencies]
+    elapsed = time.perf_counter() - started_at
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": 1000 * percentiles[49],
+        "p99_ms": 1000 * percentiles[98]
+    }
+
+
+def run_thread_server(workers: int, store, bodies: List[bytes], num_clients: int) -> Dict[str, float]:
+
+    handler_class = type("BenchmarkHandler", (QuietHandler,), {"store": store})
+    server = api.make_server(("localhost", 0), workers=workers, handler_class=handler_class)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    try:
+        return run_clients(server_address=server.server_address, bodies=bodies, num_clients=num_clients)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_async_server(store, bodies: List[bytes], num_clients: int) -> Dict[str, float]:
+
+    server = AsyncAPIServer(store=store)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start("localhost", 0))
+    server_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    server_thread.start()
+    try:
+        return run_clients(server_address=server.server_address, bodies=bodies, num_clients=num_clients)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        server_thread.join()
+        loop.run_until_complete(server.close())
+        loop.close()
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--asyncio", action="store_true", help="Also load asyncio server")
+    parser.add_argument("--store-delay-ms", type=float, default=2.0, help="Delay of in-memory storage")
+    parser.add_argument("--store-host", default=None, help="Use redis on this host instead of in-memory storage")
+    parser.add_argument("--store-port", type=int, default=6379)
+    args = parser.parse_args()
+
+    print(f"{'server':>12}{'requests/s':>12}{'p50, ms':>10}{'p99, ms':>10}")
+    servers = [f"{workers} workers" for workers in args.workers] + (["asyncio"] if args.asyncio else [])
+    for server_name, workers in zip(servers, args.workers + [None]):
+        bodies = make_request_bodies(num_requests=args.requests)
+        if args.store_host is not None:
+            # every server starts with empty cache
+            KeyValueStorage(host=args.store_host, port=args.store_port, retries_limit=3, timeout=3).clear()
+        if workers is None:
+            if args.store_host is None:
+                store = DelayedAsyncStorage(delay_sec=args.store_delay_ms / 1000)
+            else:
+                store = AsyncKeyValueStorage(host=args.store_host, port=args.store_port, retries_limit=3, timeout=3)
+            result = run_async_server(store=store, bodies=bodies, num_clients=args.clients)
+        else:
+            if args.store_host is None:
+                store = DelayedStorage(delay_sec=args.store_delay_ms / 1000)
+            else:
+                store = KeyValueStorage(host=args.store_host, port=args.store_port, retries_limit=3, timeout=3)
+            result = run_thread_server(workers=workers, store=store, bodies=bodies, num_clients=args.clients)
+        print(f"{server_name:>12}{result['requests_per_sec']:>12.0f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
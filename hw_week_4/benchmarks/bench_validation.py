@@ -0,0 +1,71 @@
+"""
+Measures time of validation of OnlineScoreRequest and ClientsInterestsRequest arguments
+with compiled checks of request class (is_valid) and with setting of fields one by one,
+and time of check of authorization token.
+Run from hw_week_4 directory:
+
+    python -m benchmarks.bench_validation --repeats 20000
+"""
+import timeit
+from argparse import ArgumentParser
+from typing import Any, Dict
+
+from api import ADMIN_LOGIN, BaseRequest, ClientsInterestsRequest, MethodRequest, OnlineScoreRequest, check_auth
+from tests.utils import set_valid_auth
+
+REQUESTS = {
+    "score_full": (OnlineScoreRequest, {
+        "phone": "79175002040", "email": "stupnikov@otus.ru", "first_name": "Stanislav",
+        "last_name": "Stupnikov", "birthday": "01.01.1990", "gender": 1
+    }),
+    "score_phone_email": (OnlineScoreRequest, {"phone": 79175002040, "email": "stupnikov@otus.ru"}),
+    "score_invalid": (OnlineScoreRequest, {"phone": "89175002040", "birthday": "01.01.1890", "gender": 5}),
+    "interests": (ClientsInterestsRequest, {"client_ids": list(range(10)), "date": "20.07.2017"}),
+    "interests_invalid": (ClientsInterestsRequest, {"client_ids": [], "date": "2017.07.20"}),
+}
+
+
+def validate_by_fields(request_class: type, request_body: Dict[str, Any]) -> Dict[str, str]:
+
+    """
+    Validates request setting fields one by one through descriptors
+    """
+
+    request: BaseRequest = request_class(request_body=request_body)
+    validation_errors = dict()
+    for field_name, _ in request.fields:
+        try:
+            setattr(request, field_name, request_body.get(field_name))
+        except Exception as exc:
+            validation_errors[field_name] = str(exc)
+
+    return validation_errors
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'request':<20}{'compiled, us':>14}{'by fields, us':>15}")
+    for request_name, (request_class, request_body) in REQUESTS.items():
+        compiled_sec = min(timeit.repeat(
+            lambda: request_class(request_body=request_body).is_valid(), number=args.repeats, repeat=3
+        ))
+        by_fields_sec = min(timeit.repeat(
+            lambda: validate_by_fields(request_class, request_body), number=args.repeats, repeat=3
+        ))
+        print(
+            f"{request_name:<20}{1e6 * compiled_sec / args.repeats:>14.2f}"
+            f"{1e6 * by_fields_sec / args.repeats:>15.2f}"
+        )
+
+    print(f"{'login':<20}{'check_auth, us':>14}")
+    for login in ("h&f", ADMIN_LOGIN):
+        method_body = {"account": "horns&hoofs", "login": login, "method": "online_score", "arguments": {}}
+        set_valid_auth(method_body)
+        method_request = MethodRequest(request_body=method_body)
+        method_request.is_valid()
+        auth_sec = min(timeit.repeat(lambda: check_auth(method_request), number=args.repeats, repeat=3))
+        print(f"{login:<20}{1e6 * auth_sec / args.repeats:>14.2f}")
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NoReturn, Optional, Union
+
+from redis.exceptions import ConnectionError, TimeoutError
+from store import KeyValueStorage
+
+DEFAULT_LOCAL_CACHE_SIZE = 10_000
+DEFAULT_LOCAL_CACHE_TTL_SEC = 60.0
+DEFAULT_NEGATIVE_TTL_SEC = 5.0
+
+_MISSING = object()
+_NEGATIVE = object()
+
+
+class LocalCache:
+
+    """
+    Bounded in-process LRU cache with expiry of entries.
+    Least recently used entry is evicted when cache is full
+    """
+
+    def __init__(self, max_size: int, ttl_sec: float):
+
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+
+        """
+        Gets value by key
+        :param key: key to get value for
+        :return: value or _MISSING if key is not cached or expired
+        """
+
+        with self._lock:
+            value, expire_at = self._entries.get(key, (_MISSING, None))
+            if value is not _MISSING and expire_at <= time.monotonic():
+                del self._entries[key]
+                value = _MISSING
+            if value is _MISSING:
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl_sec: Optional[float] = None) -> NoReturn:
+
+        """
+        Sets value by key
+        :param key: key to set value for
+        :param value: value for setting
+        :param ttl_sec: time in which entry will be expired, not longer than ttl of cache
+        """
+
+        ttl_sec = self.ttl_sec if ttl_sec is None else min(ttl_sec, self.ttl_sec)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_sec)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> NoReturn:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TieredKeyValueStorage:
+
+    """
+    Key value storage with in-process cache in front of cache of redis storage.
+    Values got from redis or set to it are kept in local cache at most for its ttl
+    and never longer than expiry time of value in redis, got with value in the same round trip.
+    If negative_ttl_sec is set, cache misses caused by errors of redis are also kept
+    in local cache for negative_ttl_sec, so that requests for the same key do not wait for redis.
+    Counters of lookups are guarded by lock of local cache.
+    Persistent storage (get) is not cached
+    """
+
+    def __init__(self,
+                 store: KeyValueStorage,
+                 max_size: int = DEFAULT_LOCAL_CACHE_SIZE,
+                 ttl_sec: float = DEFAULT_LOCAL_CACHE_TTL_SEC,
+                 negative_ttl_sec: Optional[float] = None):
+
+        self.store = store
+        self.negative_ttl_sec = negative_ttl_sec
+        self.local_cache = LocalCache(max_size=max_size, ttl_sec=ttl_sec)
+        self.remote_hits = 0
+        self.negative_hits = 0
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return self.store.get_many(keys)
+
+    def cache_get(self, key: str) -> Optional[float]:
+
+        """
+        Gets value by key from local cache and then from cache of redis storage
+        :param key: key to get value for
+        :return: float value if found some in cache and None otherwise
+        """
+
+        value = self.local_cache.get(key)
+        if value is _NEGATIVE:
+            with self.local_cache._lock:
+                self.negative_hits += 1
+            return None
+        if value is not _MISSING:
+            return value
+
+        try:
+            result, redis_ttl_sec = self.store.get_with_ttl(key)
+        except (ConnectionError, TimeoutError) as exception:
+            logging.error(
+                "Could not get value from cache. Encountered error: %s",
+                str(exception)
+            )
+            if self.negative_ttl_sec is not None:
+                self.local_cache.set(key, _NEGATIVE, ttl_sec=self.negative_ttl_sec)
+            return None
+
+        if result is None:
+            return None
+        with self.local_cache._lock:
+            self.remote_hits += 1
+        value = float(result)
+        self.local_cache.set(key, value, ttl_sec=redis_ttl_sec)
+
+        return value
+
+    def cache_set(self, key: str,
+                  value: Union[float, int],
+                  key_expire_time_sec: int) -> NoReturn:
+
+        """
+        Sets the value into local cache and cache of redis storage by specified key
+        :param key: key to set value for
+        :param value: value for setting
+        :param key_expire_time_sec: time in which key will be expired
+        """
+
+        self.local_cache.set(key, float(value), ttl_sec=key_expire_time_sec)
+        self.store.cache_set(key, value, key_expire_time_sec=key_expire_time_sec)
+
+    def stats(self) -> Dict[str, int]:
+
+        """
+        Counters of cache lookups
+        :return: hits of local cache (negative ones included), hits of redis and misses of both caches
+        """
+
+        with self.local_cache._lock:
+            return {
+                "local_hits": self.local_cache.hits,
+                "negative_hits": self.negative_hits,
+                "remote_hits": self.remote_hits,
+                "misses": self.local_cache.misses - self.remote_hits
+            }
+
+    def clear(self) -> NoReturn:
+        self.local_cache.clear()
+        self.store.clear()
+
+    def close(self) -> NoReturn:
+        self.store.close()
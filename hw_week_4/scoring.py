@@ -3,9 +3,62 @@ import hashlib
 import json
 from typing import List, Optional, Union
 
+from async_store import AsyncKeyValueStorage
 from store import KeyValueStorage
 
 
+SCORE_EXPIRE_TIME_SEC = 60 * 60
+
+
+def make_score_key(phone: Optional[Union[str, int]],
+                   birthday: Optional[datetime.date] = None,
+                   first_name: Optional[str] = None,
+                   last_name: Optional[str] = None) -> str:
+
+    """
+    Makes key of user's score in cache
+    :param phone: phone number
+    :param birthday: birthday date
+    :param first_name: first name
+    :param last_name: last name
+    :return: cache key
+    """
+
+    key_parts = [
+        first_name or "",
+        last_name or "",
+        str(phone) or "",
+        birthday if birthday is not None else "",
+    ]
+
+    return "uid:" + hashlib.md5("".join(key_parts).encode("utf-8")).hexdigest()
+
+
+def calculate_score(phone: Optional[Union[str, int]],
+                    email: Optional[str],
+                    birthday: Optional[datetime.date] = None,
+                    gender: Optional[int] = None,
+                    first_name: Optional[str] = None,
+                    last_name: Optional[str] = None) -> Union[int, float]:
+
+    """
+    Calculates score based on user's information without cache
+    :return: score
+    """
+
+    score = 0
+    if phone:
+        score += 1.5
+    if email:
+        score += 1.5
+    if birthday and gender:
+        score += 1.5
+    if first_name and last_name:
+        score += 0.5
+
+    return score
+
+
 def get_score(store: KeyValueStorage,
               phone: Optional[Union[str, int]],
               email: Optional[str],
@@ -26,29 +79,58 @@ def get_score(store: KeyValueStorage,
     :return: score
     """
 
-    key_parts = [
-        first_name or "",
-        last_name or "",
-        str(phone) or "",
-        birthday if birthday is not None else "",
-    ]
-
-    key = "uid:" + hashlib.md5("".join(key_parts).encode("utf-8")).hexdigest()
+    key = make_score_key(phone=phone, birthday=birthday, first_name=first_name, last_name=last_name)
     # try get from cache,
     # fallback to heavy calculation in case of cache miss
     score = store.cache_get(key) or 0
     if score:
         return score
-    if phone:
-        score += 1.5
-    if email:
-        score += 1.5
-    if birthday and gender:
-        score += 1.5
-    if first_name and last_name:
-        score += 0.5
-    # cache for 60 minutes
-    store.cache_set(key, score, key_expire_time_sec=60 * 60)
+    score = calculate_score(
+        phone=phone,
+        email=email,
+        birthday=birthday,
+        gender=gender,
+        first_name=first_name,
+        last_name=last_name
+    )
+    store.cache_set(key, score, key_expire_time_sec=SCORE_EXPIRE_TIME_SEC)
+
+    return score
+
+
+async def get_score_async(store: AsyncKeyValueStorage,
+                          phone: Optional[Union[str, int]],
+                          email: Optional[str],
+                          birthday: Optional[datetime.date] = None,
+                          gender: Optional[int] = None,
+                          first_name: Optional[str] = None,
+                          last_name: Optional[str] = None) -> Union[int, float]:
+
+    """
+    Returns score based on user's information, cache is accessed without blocking of event loop
+    :param store: asynchronous key-value cache
+    :param phone: phone number
+    :param email: email address
+    :param birthday: birthday date
+    :param gender: gender
+    :param first_name: first name
+    :param last_name: last name
+    :return: score
+    """
+
+    key = make_score_key(phone=phone, birthday=birthday, first_name=first_name, last_name=last_name)
+    score = await store.cache_get(key) or 0
+    if score:
+        return score
+    score = calculate_score(
+        phone=phone,
+        email=email,
+        birthday=birthday,
+        gender=gender,
+        first_name=first_name,
+        last_name=last_name
+    )
+    await store.cache_set(key, score, key_expire_time_sec=SCORE_EXPIRE_TIME_SEC)
 
     return score
 
@@ -64,3 +146,42 @@ def get_interests(store: KeyValueStorage, client_id: int) -> List[str]:
 
     r = store.get("i:%s" % client_id)
     return json.loads(r) if r else []
+
+
+def get_many_interests(store: KeyValueStorage, client_ids: List[int]) -> List[List[str]]:
+
+    """
+    Gets interests of several clients in single round trip to storage
+    :param store: key-value storage
+    :param client_ids: ids of clients
+    :return: lists of interests in order of client ids
+    """
+
+    results = store.get_many(["i:%s" % client_id for client_id in client_ids])
+    return [json.loads(r) if r else [] for r in results]
+
+
+async def get_interests_async(store: AsyncKeyValueStorage, client_id: int) -> List[str]:
+
+    """
+    Gets client's interests by id without blocking of event loop
+    :param store: asynchronous key-value storage
+    :param client_id: id of client
+    :return: list of clients interests
+    """
+
+    r = await store.get("i:%s" % client_id)
+    return json.loads(r) if r else []
+
+
+async def get_many_interests_async(store: AsyncKeyValueStorage, client_ids: List[int]) -> List[List[str]]:
+
+    """
+    Gets interests of several clients in single round trip to storage without blocking of event loop
+    :param store: asynchronous key-value storage
+    :param client_ids: ids of clients
+    :return: lists of interests in order of client ids
+    """
+
+    results = await store.get_many(["i:%s" % client_id for client_id in client_ids])
+    return [json.loads(r) if r else [] for r in results]
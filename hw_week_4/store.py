@@ -1,64 +1,212 @@
 import logging
-from typing import Callable, NoReturn, Optional, Union
+import random
+import threading
+import time
+from queue import Empty, LifoQueue
+from typing import Callable, List, NoReturn, Optional, Tuple, Union
 from functools import wraps
 from redis.client import Redis
-from redis.exceptions import ConnectionError, TimeoutError
+from redis.connection import BlockingConnectionPool
+from redis.exceptions import ConnectionError, RedisError, TimeoutError
+
+MGET_BATCH_SIZE = 1000
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_RETRY_BACKOFF_SEC = 0.05
+DEFAULT_MAX_RETRY_BACKOFF_SEC = 1.0
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+DEFAULT_CIRCUIT_RESET_TIMEOUT_SEC = 10.0
+
+
+class CircuitOpenError(ConnectionError):
+    pass
+
+
+class PoolExhaustedError(ConnectionError):
+    pass
+
+
+class ConnectionsQueue(LifoQueue):
+
+    """
+    Queue of connections of blocking pool. When no connection gets free within timeout
+    PoolExhaustedError is raised, so that waiting for connections busy with other commands
+    is not taken for failure of redis server
+    """
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        try:
+            return super().get(block=block, timeout=timeout)
+        except Empty:
+            raise PoolExhaustedError("No connection available.")
+
+
+class CircuitBreaker:
+
+    """
+    Stops calls to storage after several consecutive failures.
+    While circuit is open calls fail at once without waiting for timeouts,
+    after reset timeout single trial call is let through and its result closes or reopens circuit.
+    Trial call ended without result (e.g. cancelled) should be released, so that next call is tried
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout_sec: float):
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def check(self) -> bool:
+
+        """
+        Checks if call is allowed
+        :return: True if call is trial one and should be released after it ends
+        :raise CircuitOpenError: if circuit is open and it is not the time for trial call
+        """
+
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._trial_in_progress or time.monotonic() - self._opened_at < self.reset_timeout_sec:
+                raise CircuitOpenError("Circuit is open after %d consecutive failures" % self.consecutive_failures)
+            self._trial_in_progress = True
+            return True
+
+    def release_trial(self) -> NoReturn:
+
+        """
+        Lets next trial call through, circuit stays open if result of trial call was not recorded
+        """
+
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_success(self) -> NoReturn:
+
+        with self._lock:
+            self.consecutive_failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self) -> NoReturn:
+
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._trial_in_progress or self.consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logging.error("Circuit is opened after %d consecutive failures", self.consecutive_failures)
+                self._opened_at = time.monotonic()
+                self._trial_in_progress = False
+
+
+def get_retry_delay(attempt: int, backoff_sec: float, max_backoff_sec: float) -> float:
+
+    """
+    Calculates delay before retry: exponential backoff with full jitter,
+    so that clients failed at once do not retry at once
+    :param attempt: number of failed attempt starting from zero
+    :param backoff_sec: delay limit after first failed attempt
+    :param max_backoff_sec: maximal delay limit
+    :return: delay in seconds
+    """
+
+    return random.uniform(0, min(max_backoff_sec, backoff_sec * 2 ** attempt))
 
 
 def make_retries(method: Callable) -> Callable:
 
     """
     Decorator for making auto retries
-    for methods of key-value storage
+    for methods of key-value storage.
+    Every call is retried up to retries_limit times with exponential backoff and jitter
+    until circuit breaker of storage is opened.
+    Other errors of redis are not retried, but server answered them, so they close circuit.
+    Exhausted pool of connections is neither retried nor counted as failure of storage
     """
 
     @wraps(method)
     def wrapper(self, *method_args, **method_kwargs):
-        result = None
-        try:
-            result = method(self, *method_args, **method_kwargs)
-        except (ConnectionError, TimeoutError) as exception:
+        for attempt in range(self.retries_limit + 1):
+            is_trial = self.circuit_breaker.check()
+            try:
+                result = method(self, *method_args, **method_kwargs)
+            except PoolExhaustedError:
+                raise
+            except (ConnectionError, TimeoutError):
+                self.circuit_breaker.record_failure()
+                if attempt == self.retries_limit or self.circuit_breaker.is_open:
+                    raise
+            except RedisError:
+                self.circuit_breaker.record_success()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return result
+            finally:
+                if is_trial:
+                    self.circuit_breaker.release_trial()
             logging.error("Something went wrong. Retrying...")
-            if wrapper.calls >= self.retries_limit:
-                raise exception
-            wrapper.calls += 1
-            self._reset_connection()
-            wrapper(self, *method_args, **method_kwargs)
-        return result
-
-    wrapper.calls = 0
+            time.sleep(get_retry_delay(attempt, self.retry_backoff_sec, self.max_retry_backoff_sec))
+
     return wrapper
 
 
 class KeyValueStorage:
 
     """
-    Key value storage with redis server
+    Key value storage with redis server.
+    Commands are sent over pool of at most max_connections connections,
+    when all connections are busy command waits for free connection up to timeout
+    and fails with PoolExhaustedError
     """
 
-    def __init__(self, host: str, port: int, retries_limit: int, timeout: int):
+    def __init__(self,
+                 host: str,
+                 port: int,
+                 retries_limit: int,
+                 timeout: int,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 retry_backoff_sec: float = DEFAULT_RETRY_BACKOFF_SEC,
+                 max_retry_backoff_sec: float = DEFAULT_MAX_RETRY_BACKOFF_SEC,
+                 circuit_failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+                 circuit_reset_timeout_sec: float = DEFAULT_CIRCUIT_RESET_TIMEOUT_SEC):
 
         self.host = host
         self.port = port
         self.timeout = timeout
         self.retries_limit = retries_limit
+        self.max_connections = max_connections
+        self.retry_backoff_sec = retry_backoff_sec
+        self.max_retry_backoff_sec = max_retry_backoff_sec
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=circuit_failure_threshold,
+            reset_timeout_sec=circuit_reset_timeout_sec
+        )
         self._kv_storage = None
         self._connect()
 
     def _connect(self) -> NoReturn:
 
         """
-        Connection to redis server with retries
-        :param retry_counter: counter of times of retrying
-        :return: Redis connection if it was successful and None otherwise
+        Creates pool of connections to redis server and checks that server is available
         """
 
+        self._kv_storage = Redis(connection_pool=BlockingConnectionPool(
+            host=self.host,
+            port=self.port,
+            socket_timeout=self.timeout,
+            socket_connect_timeout=self.timeout,
+            max_connections=self.max_connections,
+            timeout=self.timeout,
+            queue_class=ConnectionsQueue
+        ))
         try:
-            self._kv_storage = Redis(
-                host=self.host,
-                port=self.port,
-                socket_timeout=self.timeout
-            )
             self._kv_storage.ping()
         except Exception:
             logging.error(
@@ -67,16 +215,6 @@ class KeyValueStorage:
                 self.port
             )
 
-    def _reset_connection(self) -> NoReturn:
-
-        """
-        Resets connection to redis server
-        :return:
-        """
-
-        self._kv_storage.close()
-        self._connect()
-
     @make_retries
     def get(self, key: str) -> str:
 
@@ -90,6 +228,48 @@ class KeyValueStorage:
 
         return result.decode("utf-8") if result is not None else result
 
+    @make_retries
+    def get_with_ttl(self, key: str) -> Tuple[Optional[str], Optional[int]]:
+
+        """
+        Gets value by key and time in which it will be expired in single round trip
+        :param key: key to get value for
+        :return: value for specified key and its time to live in seconds, None if key has no expiry
+        """
+
+        pipeline = self._kv_storage.pipeline(transaction=False)
+        pipeline.get(key)
+        pipeline.ttl(key)
+        result, ttl_sec = pipeline.execute()
+
+        return (
+            result.decode("utf-8") if result is not None else result,
+            ttl_sec if ttl_sec is not None and ttl_sec >= 0 else None
+        )
+
+    @make_retries
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+
+        """
+        Gets values of several keys in single round trip to storage.
+        Keys are requested by MGET commands of at most MGET_BATCH_SIZE keys sent in one pipeline
+        :param keys: keys to get values for
+        :return: values in order of keys, None for missing keys
+        """
+
+        if not keys:
+            return []
+
+        pipeline = self._kv_storage.pipeline(transaction=False)
+        for batch_start in range(0, len(keys), MGET_BATCH_SIZE):
+            pipeline.mget(keys[batch_start:batch_start + MGET_BATCH_SIZE])
+
+        return [
+            result.decode("utf-8") if result is not None else result
+            for batch_results in pipeline.execute()
+            for result in batch_results
+        ]
+
     def cache_get(self, key: str) -> Optional[float]:
 
         """
@@ -123,6 +303,19 @@ class KeyValueStorage:
 
         self._kv_storage.set(key, str(value), ex=key_expire_time_sec)
 
+    @make_retries
+    def cache_set_many(self, items: List[Tuple[str, Union[float, int], int]]) -> NoReturn:
+
+        """
+        Sets several values into cache in single round trip
+        :param items: keys, values and times in which keys will be expired
+        """
+
+        pipeline = self._kv_storage.pipeline(transaction=False)
+        for key, value, key_expire_time_sec in items:
+            pipeline.set(key, str(value), ex=key_expire_time_sec)
+        pipeline.execute()
+
     def cache_set(self, key: str,
                   value: Union[float, int],
                   key_expire_time_sec: int) -> NoReturn:
@@ -144,3 +337,6 @@ class KeyValueStorage:
 
     def clear(self) -> NoReturn:
         self._kv_storage.flushall()
+
+    def close(self) -> NoReturn:
+        self._kv_storage.connection_pool.disconnect()
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+from tests.redis_server import StandInRedisServer
+
+
+@pytest.fixture(scope="session")
+def redis_address():
+
+    """
+    Address of redis from REDIS_HOST and REDIS_PORT environment variables
+    or of stand-in redis server if they are not set
+    """
+
+    if "REDIS_HOST" in os.environ:
+        yield os.environ["REDIS_HOST"], int(os.environ.get("REDIS_PORT", 6379))
+        return
+
+    server = StandInRedisServer()
+    server.start()
+    yield server.server_address
+    server.stop()
@@ -1,26 +1,33 @@
 import random
 
 import pytest
+from async_store import AsyncKeyValueStorage
 from redis.exceptions import ConnectionError
-from store import KeyValueStorage
+import store
+from store import MGET_BATCH_SIZE, CircuitOpenError, KeyValueStorage
+from tests.test_storage import SyncStorage
 
 
 TEST_RETRIES_LIMIT = 3
 TEST_TIMEOUT = 3
 
 
-@pytest.fixture()
-def working_store(request):
+@pytest.fixture(params=[KeyValueStorage, AsyncKeyValueStorage], ids=["sync", "async"])
+def working_store(request, redis_address):
 
-    store = KeyValueStorage(
-        host="localhost",
-        port=6379,
+    host, port = redis_address
+    store = request.param(
+        host=host,
+        port=port,
         retries_limit=TEST_RETRIES_LIMIT,
         timeout=TEST_TIMEOUT
     )
+    if request.param is AsyncKeyValueStorage:
+        store = SyncStorage(store)
 
     def clear_store():
         store.clear()
+        store.close()
 
     request.addfinalizer(clear_store)
 
@@ -33,11 +40,39 @@ def not_working_store():
         host="non_existent_host",
         port=404,
         retries_limit=TEST_RETRIES_LIMIT,
-        timeout=TEST_TIMEOUT
+        timeout=TEST_TIMEOUT,
+        circuit_failure_threshold=100
     )
     return not_working_store
 
 
+@pytest.fixture()
+def retry_delays(monkeypatch):
+
+    """
+    Records delays before retries instead of sleeping
+    """
+
+    delays = list()
+    monkeypatch.setattr(store.time, "sleep", delays.append)
+
+    return delays
+
+
+@pytest.fixture()
+def not_working_async_store(request):
+
+    not_working_store = SyncStorage(AsyncKeyValueStorage(
+        host="non_existent_host",
+        port=404,
+        retries_limit=TEST_RETRIES_LIMIT,
+        timeout=TEST_TIMEOUT
+    ))
+    request.addfinalizer(not_working_store.close)
+
+    return not_working_store
+
+
 def test_get_key_from_cache(working_store):
 
     """
@@ -70,17 +105,92 @@ def test_get_non_existent_key_from_storage(working_store):
     assert working_store.get("non_existent_key") is None
 
 
-def test_get_key_from_closed_cache(not_working_store):
+def test_get_many_keys_from_storage(working_store):
+
+    """
+    Tests that values of several keys are got in order of keys
+    and keys beyond single MGET batch are not lost
+    """
+
+    keys = [f"test_key_{key_num}" for key_num in range(MGET_BATCH_SIZE + 10)]
+    for key_num, key in enumerate(keys[::2]):
+        working_store.cache_set(key, key_num, key_expire_time_sec=60*60)
+
+    values = working_store.get_many(keys + ["non_existent_key"])
+
+    assert values[:-1:2] == [str(key_num) for key_num in range(len(keys[::2]))]
+    assert values[1::2] == [None] * len(keys[1::2])
+    assert working_store.get_many([]) == []
+
+
+def test_get_key_with_ttl_from_storage(redis_address):
 
     """
-    Tests getting key from closed or dead cache
+    Tests that value and its time to live are got from redis
+    """
+
+    host, port = redis_address
+    working_store = KeyValueStorage(host=host, port=port, retries_limit=TEST_RETRIES_LIMIT, timeout=TEST_TIMEOUT)
+    working_store.cache_set("test_key", 5, key_expire_time_sec=60)
+
+    value, ttl_sec = working_store.get_with_ttl("test_key")
+
+    assert value == "5"
+    assert 0 < ttl_sec <= 60
+    assert working_store.get_with_ttl("non_existent_key") == (None, None)
+    working_store.clear()
+
+
+def test_set_many_keys_to_cache(redis_address):
+
+    """
+    Tests that several values are set to cache in single round trip
+    """
+
+    host, port = redis_address
+    working_store = KeyValueStorage(host=host, port=port, retries_limit=TEST_RETRIES_LIMIT, timeout=TEST_TIMEOUT)
+    working_store.cache_set_many([("test_key_1", 1, 60), ("test_key_2", 2.5, 60)])
+
+    assert working_store.cache_get("test_key_1") == 1
+    assert working_store.cache_get("test_key_2") == 2.5
+    assert 0 < working_store.get_with_ttl("test_key_2")[1] <= 60
+    working_store.clear()
+
+
+def test_get_key_from_closed_cache(not_working_store, retry_delays):
+
+    """
+    Tests getting key from closed or dead cache, every call is retried retries limit times
     """
 
     test_key = "test_key_for_not_working_cache"
     not_working_store.cache_set(test_key, 404, key_expire_time_sec=60*60)
 
     assert not_working_store.cache_get(test_key) is None
-    assert not_working_store.get.calls == not_working_store.retries_limit
+    assert len(retry_delays) == 2 * not_working_store.retries_limit
+
+
+def test_dead_cache_is_skipped_by_circuit_breaker(retry_delays):
+
+    """
+    Tests that calls to dead cache fail at once after circuit breaker is opened
+    """
+
+    not_working_store = KeyValueStorage(
+        host="non_existent_host",
+        port=404,
+        retries_limit=TEST_RETRIES_LIMIT,
+        timeout=TEST_TIMEOUT,
+        circuit_failure_threshold=2
+    )
+
+    with pytest.raises(ConnectionError):
+        not_working_store.get("test_key")
+    with pytest.raises(CircuitOpenError):
+        not_working_store.get("test_key")
+    assert not_working_store.cache_get("test_key") is None
+    assert len(retry_delays) == 1
+    assert not_working_store.circuit_breaker.consecutive_failures == 2
 
 
 def test_get_key_from_closed_storage(not_working_store):
@@ -91,3 +201,17 @@ def test_get_key_from_closed_storage(not_working_store):
 
     with pytest.raises(ConnectionError):
         assert not_working_store.get("non_existent_key")
+
+
+def test_get_key_from_closed_async_storage(not_working_async_store):
+
+    """
+    Tests that asynchronous storage ignores dead cache and raises connection error of dead storage
+    """
+
+    test_key = "test_key_for_not_working_cache"
+    not_working_async_store.cache_set(test_key, 404, key_expire_time_sec=60*60)
+
+    assert not_working_async_store.cache_get(test_key) is None
+    with pytest.raises(ConnectionError):
+        assert not_working_async_store.get("non_existent_key")
@@ -0,0 +1,233 @@
+import asyncio
+import http.client
+import json
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import api
+import pytest
+from async_api import AsyncAPIServer
+from tests.test_storage import AsyncKeyValueTestStorage, KeyValueTestStorage
+from tests.utils import set_valid_auth
+
+SLOW_STORE_DELAY_SEC = 0.2
+ASYNCIO_SERVER = "asyncio"
+
+
+class SlowKeyValueTestStorage(KeyValueTestStorage):
+
+    """
+    Test key value storage answering with delay like remote storage
+    """
+
+    def cache_get(self, key):
+        time.sleep(SLOW_STORE_DELAY_SEC)
+        return super().cache_get(key)
+
+
+class SlowAsyncKeyValueTestStorage(AsyncKeyValueTestStorage):
+
+    """
+    Test asynchronous key value storage answering with delay like remote storage
+    """
+
+    async def cache_get(self, key):
+        await asyncio.sleep(SLOW_STORE_DELAY_SEC)
+        return await super().cache_get(key)
+
+
+class ClosableKeyValueTestStorage(KeyValueTestStorage):
+
+    """
+    Test key value storage remembering that it was closed
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.is_closed = False
+
+    def close(self):
+        self.is_closed = True
+
+
+def make_score_request_body(phone: str = "79175002040") -> bytes:
+    request = {
+        "account": "horns&hoofs", "login": "h&f", "method": "online_score",
+        "arguments": {"phone": phone, "email": "stupnikov@otus.ru"}
+    }
+    set_valid_auth(request)
+    return json.dumps(request).encode("utf-8")
+
+
+def post(connection: http.client.HTTPConnection, body: bytes):
+    connection.request("POST", "/method/", body=body, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response, json.loads(response.read())
+
+
+def start_server(request, store):
+
+    handler_class = type("TestHandler", (api.MainHTTPHandler,), {
+        "store": store,
+        "log_message": lambda self, format, *args: None
+    })
+    server = api.make_server(("localhost", 0), workers=request.param, handler_class=handler_class)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    def stop_server():
+        server.shutdown()
+        server.server_close()
+        server_thread.join()
+
+    request.addfinalizer(stop_server)
+
+    return server
+
+
+def start_async_server(request, store):
+
+    """
+    Starts asyncio server in event loop of separate thread
+    """
+
+    server = AsyncAPIServer(store=store)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start("localhost", 0))
+    server_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    server_thread.start()
+
+    def stop_server():
+        loop.call_soon_threadsafe(loop.stop)
+        server_thread.join()
+        loop.run_until_complete(server.close())
+        loop.close()
+
+    request.addfinalizer(stop_server)
+
+    return server
+
+
+SERVER_PARAMS = {"params": [1, 4, ASYNCIO_SERVER], "ids": ["serial", "thread_pool", "asyncio"]}
+
+
+@pytest.fixture()
+def storage():
+    return KeyValueTestStorage()
+
+
+@pytest.fixture(**SERVER_PARAMS)
+def running_server(request, storage):
+    if request.param == ASYNCIO_SERVER:
+        return start_async_server(request, store=AsyncKeyValueTestStorage(storage))
+    return start_server(request, store=storage)
+
+
+@pytest.fixture(**SERVER_PARAMS)
+def running_server_with_slow_store(request):
+    if request.param == ASYNCIO_SERVER:
+        return start_async_server(request, store=SlowAsyncKeyValueTestStorage(KeyValueTestStorage()))
+    return start_server(request, store=SlowKeyValueTestStorage())
+
+
+def test_score_request(running_server):
+
+    connection = http.client.HTTPConnection(*running_server.server_address, timeout=5)
+    response, response_body = post(connection, make_score_request_body())
+    connection.close()
+
+    assert response.status == api.OK
+    assert response_body == {"response": {"score": 3.0}, "code": api.OK}
+    assert int(response.getheader("Content-Length")) == len(json.dumps(response_body))
+
+
+def test_interests_request(running_server, storage):
+
+    storage.set("i:1", ["cars", "pets"])
+    storage.set("i:3", ["books"])
+    request = {
+        "account": "horns&hoofs", "login": "h&f", "method": "clients_interests",
+        "arguments": {"client_ids": [1, 2, 3]}
+    }
+    set_valid_auth(request)
+
+    connection = http.client.HTTPConnection(*running_server.server_address, timeout=5)
+    response, response_body = post(connection, json.dumps(request).encode("utf-8"))
+    connection.close()
+
+    assert response.status == api.OK
+    assert response_body["response"] == {"1": ["cars", "pets"], "2": [], "3": ["books"]}
+
+
+def test_bad_request(running_server):
+
+    connection = http.client.HTTPConnection(*running_server.server_address, timeout=5)
+    response, response_body = post(connection, b"not json")
+    connection.close()
+
+    assert response.status == api.BAD_REQUEST
+    assert response_body["code"] == api.BAD_REQUEST
+
+
+def test_connection_is_kept_alive_only_by_concurrent_servers(running_server):
+
+    """
+    Tests that several requests are sent over the same connection to thread pool and asyncio servers
+    and serial server closes connection after response
+    """
+
+    connection = http.client.HTTPConnection(*running_server.server_address, timeout=5)
+    post(connection, make_score_request_body())
+    first_socket = connection.sock
+    response, _ = post(connection, make_score_request_body(phone="79175002041"))
+    connection.close()
+
+    assert response.status == api.OK
+    assert (first_socket is not None) == running_server.keep_alive
+
+
+def test_requests_are_handled_concurrently(running_server_with_slow_store):
+
+    """
+    Tests that slow storage calls of concurrent requests overlap in thread pool and asyncio servers
+    """
+
+    running_server = running_server_with_slow_store
+    num_requests = 4
+
+    def send_request(request_num):
+        connection = http.client.HTTPConnection(*running_server.server_address, timeout=5)
+        response, _ = post(connection, make_score_request_body(phone=f"7917500204{request_num}"))
+        connection.close()
+        return response.status
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_requests) as executor:
+        statuses = list(executor.map(send_request, range(num_requests)))
+    elapsed = time.perf_counter() - started_at
+
+    assert statuses == [api.OK] * num_requests
+    if running_server.keep_alive:
+        assert elapsed < num_requests * SLOW_STORE_DELAY_SEC
+    else:
+        assert elapsed >= num_requests * SLOW_STORE_DELAY_SEC
+
+
+@pytest.mark.parametrize("workers", [1, 2], ids=["serial", "thread_pool"])
+def test_store_is_closed_on_sigterm(workers):
+
+    """
+    Tests that server stops on SIGTERM and closes storage, so that queued writes are not lost
+    """
+
+    store = ClosableKeyValueTestStorage()
+    server = api.make_server(("localhost", 0), workers=workers)
+    threading.Timer(0.1, os.kill, args=(os.getpid(), signal.SIGTERM)).start()
+
+    api.serve_until_terminated(server=server, store=store)
+
+    assert store.is_closed
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
@@ -0,0 +1,95 @@
+import socketserver
+import threading
+import time
+from typing import Dict, List, NoReturn, Optional, Tuple
+
+
+class StandInRedisHandler(socketserver.StreamRequestHandler):
+
+    """
+    Handler of connection to stand-in redis server.
+    Understands commands of redis serialization protocol used by storages
+    """
+
+    # replies to pipelined commands are written one by one, without nagle they do not wait for delayed ack
+    disable_nagle_algorithm = True
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        num_args = int(line[1:-2])
+        args = list()
+        for _ in range(num_args):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    @staticmethod
+    def _encode_bulk(value: Optional[bytes]) -> bytes:
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _execute(self, args: List[bytes]) -> bytes:
+
+        command = args[0].upper()
+        with self.server.lock:
+            if command == b"PING":
+                return b"+PONG\r\n"
+            if command == b"GET":
+                return self._encode_bulk(self.server.get_value(args[1]))
+            if command == b"TTL":
+                if self.server.get_value(args[1]) is None:
+                    return b":-2\r\n"
+                expire_at = self.server.data[args[1]][1]
+                return b":-1\r\n" if expire_at is None else b":%d\r\n" % round(expire_at - time.monotonic())
+            if command == b"MGET":
+                values = [self._encode_bulk(self.server.get_value(key)) for key in args[1:]]
+                return b"*%d\r\n" % len(values) + b"".join(values)
+            if command == b"SET":
+                expire_at = None
+                if len(args) == 5 and args[3].upper() == b"EX":
+                    expire_at = time.monotonic() + int(args[4])
+                self.server.data[args[1]] = (args[2], expire_at)
+                return b"+OK\r\n"
+            if command == b"FLUSHALL":
+                self.server.data.clear()
+                return b"+OK\r\n"
+
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                break
+            self.wfile.write(self._execute(args))
+
+
+class StandInRedisServer(socketserver.ThreadingTCPServer):
+
+    """
+    In-memory server speaking redis protocol, so that storages are tested without real redis
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address: Tuple[str, int] = ("localhost", 0)):
+
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = dict()
+        self.lock = threading.Lock()
+        super().__init__(server_address, StandInRedisHandler)
+
+    def get_value(self, key: bytes) -> Optional[bytes]:
+        value, expire_at = self.data.get(key, (None, None))
+        if expire_at is not None and expire_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def start(self) -> NoReturn:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self) -> NoReturn:
+        self.shutdown()
+        self.server_close()
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import List, NoReturn, Optional, Union
 
@@ -16,6 +17,9 @@ class KeyValueTestStorage:
 
         return self._kv_store[key]
 
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return [self._kv_store.get(key) for key in keys]
+
     def set(self, key: str, value: List[str]):
         self._kv_store[key] = json.dumps(value)
 
@@ -30,3 +34,60 @@ class KeyValueTestStorage:
 
     def clear(self) -> NoReturn:
         self._kv_store.clear()
+
+
+class AsyncKeyValueTestStorage:
+
+    """
+    Test key value storage with interface of asynchronous storage
+    """
+
+    def __init__(self, storage: KeyValueTestStorage):
+
+        self.storage = storage
+
+    async def get(self, key: str) -> str:
+        return self.storage.get(key)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return self.storage.get_many(keys)
+
+    async def cache_get(self, key: str) -> Optional[Union[int, float]]:
+        return self.storage.cache_get(key)
+
+    async def cache_set(self,
+                        key: str,
+                        value: Union[int, float],
+                        key_expire_time_sec: int) -> NoReturn:
+        self.storage.cache_set(key, value, key_expire_time_sec)
+
+    async def clear(self) -> NoReturn:
+        self.storage.clear()
+
+    async def close(self) -> NoReturn:
+        pass
+
+
+class SyncStorage:
+
+    """
+    Calls methods of asynchronous storage synchronously in its own event loop
+    """
+
+    def __init__(self, async_storage):
+
+        self.async_storage = async_storage
+        self._loop = asyncio.new_event_loop()
+
+    def __getattr__(self, name):
+
+        method = getattr(self.async_storage, name)
+
+        def call(*args, **kwargs):
+            return self._loop.run_until_complete(method(*args, **kwargs))
+
+        return call
+
+    def close(self):
+        self._loop.run_until_complete(self.async_storage.close())
+        self._loop.close()
@@ -0,0 +1,68 @@
+import datetime
+import time
+
+import api
+import pytest
+from dateutil.relativedelta import relativedelta
+from api import ClientsInterestsRequest, OnlineScoreRequest, TodayBounds, parse_date
+
+
+@pytest.mark.parametrize("value", ["01.01.2000", "1.2.2000", "29.02.2000", "31.12.1999"])
+def test_date_is_parsed_like_strptime(value):
+
+    assert parse_date(value) == datetime.datetime.strptime(value, api.DATE_FORMAT).date()
+
+
+@pytest.mark.parametrize("value", ["2000.01.01", "01.13.2000", "29.02.2001", "01.01.2000x", "01.01.20", ""])
+def test_invalid_date_is_not_parsed(value):
+
+    with pytest.raises(ValueError):
+        datetime.datetime.strptime(value, api.DATE_FORMAT)
+    with pytest.raises(ValueError):
+        parse_date(value)
+
+
+def test_today_bounds_are_calculated_once_per_day(monkeypatch):
+
+    today_bounds = TodayBounds(max_years_ago=70)
+    today, date_70_years_ago = today_bounds.get()
+
+    assert today == datetime.date.today()
+    assert date_70_years_ago == today + relativedelta(years=-70)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 24 * 60 * 60)
+    monkeypatch.setattr(api.datetime, "date", type("Tomorrow", (datetime.date,), {
+        "today": classmethod(lambda cls: datetime.date.fromtimestamp(now + 24 * 60 * 60))
+    }))
+
+    assert today_bounds.get()[0] == today + datetime.timedelta(days=1)
+
+
+@pytest.mark.parametrize("request_class,request_body", [
+    (OnlineScoreRequest, {"phone": 7917500204, "email": "otus.ru", "birthday": "01.01.1890", "gender": 3}),
+    (OnlineScoreRequest, {"phone": "79175002040", "email": "a@otus.ru", "birthday": "01.01.2000", "gender": 1}),
+    (OnlineScoreRequest, {"first_name": 1, "last_name": "", "birthday": "XXX"}),
+    (ClientsInterestsRequest, {"client_ids": [], "date": "20.07.2017"}),
+    (ClientsInterestsRequest, {"client_ids": [1, "2"], "date": 20072017}),
+    (ClientsInterestsRequest, {"client_ids": [1, 2]}),
+], ids=["invalid_score", "valid_score", "invalid_names", "empty_ids", "invalid_ids", "valid_ids"])
+def test_compiled_checks_are_the_same_as_field_checks(request_class, request_body):
+
+    """
+    Tests that validation of form gives the same errors and values as setting of fields one by one
+    """
+
+    compiled_request = request_class(request_body=request_body)
+    compiled_errors = compiled_request._validate_form()
+
+    field_request = request_class(request_body=request_body)
+    field_errors = dict()
+    for field_name, _ in request_class.fields:
+        try:
+            setattr(field_request, field_name, request_body.get(field_name))
+        except Exception as exc:
+            field_errors[field_name] = str(exc)
+
+    assert compiled_errors == field_errors
+    assert compiled_request.__dict__ == field_request.__dict__
@@ -0,0 +1,55 @@
+import datetime
+import time
+
+import api
+import pytest
+from tests.utils import set_valid_auth
+
+
+def make_method_request(login: str, token: str = None) -> api.MethodRequest:
+
+    body = {"account": "horns&hoofs", "login": login, "method": "online_score", "arguments": {}}
+    if token is None:
+        set_valid_auth(body)
+    else:
+        body["token"] = token
+    method_request = api.MethodRequest(request_body=body)
+    method_request.is_valid()
+
+    return method_request
+
+
+@pytest.mark.parametrize("login", ["h&f", api.ADMIN_LOGIN], ids=["not_admin", "admin"])
+def test_valid_token_is_accepted(login):
+    assert api.check_auth(make_method_request(login=login))
+
+
+@pytest.mark.parametrize("login", ["h&f", api.ADMIN_LOGIN], ids=["not_admin", "admin"])
+@pytest.mark.parametrize("token", ["", "0" * 128, "токен"], ids=["empty", "wrong", "not_ascii"])
+def test_invalid_token_is_rejected(login, token):
+    assert not api.check_auth(make_method_request(login=login, token=token))
+
+
+def test_account_digest_is_cached():
+
+    api.get_account_digest.cache_clear()
+    for _ in range(3):
+        api.check_auth(make_method_request(login="h&f"))
+
+    cache_info = api.get_account_digest.cache_info()
+    assert (cache_info.hits, cache_info.misses) == (2, 1)
+
+
+def test_admin_digest_is_recalculated_next_hour(monkeypatch):
+
+    admin_digest = api.HourlyAdminDigest()
+    digest = admin_digest.get()
+    assert admin_digest.get() is digest
+
+    next_hour = datetime.datetime.now() + datetime.timedelta(hours=1)
+    monkeypatch.setattr(time, "time", lambda: next_hour.timestamp())
+    monkeypatch.setattr(api.datetime, "datetime", type("NextHour", (datetime.datetime,), {
+        "now": classmethod(lambda cls: next_hour)
+    }))
+
+    assert admin_digest.get() != digest
@@ -0,0 +1,130 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from cache import LocalCache, TieredKeyValueStorage
+from redis.exceptions import ConnectionError
+from tests.test_storage import KeyValueTestStorage
+
+
+class RemoteTestStorage(KeyValueTestStorage):
+
+    """
+    Test storage counting lookups of cache, its values expire like in redis
+    """
+
+    def __init__(self, ttl_sec=None):
+
+        super().__init__()
+        self.ttl_sec = ttl_sec
+        self.lookups = 0
+        self.is_down = False
+
+    def get_with_ttl(self, key):
+        self.lookups += 1
+        if self.is_down:
+            raise ConnectionError("Connection refused")
+        value = self._kv_store.get(key)
+        return (str(value) if value is not None else None), self.ttl_sec
+
+
+@pytest.fixture()
+def remote_storage():
+    return RemoteTestStorage()
+
+
+def test_least_recently_used_key_is_evicted():
+
+    local_cache = LocalCache(max_size=2, ttl_sec=60)
+    local_cache.set("a", 1)
+    local_cache.set("b", 2)
+    local_cache.get("a")
+    local_cache.set("c", 3)
+
+    assert local_cache.get("a") == 1
+    assert local_cache.get("c") == 3
+    assert local_cache.get("b") != 2
+    assert len(local_cache) == 2
+    assert (local_cache.hits, local_cache.misses) == (3, 1)
+
+
+def test_key_is_expired():
+
+    local_cache = LocalCache(max_size=2, ttl_sec=60)
+    local_cache.set("a", 1, ttl_sec=0.05)
+    local_cache.set("b", 2)
+    time.sleep(0.06)
+
+    assert local_cache.get("a") != 1
+    assert local_cache.get("b") == 2
+
+
+def test_remote_hit_is_cached_locally(remote_storage):
+
+    store = TieredKeyValueStorage(store=remote_storage)
+    remote_storage.cache_set("key", 3.0, key_expire_time_sec=60 * 60)
+
+    assert [store.cache_get("key") for _ in range(3)] == [3.0] * 3
+    assert remote_storage.lookups == 1
+    assert store.stats() == {"local_hits": 2, "negative_hits": 0, "remote_hits": 1, "misses": 0}
+
+
+def test_local_value_does_not_outlive_remote_value():
+
+    remote_storage = RemoteTestStorage(ttl_sec=0.05)
+    store = TieredKeyValueStorage(store=remote_storage)
+    remote_storage.cache_set("key", 3.0, key_expire_time_sec=60 * 60)
+
+    store.cache_get("key")
+    time.sleep(0.06)
+    store.cache_get("key")
+
+    assert remote_storage.lookups == 2
+
+
+def test_set_value_is_cached_locally(remote_storage):
+
+    store = TieredKeyValueStorage(store=remote_storage)
+    store.cache_set("key", 3, key_expire_time_sec=60 * 60)
+
+    assert store.cache_get("key") == 3.0
+    assert remote_storage.cache_get("key") == 3
+    assert remote_storage.lookups == 0
+
+
+@pytest.mark.parametrize("negative_ttl_sec,expected_lookups", [(None, 3), (60, 1)], ids=["disabled", "enabled"])
+def test_negative_cache_of_remote_errors(remote_storage, negative_ttl_sec, expected_lookups):
+
+    store = TieredKeyValueStorage(store=remote_storage, negative_ttl_sec=negative_ttl_sec)
+    remote_storage.is_down = True
+
+    assert [store.cache_get("key") for _ in range(3)] == [None] * 3
+    assert remote_storage.lookups == expected_lookups
+
+
+def test_hits_are_counted_in_concurrent_lookups(remote_storage):
+
+    """
+    Tests that counters of tiered cache do not lose increments when lookups are done by several threads
+    """
+
+    store = TieredKeyValueStorage(store=remote_storage, negative_ttl_sec=60)
+    remote_storage.is_down = True
+    store.cache_get("key")
+    num_threads, num_lookups = 8, 2000
+
+    def look_up():
+        for _ in range(num_lookups):
+            store.cache_get("key")
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            for _ in range(num_threads):
+                executor.submit(look_up)
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert store.stats()["negative_hits"] == num_threads * num_lookups
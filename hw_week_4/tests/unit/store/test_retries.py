@@ -0,0 +1,237 @@
+import asyncio
+import time
+
+import pytest
+from async_store import AsyncKeyValueStorage
+from redis.exceptions import ConnectionError, ResponseError
+from store import CircuitBreaker, CircuitOpenError, KeyValueStorage, PoolExhaustedError, get_retry_delay
+
+
+class FlakyRedis:
+
+    """
+    Redis client failing first calls of get
+    """
+
+    def __init__(self, num_failures: int):
+
+        self.num_failures = num_failures
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        if self.calls <= self.num_failures:
+            raise ConnectionError("Connection refused")
+        return b"42"
+
+
+class FailingRedis:
+
+    """
+    Redis client failing every call of get with specified error
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+    def get(self, key):
+        raise self.error
+
+
+@pytest.fixture()
+def flaky_store(monkeypatch):
+
+    monkeypatch.setattr(time, "sleep", lambda delay: None)
+    flaky_store = KeyValueStorage(host="non_existent_host", port=404, retries_limit=3, timeout=1)
+    flaky_store._kv_storage = FlakyRedis(num_failures=2)
+
+    return flaky_store
+
+
+def test_retried_call_returns_result(flaky_store):
+
+    """
+    Tests that result of successful retry is returned
+    """
+
+    assert flaky_store.get("key") == "42"
+    assert flaky_store._kv_storage.calls == 3
+    assert not flaky_store.circuit_breaker.is_open
+
+
+def test_retries_are_counted_per_call(flaky_store):
+
+    """
+    Tests that retries of previous calls do not reduce retries of next call
+    """
+
+    for _ in range(3):
+        flaky_store._kv_storage.calls = 0
+        assert flaky_store.get("key") == "42"
+
+
+@pytest.mark.parametrize("attempt", [0, 1, 2, 10])
+def test_retry_delay_is_bounded(attempt):
+
+    backoff_sec, max_backoff_sec = 0.05, 1.0
+    delays = [get_retry_delay(attempt, backoff_sec, max_backoff_sec) for _ in range(100)]
+
+    assert all(0 <= delay <= min(max_backoff_sec, backoff_sec * 2 ** attempt) for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_circuit_breaker_lets_single_trial_call_after_reset_timeout():
+
+    circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout_sec=0.05)
+    circuit_breaker.record_failure()
+    circuit_breaker.check()
+    circuit_breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.check()
+
+    time.sleep(0.06)
+    circuit_breaker.check()
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.check()
+
+    circuit_breaker.record_success()
+    circuit_breaker.check()
+    assert not circuit_breaker.is_open
+
+
+def test_failed_trial_call_reopens_circuit():
+
+    circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout_sec=0.05)
+    circuit_breaker.record_failure()
+    time.sleep(0.06)
+    circuit_breaker.check()
+    circuit_breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.check()
+
+
+@pytest.mark.parametrize("error,is_open", [
+    (ResponseError("OOM command not allowed when used memory > 'maxmemory'"), False),
+    (ValueError("Unexpected error"), True),
+    (KeyboardInterrupt(), True)
+], ids=["response_error", "unexpected_error", "interrupted"])
+def test_trial_call_ended_with_other_error_is_released(error, is_open):
+
+    """
+    Tests that trial call failed not with connection error does not leave circuit open forever:
+    error answered by redis closes circuit, after other errors next call is let through as trial
+    """
+
+    store = KeyValueStorage(
+        host="non_existent_host",
+        port=404,
+        retries_limit=0,
+        timeout=1,
+        circuit_failure_threshold=1,
+        circuit_reset_timeout_sec=0.05
+    )
+    store.circuit_breaker.record_failure()
+    time.sleep(0.06)
+
+    store._kv_storage = FailingRedis(error=error)
+    with pytest.raises(type(error)):
+        store.get("key")
+
+    assert store.circuit_breaker.is_open == is_open
+    store._kv_storage = FlakyRedis(num_failures=0)
+    assert store.get("key") == "42"
+    assert not store.circuit_breaker.is_open
+
+
+def test_exhausted_pool_is_not_retried_and_does_not_open_circuit(monkeypatch):
+
+    """
+    Tests that command waiting for connection busy with other command fails at once
+    without retries and without counting failure of storage
+    """
+
+    monkeypatch.setattr(time, "sleep", lambda delay: pytest.fail("Exhausted pool is retried"))
+    store = KeyValueStorage(
+        host="non_existent_host",
+        port=404,
+        retries_limit=3,
+        timeout=0.05,
+        max_connections=1,
+        circuit_failure_threshold=1
+    )
+    store._kv_storage.connection_pool.pool.get()
+
+    with pytest.raises(PoolExhaustedError):
+        store.get("key")
+
+    assert store.circuit_breaker.consecutive_failures == 0
+    assert not store.circuit_breaker.is_open
+
+
+def make_async_store_with_open_circuit() -> AsyncKeyValueStorage:
+
+    """
+    Makes asynchronous storage with circuit which lets trial call through
+    """
+
+    async_store = AsyncKeyValueStorage(
+        host="non_existent_host",
+        port=404,
+        retries_limit=0,
+        timeout=1,
+        circuit_failure_threshold=1,
+        circuit_reset_timeout_sec=0.05
+    )
+    async_store.circuit_breaker.record_failure()
+    time.sleep(0.06)
+
+    return async_store
+
+
+async def reply_42(*commands):
+    return [b"42"]
+
+
+def test_async_trial_call_ended_with_response_error_closes_circuit():
+
+    async_store = make_async_store_with_open_circuit()
+
+    async def reply_error(*commands):
+        raise ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+
+    async_store._execute_once = reply_error
+    with pytest.raises(ResponseError):
+        asyncio.run(async_store.get("key"))
+
+    assert not async_store.circuit_breaker.is_open
+    async_store._execute_once = reply_42
+    assert asyncio.run(async_store.get("key")) == "42"
+
+
+def test_cancelled_async_trial_call_is_released():
+
+    """
+    Tests that trial call cancelled e.g. by disconnect of client does not leave circuit open forever
+    """
+
+    async_store = make_async_store_with_open_circuit()
+
+    async def wait_forever(*commands):
+        await asyncio.Event().wait()
+
+    async def cancel_trial_call():
+        trial_call = asyncio.ensure_future(async_store.get("key"))
+        await asyncio.sleep(0.01)
+        trial_call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial_call
+
+    async_store._execute_once = wait_forever
+    asyncio.run(cancel_trial_call())
+
+    assert async_store.circuit_breaker.is_open
+    async_store._execute_once = reply_42
+    assert asyncio.run(async_store.get("key")) == "42"
+    assert not async_store.circuit_breaker.is_open
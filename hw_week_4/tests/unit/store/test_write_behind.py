@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+from redis.exceptions import ConnectionError
+from tests.test_storage import KeyValueTestStorage
+from write_behind import BLOCK_POLICY, DROP_POLICY, WriteBehindKeyValueStorage
+
+
+class BatchTestStorage(KeyValueTestStorage):
+
+    """
+    Test storage recording batches of cache writes, writes wait until storage is opened
+    """
+
+    def __init__(self):
+
+        super().__init__()
+        self.batches = list()
+        self.is_opened = threading.Event()
+        self.is_opened.set()
+        self.is_down = False
+
+    def cache_set_many(self, items):
+        self.is_opened.wait()
+        if self.is_down:
+            raise ConnectionError("Connection refused")
+        self.batches.append(items)
+        for key, value, key_expire_time_sec in items:
+            self.cache_set(key, value, key_expire_time_sec)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def batch_storage():
+    return BatchTestStorage()
+
+
+def test_queued_values_are_written_by_batches(batch_storage):
+
+    store = WriteBehindKeyValueStorage(store=batch_storage, batch_size=4)
+    batch_storage.is_opened.clear()
+    for value in range(10):
+        store.cache_set(f"key_{value}", value, key_expire_time_sec=60)
+    batch_storage.is_opened.set()
+    store.flush()
+
+    assert [store.cache_get(f"key_{value}") for value in range(10)] == list(range(10))
+    assert all(len(batch) <= 4 for batch in batch_storage.batches)
+    assert len(batch_storage.batches) < 10
+    assert store.num_written == 10
+    store.close()
+
+
+def test_queued_values_are_written_on_close(batch_storage):
+
+    store = WriteBehindKeyValueStorage(store=batch_storage)
+    batch_storage.is_opened.clear()
+    for value in range(5):
+        store.cache_set(f"key_{value}", value, key_expire_time_sec=60)
+
+    threading.Timer(0.05, batch_storage.is_opened.set).start()
+    store.close()
+
+    assert sum(len(batch) for batch in batch_storage.batches) == 5
+
+
+def test_values_are_dropped_when_queue_is_full(batch_storage):
+
+    store = WriteBehindKeyValueStorage(store=batch_storage, max_queue_size=2, overflow_policy=DROP_POLICY)
+    batch_storage.is_opened.clear()
+    store.cache_set("key_0", 0, key_expire_time_sec=60)
+    time.sleep(0.05)
+    for value in range(1, 5):
+        store.cache_set(f"key_{value}", value, key_expire_time_sec=60)
+    batch_storage.is_opened.set()
+    store.close()
+
+    assert store.num_dropped == 2
+    assert store.num_written == 3
+
+
+def test_writer_waits_when_queue_is_full(batch_storage):
+
+    store = WriteBehindKeyValueStorage(store=batch_storage, max_queue_size=1, overflow_policy=BLOCK_POLICY)
+    batch_storage.is_opened.clear()
+    store.cache_set("key_0", 0, key_expire_time_sec=60)
+    time.sleep(0.05)
+    store.cache_set("key_1", 1, key_expire_time_sec=60)
+
+    threading.Timer(0.1, batch_storage.is_opened.set).start()
+    started_at = time.perf_counter()
+    store.cache_set("key_2", 2, key_expire_time_sec=60)
+    elapsed = time.perf_counter() - started_at
+    store.close()
+
+    assert elapsed >= 0.05
+    assert store.num_dropped == 0
+    assert store.num_written == 3
+
+
+def test_failed_batch_does_not_stop_writer(batch_storage):
+
+    store = WriteBehindKeyValueStorage(store=batch_storage)
+    batch_storage.is_down = True
+    store.cache_set("key_0", 0, key_expire_time_sec=60)
+    store.flush()
+    batch_storage.is_down = False
+    store.cache_set("key_1", 1, key_expire_time_sec=60)
+    store.close()
+
+    assert store.num_failed == 1
+    assert store.cache_get("key_1") == 1
+
+
+def test_unknown_overflow_policy_is_not_valid(batch_storage):
+
+    with pytest.raises(ValueError):
+        WriteBehindKeyValueStorage(store=batch_storage, overflow_policy="wait")
@@ -0,0 +1,143 @@
+import logging
+import queue
+import threading
+from typing import List, NoReturn, Optional, Tuple, Union
+
+from redis.exceptions import ConnectionError, TimeoutError
+from store import KeyValueStorage
+
+DROP_POLICY = "drop"
+BLOCK_POLICY = "block"
+OVERFLOW_POLICIES = (DROP_POLICY, BLOCK_POLICY)
+DEFAULT_WRITE_QUEUE_SIZE = 10_000
+DEFAULT_WRITE_BATCH_SIZE = 100
+
+_STOP = object()
+
+
+class WriteBehindKeyValueStorage:
+
+    """
+    Key value storage writing to cache of redis storage in background.
+    cache_set only puts value to bounded queue, worker thread sets queued values
+    by batches sent in single pipeline, so that request does not wait for write to redis.
+    When queue is full new values are dropped (drop policy) or cache_set waits for free place (block policy).
+    Values still in queue are written on close.
+    Value set to cache may be not found in redis until it is written, so in-process cache
+    should be in front of this storage if values are read right after they are set
+    """
+
+    def __init__(self,
+                 store: KeyValueStorage,
+                 max_queue_size: int = DEFAULT_WRITE_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+                 overflow_policy: str = DROP_POLICY):
+
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow policy should be one of {OVERFLOW_POLICIES}, not {overflow_policy}")
+
+        self.store = store
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self.num_dropped = 0
+        self.num_written = 0
+        self.num_failed = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._worker = threading.Thread(target=self._write_queued_values, name="cache-writer", daemon=True)
+        self._worker.start()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[str], Optional[int]]:
+        return self.store.get_with_ttl(key)
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        return self.store.get_many(keys)
+
+    def cache_get(self, key: str) -> Optional[float]:
+        return self.store.cache_get(key)
+
+    def cache_set(self, key: str,
+                  value: Union[float, int],
+                  key_expire_time_sec: int) -> NoReturn:
+
+        """
+        Queues the value for setting into cache by specified key
+        :param key: key to set value for
+        :param value: value for setting
+        :param key_expire_time_sec: time in which key will be expired
+        """
+
+        item = (key, value, key_expire_time_sec)
+        if self.overflow_policy == BLOCK_POLICY:
+            self._queue.put(item)
+            return
+
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.num_dropped += 1
+            logging.warning("Queue of cache writes is full, value of key %s is not cached", key)
+
+    def _write_queued_values(self) -> NoReturn:
+
+        """
+        Writes queued values by batches until stop mark is got from queue
+        """
+
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            is_stopped = batch[-1] is _STOP
+            items = batch[:-1] if is_stopped else batch
+            if items:
+                self._write_batch(items)
+            for _ in batch:
+                self._queue.task_done()
+            if is_stopped:
+                break
+
+    def _write_batch(self, items: List[Tuple[str, Union[float, int], int]]) -> NoReturn:
+        try:
+            self.store.cache_set_many(items)
+            self.num_written += len(items)
+        except (ConnectionError, TimeoutError) as exception:
+            self.num_failed += len(items)
+            logging.error(
+                "Could not set %d values to cache. Encountered error: %s",
+                len(items),
+                str(exception)
+            )
+        except Exception as e:
+            # worker should survive any error, otherwise blocked writers wait forever
+            self.num_failed += len(items)
+            logging.exception("Unexpected error while writing to cache: %s" % e)
+
+    def flush(self) -> NoReturn:
+
+        """
+        Waits until values queued before are written
+        """
+
+        self._queue.join()
+
+    def clear(self) -> NoReturn:
+        self.flush()
+        self.store.clear()
+
+    def close(self) -> NoReturn:
+
+        """
+        Writes values still in queue, stops worker and closes storage
+        """
+
+        if self._worker.is_alive():
+            self._queue.put(_STOP)
+            self._worker.join()
+        self.store.close()